@@ -0,0 +1,6 @@
+"""
+Benchmarks for the Loremaster backend. Run modules with `python -m benchmarks.<name>`.
+
+`benchmarks.suite` covers every route and compares with `baseline.json`; the
+`bench_*` modules each measure one change in isolation.
+"""
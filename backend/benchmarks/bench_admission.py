@@ -0,0 +1,189 @@
+"""
+Latency of cheap routes during a storm of heavy requests, with admission
+control off and on.
+
+Starts the API under uvicorn in a subprocess for each mode. For `--seconds`:
+
+- `--importers` clients create books of `--entries` entries back to back
+  (POST /lorebooks), waiting out Retry-After (at most a second) on a 503;
+- `--readers` clients fetch the same large book again and again while it is
+  edited, so its encoded body keeps being rebuilt (the coalesced read);
+- `--pollers` clients each loop over the cheap routes: GET /health, the
+  library listing, one entry page and one entry edit.
+
+The report gives p50/p99/max latency of the cheap routes and how many
+requests of each kind were answered, and turned away with 503.
+
+Usage: python -m benchmarks.bench_admission [--seconds 15] [--importers 8]
+    [--readers 16] [--pollers 8] [--entries 5000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from .server import free_port
+from .synthetic import make_entries
+
+HOST = "127.0.0.1"
+
+
+class Tally:
+    def __init__(self) -> None:
+        self.ok = 0
+        self.busy = 0
+        self.latencies: List[float] = []
+
+    def record(self, response: httpx.Response, started: float) -> None:
+        if response.status_code == 503:
+            self.busy += 1
+            return
+        response.raise_for_status()
+        self.ok += 1
+        self.latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def _importer(client: httpx.AsyncClient, body: bytes, until: float, tally: Tally) -> None:
+    while time.perf_counter() < until:
+        started = time.perf_counter()
+        response = await client.post(
+            "/lorebooks", content=body, headers={"Content-Type": "application/json"}
+        )
+        tally.record(response, started)
+        if response.status_code == 503:
+            await asyncio.sleep(min(1.0, float(response.headers["retry-after"])))
+
+
+async def _reader(client: httpx.AsyncClient, book_id: str, until: float, tally: Tally) -> None:
+    while time.perf_counter() < until:
+        started = time.perf_counter()
+        response = await client.get(f"/lorebooks/{book_id}")
+        tally.record(response, started)
+        if response.status_code == 503:
+            await asyncio.sleep(min(1.0, float(response.headers["retry-after"])))
+
+
+async def _editor(client: httpx.AsyncClient, book_id: str, uid: int, until: float) -> None:
+    index = 0
+    while time.perf_counter() < until:
+        await client.put(
+            f"/lorebooks/{book_id}/entries/{uid}", json={"key": ["k"], "content": f"{index}"}
+        )
+        index += 1
+        await asyncio.sleep(0.2)
+
+
+async def _poller(
+    client: httpx.AsyncClient, book_id: str, uid: int, until: float, tally: Tally
+) -> None:
+    calls = (
+        lambda: client.get("/health"),
+        lambda: client.get("/lorebooks"),
+        lambda: client.get(f"/lorebooks/{book_id}/entries", params={"limit": 20}),
+        lambda: client.put(
+            f"/lorebooks/{book_id}/entries/{uid}", json={"key": ["p"], "content": "poll"}
+        ),
+    )
+    index = 0
+    while time.perf_counter() < until:
+        started = time.perf_counter()
+        tally.record(await calls[index % len(calls)](), started)
+        index += 1
+        await asyncio.sleep(0.01)
+
+
+async def _drive(origin: str, args) -> Dict[str, Tally]:
+    body = json.dumps({"name": "Import", "entries": make_entries(args.entries)}).encode()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=origin, timeout=120, limits=limits) as client:
+        popular = (
+            await client.post(
+                "/lorebooks",
+                json={"name": "Popular", "entries": make_entries(args.entries, seed=9)},
+            )
+        ).json()
+        small = (
+            await client.post("/lorebooks", json={"name": "Small", "entries": make_entries(50)})
+        ).json()
+        tallies = {"cheap": Tally(), "import": Tally(), "popular read": Tally()}
+        until = time.perf_counter() + args.seconds
+        await asyncio.gather(
+            *(_importer(client, body, until, tallies["import"]) for _ in range(args.importers)),
+            *(
+                _reader(client, popular["id"], until, tallies["popular read"])
+                for _ in range(args.readers)
+            ),
+            _editor(client, popular["id"], popular["entries"][0]["uid"], until),
+            *(
+                _poller(client, small["id"], small["entries"][0]["uid"], until, tallies["cheap"])
+                for _ in range(args.pollers)
+            ),
+        )
+    return tallies
+
+
+def _summary(tally: Tally) -> str:
+    ordered = sorted(tally.latencies) or [0.0]
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return (
+        f"ok {tally.ok:>5}  503 {tally.busy:>5}  p50 {statistics.median(ordered):8.1f} ms"
+        f"  p99 {p99:8.1f} ms  max {ordered[-1]:8.1f} ms"
+    )
+
+
+def _run_mode(env: Dict[str, str], args) -> Dict[str, Tally]:
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", HOST,
+         "--port", str(port), "--log-level", "warning"],
+        env=dict(os.environ, LOREMASTER_SESSION_SECRET="bench" * 8, **env),
+    )
+    origin = f"http://{HOST}:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"{origin}/health").raise_for_status()
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+        return asyncio.run(_drive(origin, args))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--importers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--pollers", type=int, default=8)
+    parser.add_argument("--entries", type=int, default=5000)
+    args = parser.parse_args()
+
+    modes = {
+        "admission off": {"LOREMASTER_HEAVY_CONCURRENCY": "0", "LOREMASTER_CHEAP_CONCURRENCY": "0"},
+        "admission on (defaults)": {},
+    }
+    for label, env in modes.items():
+        tallies = _run_mode(env, args)
+        print(label)
+        for name, tally in tallies.items():
+            print(f"  {name:<14} {_summary(tally)}")
+
+
+if __name__ == "__main__":
+    main()
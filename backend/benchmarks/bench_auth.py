@@ -0,0 +1,92 @@
+"""
+Cost of authenticating a request with a local session token, compared with
+asking Discord who the user is on every request.
+
+Reports per-call token verification time (first sight and cached), the extra
+latency an authenticated route adds over an anonymous one, and a pooled
+round trip to a local fake Discord /users/@me as the alternative.
+
+Usage: python -m benchmarks.bench_auth [--requests 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+import httpx
+
+from src.app import create_app
+from src.services.discord import DiscordClient
+from src.services.sessions import SessionManager, SessionUser
+
+from .bench_discord import _fake_discord
+from .server import serve
+
+
+def _per_call_us(fn: Callable[[], object], count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - started) / count * 1e6
+
+
+async def _median_ms(call: Callable[[], Awaitable[object]], count: int) -> float:
+    samples: List[float] = []
+    for _ in range(count):
+        started = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def _routes(count: int) -> None:
+    app = create_app()
+    sessions: SessionManager = app.state.sessions
+    token = sessions.issue(SessionUser("1", "bench")).access_token
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        anonymous = await _median_ms(lambda: client.get("/health"), count)
+        signed_in = await _median_ms(lambda: client.get("/auth/me", headers=headers), count)
+    print(f"GET /health (anonymous):      {anonymous:.3f}ms")
+    print(f"GET /auth/me (session token): {signed_in:.3f}ms")
+
+
+async def _discord_round_trip(base_url: str, count: int) -> None:
+    discord = DiscordClient(client_id="bench", client_secret="bench", base_url=base_url)
+    try:
+        median = await _median_ms(lambda: discord.get_user_info("token"), count)
+    finally:
+        await discord.aclose()
+    print(f"Discord /users/@me (pooled):  {median:.3f}ms  (local fake, no TLS)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    sessions = SessionManager(b"bench-secret")
+    tokens = [
+        sessions.issue(SessionUser(str(i), f"user{i}")).access_token
+        for i in range(args.requests)
+    ]
+    it = iter(tokens)
+    cold = _per_call_us(lambda: sessions.verify(next(it)), len(tokens))
+    warm = _per_call_us(lambda: sessions.verify(tokens[0]), args.requests)
+    print(f"verify, first sight:          {cold:.2f}us")
+    print(f"verify, cached:               {warm:.2f}us")
+
+    asyncio.run(_routes(args.requests))
+
+    fake, _, _ = _fake_discord(latency=0.0, rate_limit_every=0)
+    with serve(fake) as origin:
+        asyncio.run(_discord_round_trip(f"{origin}/api/v10", min(args.requests, 500)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Throughput of the batch mutation endpoint vs one request per entry.
+
+Both paths run in-process through the ASGI app, so the numbers measure the
+per-request framework/store overhead rather than network latency (which only
+widens the gap in practice).
+
+Usage: python -m benchmarks.bench_batch [--entries 2000] [--ops 500]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+from src.app import create_app
+
+from .synthetic import make_entries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--ops", type=int, default=500)
+    args = parser.parse_args()
+
+    with TestClient(create_app()) as client:
+        book = client.post(
+            "/lorebooks", json={"name": "Bench", "entries": make_entries(args.entries)}
+        ).json()
+        base = f"/lorebooks/{book['id']}/entries"
+        uids = [entry["uid"] for entry in book["entries"]][: args.ops]
+
+        started = time.perf_counter()
+        for uid in uids:
+            client.put(f"{base}/{uid}", json={"comment": "single", "order": 5})
+        single_s = time.perf_counter() - started
+
+        operations = [
+            {"op": "update", "uid": uid, "entry": {"comment": "batch", "order": 5}}
+            for uid in uids
+        ]
+        started = time.perf_counter()
+        response = client.post(f"{base}:batch", json={"operations": operations})
+        batch_s = time.perf_counter() - started
+        assert response.status_code == 200, response.text
+
+    print(f"operations:         {len(uids)}")
+    print(f"one call per entry: {single_s:.3f}s ({len(uids) / single_s:,.0f} ops/s)")
+    print(f"single batch call:  {batch_s:.3f}s ({len(uids) / batch_s:,.0f} ops/s)")
+
+
+if __name__ == "__main__":
+    main()
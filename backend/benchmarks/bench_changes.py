@@ -0,0 +1,192 @@
+"""
+Memory per open GET /changes stream and broadcast latency to all of them.
+
+Starts the API under uvicorn in a subprocess, opens idle Server-Sent Events
+subscribers in steps (raw sockets, so the client stays light) and reads the
+server's RSS after each step. With every subscriber connected it then edits
+an entry `--edits` times and records, per edit, how long each subscriber
+took to receive the event after the PUT was sent. Runs once per coalescing
+window (LOREMASTER_CHANGE_COALESCE_MS), as the window adds directly to the
+latency.
+
+Usage: python -m benchmarks.bench_changes [--subscribers 500,2000,5000]
+                                          [--edits 20] [--windows 0,50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from .server import free_port
+
+HOST = "127.0.0.1"
+
+
+def _rss_mib(pid: int) -> float:
+    with open(f"/proc/{pid}/statm") as handle:
+        pages = int(handle.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+class Subscriber:
+    """One idle stream that timestamps every `change` event it receives."""
+
+    def __init__(self, arrivals: List[List[float]]) -> None:
+        self.arrivals = arrivals
+        self.seen = 0
+        self.writer: asyncio.StreamWriter = None
+        self.task: asyncio.Task = None
+
+    async def connect(self, port: int) -> None:
+        reader, self.writer = await asyncio.open_connection(HOST, port)
+        self.writer.write(
+            b"GET /changes HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n"
+        )
+        await self.writer.drain()
+        await reader.readuntil(b"retry:")
+        self.task = asyncio.create_task(self._read(reader))
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                return
+            now = time.perf_counter()
+            for _ in range(data.count(b"event: change")):
+                if self.seen < len(self.arrivals):
+                    self.arrivals[self.seen].append(now)
+                self.seen += 1
+
+    def close(self) -> None:
+        self.task.cancel()
+        self.writer.close()
+
+
+def _percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+async def _run(port: int, pid: int, steps: List[int], edits: int) -> Dict:
+    origin = f"http://{HOST}:{port}"
+    arrivals: List[List[float]] = [[] for _ in range(edits)]
+    subscribers: List[Subscriber] = []
+    memory = [(0, round(_rss_mib(pid), 1))]
+
+    for target in steps:
+        while len(subscribers) < target:
+            batch = [Subscriber(arrivals) for _ in range(min(200, target - len(subscribers)))]
+            await asyncio.gather(*(subscriber.connect(port) for subscriber in batch))
+            subscribers.extend(batch)
+        await asyncio.sleep(1.0)
+        memory.append((target, round(_rss_mib(pid), 1)))
+
+    sent: List[float] = []
+    async with httpx.AsyncClient(base_url=origin, timeout=30) as client:
+        book = (await client.post("/lorebooks", json={"name": "Bench", "entries": []})).json()
+        entry = (
+            await client.post(
+                f"/lorebooks/{book['id']}/entries", json={"key": ["k"], "content": "start"}
+            )
+        ).json()["entry"]
+        # Let the add's event reach everyone before timing starts.
+        await asyncio.sleep(1.0)
+        for bucket in arrivals:
+            bucket.clear()
+        for subscriber in subscribers:
+            subscriber.seen = 0
+
+        for index in range(edits):
+            sent.append(time.perf_counter())
+            await client.put(
+                f"/lorebooks/{book['id']}/entries/{entry['uid']}",
+                json={"key": ["k"], "content": f"edit {index}"},
+            )
+            deadline = time.perf_counter() + 30
+            while len(arrivals[index]) < len(subscribers) and time.perf_counter() < deadline:
+                await asyncio.sleep(0.005)
+
+    for subscriber in subscribers:
+        subscriber.close()
+
+    latencies = [
+        (arrival - sent[index]) * 1000
+        for index, bucket in enumerate(arrivals)
+        for arrival in bucket
+    ]
+    last = [(max(bucket) - sent[index]) * 1000 for index, bucket in enumerate(arrivals) if bucket]
+    delivered = sum(len(bucket) for bucket in arrivals)
+    return {
+        "memory": memory,
+        "delivered": delivered,
+        "expected": edits * len(subscribers),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p99_ms": round(_percentile(latencies, 0.99), 1),
+        "last_subscriber_ms": round(statistics.median(last), 1),
+    }
+
+
+def _bench_window(steps: List[int], edits: int, window_ms: int) -> Dict:
+    port = free_port()
+    env = dict(
+        os.environ,
+        LOREMASTER_SESSION_SECRET="bench" * 8,
+        LOREMASTER_CHANGE_COALESCE_MS=str(window_ms),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", HOST,
+         "--port", str(port), "--log-level", "warning", "--backlog", "4096"],
+        env=env,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"http://{HOST}:{port}/health").raise_for_status()
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+        return asyncio.run(_run(port, server.pid, steps, edits))
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", default="500,2000,5000")
+    parser.add_argument("--edits", type=int, default=20)
+    parser.add_argument("--windows", default="0,50", help="coalescing windows in ms")
+    args = parser.parse_args()
+    steps = [int(value) for value in args.subscribers.split(",")]
+
+    for window in (int(value) for value in args.windows.split(",")):
+        result = _bench_window(steps, args.edits, window)
+        print(f"coalescing window {window} ms")
+        base = result["memory"][0][1]
+        for count, rss in result["memory"]:
+            per = f"{(rss - base) * 1024 / count:6.1f} KiB/subscriber" if count else ""
+            print(f"  {count:>6} subscribers  server RSS {rss:7.1f} MiB  {per}")
+        print(
+            f"  broadcast to {steps[-1]}: p50 {result['p50_ms']} ms, "
+            f"p99 {result['p99_ms']} ms, last subscriber {result['last_subscriber_ms']} ms "
+            f"(median over edits); delivered {result['delivered']}/{result['expected']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Login latency and upstream connection count under concurrent logins, against
+a local fake Discord API.
+
+Compares the shared pooled DiscordClient with the previous behaviour of
+opening a fresh httpx.AsyncClient for each of the two calls a login makes.
+The fake server counts distinct client sockets, answers with a small delay,
+and rate-limits every Nth request with a 429 + Retry-After so the retry path
+is exercised. Over real TLS to discord.com each avoided connection also saves
+a handshake, which this local run does not show.
+
+Usage: python -m benchmarks.bench_discord [--logins 500] [--concurrency 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List, Set, Tuple
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from src.services.discord import DiscordClient
+
+from .server import serve
+
+
+def _fake_discord(latency: float, rate_limit_every: int) -> Tuple[FastAPI, Set, Dict]:
+    app = FastAPI()
+    sockets: Set[Tuple[str, int]] = set()
+    counters = {"requests": 0, "limited": 0}
+
+    def _admit(request: Request):
+        sockets.add(tuple(request.scope["client"]))
+        counters["requests"] += 1
+        if rate_limit_every and counters["requests"] % rate_limit_every == 0:
+            counters["limited"] += 1
+            return JSONResponse(
+                {"message": "You are being rate limited.", "retry_after": 0.05},
+                status_code=429,
+                headers={"Retry-After": "0.05", "X-RateLimit-Reset-After": "0.05"},
+            )
+        return None
+
+    @app.post("/api/v10/oauth2/token")
+    async def token(request: Request):
+        if (limited := _admit(request)) is not None:
+            return limited
+        await asyncio.sleep(latency)
+        return {"access_token": "token", "token_type": "Bearer", "expires_in": 604800}
+
+    @app.get("/api/v10/users/@me")
+    async def me(request: Request):
+        if (limited := _admit(request)) is not None:
+            return limited
+        await asyncio.sleep(latency)
+        return {"id": "1", "username": "bench"}
+
+    return app, sockets, counters
+
+
+async def _unpooled_login(base_url: str) -> None:
+    """The old code path: one short-lived client per Discord call."""
+    async with httpx.AsyncClient(base_url=base_url, timeout=10) as client:
+        response = await client.post("/oauth2/token", data={"code": "x"})
+        response.raise_for_status()
+        token = response.json()["access_token"]
+    async with httpx.AsyncClient(base_url=base_url, timeout=10) as client:
+        response = await client.get(
+            "/users/@me", headers={"Authorization": f"Bearer {token}"}
+        )
+        response.raise_for_status()
+
+
+async def _pooled_login(discord: DiscordClient) -> None:
+    token = await discord.exchange_code("x")
+    await discord.get_user_info(token["access_token"])
+
+
+async def _drive(login, logins: int, concurrency: int) -> Tuple[List[float], int]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures = 0
+
+    async def one() -> None:
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await login()
+            except httpx.HTTPError:
+                failures += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(logins)))
+    return latencies, failures
+
+
+def _report(label: str, latencies: List[float], failures: int, sockets: int) -> None:
+    ordered = sorted(latencies) or [0.0]
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{label:<10} {statistics.median(ordered):>8.1f}ms {p95:>8.1f}ms "
+        f"{failures:>9} {sockets:>12}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.005, help="fake API delay (s)")
+    parser.add_argument("--rate-limit-every", type=int, default=50)
+    args = parser.parse_args()
+
+    fake, sockets, _ = _fake_discord(args.latency, args.rate_limit_every)
+    with serve(fake) as origin:
+        base_url = f"{origin}/api/v10"
+        print(f"{'client':<10} {'p50':>10} {'p95':>10} {'failures':>9} {'connections':>12}")
+
+        sockets.clear()
+        latencies, failures = asyncio.run(
+            _drive(lambda: _unpooled_login(base_url), args.logins, args.concurrency)
+        )
+        _report("unpooled", latencies, failures, len(sockets))
+
+        async def pooled() -> Tuple[List[float], int]:
+            discord = DiscordClient(
+                client_id="bench", client_secret="bench", base_url=base_url
+            )
+            try:
+                return await _drive(
+                    lambda: _pooled_login(discord), args.logins, args.concurrency
+                )
+            finally:
+                await discord.aclose()
+
+        sockets.clear()
+        latencies, failures = asyncio.run(pooled())
+        _report("pooled", latencies, failures, len(sockets))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Near-duplicate detection on a large library.
+
+Fills a store with `--entries` synthetic entries spread over `--books` books,
+where `--dup-share` of them are reworded copies of another entry (a few
+words swapped, sometimes an extra keyword) placed in a random book. Then:
+
+- times the first library-wide search, which builds every book's signatures,
+  and a second one that reuses them;
+- times the same for one book holding every entry;
+- times entry edits with and without the signatures to maintain;
+- reports how many planted pairs ended up in the same cluster (recall) and
+  what comparing every pair directly would take, estimated from a sample.
+
+Usage: python -m benchmarks.bench_duplicates [--entries 100000] [--books 20]
+    [--dup-share 0.1] [--threshold 0.7]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from src.models import EntryPayload
+from src.services.duplicates import similarity
+from src.services.store import LorebookStore
+
+from .synthetic import make_entries
+
+
+def _reword(entry: Dict, rng: random.Random, words: List[str]) -> Dict:
+    content = entry["content"].split()
+    for _ in range(max(1, len(content) // 30)):
+        content[rng.randrange(len(content))] = rng.choice(words)
+    keys = list(entry["key"])
+    if rng.random() < 0.5:
+        keys.append(rng.choice(words))
+    return {"content": " ".join(content), "key": keys, "comment": entry["comment"]}
+
+
+def _library(count: int, books: int, dup_share: float) -> Tuple[List[List[Dict]], List[Tuple]]:
+    """Entries per book plus the planted (book, index) pairs of each copy."""
+    rng = random.Random(11)
+    originals = make_entries(int(count * (1 - dup_share)), content_words=80, field_mix=0.1)
+    words = sorted({word for entry in originals[:100] for word in entry["content"].split()})
+    shelves: List[List[Dict]] = [[] for _ in range(books)]
+    placed: List[Tuple[int, int]] = []
+    for entry in originals:
+        shelf = rng.randrange(books)
+        shelves[shelf].append({**entry, "uid": 0})
+        placed.append((shelf, len(shelves[shelf]) - 1))
+    planted = []
+    for _ in range(count - len(originals)):
+        source = rng.randrange(len(originals))
+        shelf = rng.randrange(books)
+        shelves[shelf].append(_reword(originals[source], rng, words))
+        planted.append((placed[source], (shelf, len(shelves[shelf]) - 1)))
+    return shelves, planted
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def _edit_ms(store: LorebookStore, book_id: str, uids: List[int], rng: random.Random) -> float:
+    samples = []
+    for uid in rng.sample(uids, 200):
+        payload = EntryPayload(content=f"edited {rng.random()} with some new words", key=["k"])
+        started = time.perf_counter()
+        store.update_entry(book_id, uid, payload)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--books", type=int, default=20)
+    parser.add_argument("--dup-share", type=float, default=0.1)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    args = parser.parse_args()
+
+    shelves, planted = _library(args.entries, args.books, args.dup_share)
+    store = LorebookStore()
+    books = [store.create_lorebook(f"Book {i}", shelf) for i, shelf in enumerate(shelves)]
+    uid_of = {
+        (shelf, index): (book.id, entry.uid)
+        for shelf, book in enumerate(books)
+        for index, entry in enumerate(book.entries)
+    }
+    limit = args.entries
+
+    cold, report = _timed(store.find_library_duplicates, args.threshold, limit)
+    warm, _ = _timed(store.find_library_duplicates, args.threshold, limit)
+    print(f"library, {args.entries} entries in {args.books} books")
+    print(f"  first search (builds signatures) {cold:7.2f} s")
+    print(f"  repeat search                    {warm:7.2f} s")
+    print(f"  clusters {report.total}, entries scanned {report.entriesScanned}")
+
+    cluster_of = {}
+    for number, cluster in enumerate(report.clusters):
+        for member in cluster.entries:
+            cluster_of[(member.lorebookId, member.uid)] = number
+    found = sum(
+        1
+        for original, copy in planted
+        if cluster_of.get(uid_of[original], -1) == cluster_of.get(uid_of[copy], -2)
+    )
+    print(f"  planted pairs clustered together {found}/{len(planted)}")
+
+    single = LorebookStore()
+    everything = [entry for shelf in shelves for entry in shelf]
+    book = single.create_lorebook("Everything", everything)
+    cold, report = _timed(single.find_duplicates, book.id, args.threshold, limit)
+    warm, _ = _timed(single.find_duplicates, book.id, args.threshold, limit)
+    print(f"one book, {args.entries} entries")
+    print(f"  first search (builds signatures) {cold:7.2f} s")
+    print(f"  repeat search                    {warm:7.2f} s")
+
+    rng = random.Random(3)
+    uids = [entry.uid for entry in single._books[book.id].entries]
+    with_index = _edit_ms(single, book.id, uids, rng)
+    plain = LorebookStore()
+    plain_book = plain.create_lorebook("Plain", everything)
+    without = _edit_ms(plain, plain_book.id, [e.uid for e in plain._books[plain_book.id].entries], rng)
+    print(f"  entry edit, median {without:.3f} ms without signatures, {with_index:.3f} ms with")
+
+    signatures = list(single._books[book.id].duplicates.signatures.values())
+    pairs = 200_000
+    started = time.perf_counter()
+    for _ in range(pairs):
+        similarity(rng.choice(signatures), rng.choice(signatures))
+    per_pair = (time.perf_counter() - started) / pairs
+    total_pairs = args.entries * (args.entries - 1) / 2
+    print(
+        f"comparing all {total_pairs:,.0f} pairs directly: ~{per_pair * total_pairs / 3600:,.1f} h"
+        f" (signatures alone; exact shingle sets are slower)"
+    )
+
+
+if __name__ == "__main__":
+    main()
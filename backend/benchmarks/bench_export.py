@@ -0,0 +1,60 @@
+"""
+Time-to-first-byte, total time and server-side transient memory for
+GET /lorebooks/{id} versus the streaming export.
+
+Usage: python -m benchmarks.bench_export [--entries 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+
+import httpx
+
+from src.app import create_app
+
+from .server import serve
+from .synthetic import make_entries
+
+
+def _download(client: httpx.Client, url: str):
+    tracemalloc.start()
+    started = time.perf_counter()
+    ttfb = None
+    size = 0
+    with client.stream("GET", url) as response:
+        for chunk in response.iter_raw():
+            if ttfb is None:
+                ttfb = time.perf_counter() - started
+            size += len(chunk)
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ttfb * 1000, total * 1000, peak / 1024 / 1024, size / 1024 / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=20000)
+    args = parser.parse_args()
+
+    app = create_app()
+    book = app.state.store.create_lorebook("Bench", make_entries(args.entries))
+
+    with serve(app) as base_url, httpx.Client(base_url=base_url, timeout=120) as client:
+        routes = {
+            "GET /lorebooks/{id}": f"/lorebooks/{book.id}",
+            "export native": f"/lorebooks/{book.id}/export",
+            "export sillytavern": f"/lorebooks/{book.id}/export?format=sillytavern",
+            "export ndjson": f"/lorebooks/{book.id}/export?format=ndjson",
+        }
+        print(f"{'route':<22} {'ttfb':>10} {'total':>10} {'peak mem':>10} {'size':>8}")
+        for label, url in routes.items():
+            ttfb, total, peak, size = _download(client, url)
+            print(f"{label:<22} {ttfb:>8.1f}ms {total:>8.1f}ms {peak:>7.1f}MiB {size:>5.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Transient memory of the streaming import vs. the one-shot POST /lorebooks.
+
+Reports peak allocation above what the imported book itself retains, which is
+the overhead the import path adds on top of storing the entries.
+
+Usage: python -m benchmarks.bench_import [--entries 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+import httpx
+
+from src.app import create_app
+
+from .synthetic import make_entries
+
+
+async def _measure(fn):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    await fn()
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, (peak - current) / 1024 / 1024
+
+
+async def run(entry_count: int) -> None:
+    entries = make_entries(entry_count)
+    world_info = json.dumps(
+        {"entries": {str(i): entry for i, entry in enumerate(entries)}}
+    ).encode()
+    native = json.dumps({"name": "Bench", "entries": entries}).encode()
+    del entries
+
+    # ASGITransport streams request bodies chunk by chunk (TestClient would
+    # buffer the whole upload first and hide the difference).
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one_shot():
+            await client.post(
+                "/lorebooks",
+                content=native,
+                headers={"Content-Type": "application/json"},
+            )
+
+        async def streaming():
+            book = (await client.post("/lorebooks", json={"name": "Bench"})).json()
+
+            async def body():
+                for offset in range(0, len(world_info), 64 * 1024):
+                    yield world_info[offset : offset + 64 * 1024]
+
+            await client.post(f"/lorebooks/{book['id']}/import", content=body())
+
+        for label, fn in (("POST /lorebooks", one_shot), ("streaming import", streaming)):
+            elapsed, transient_mb = await _measure(fn)
+            print(f"{label:<18} {elapsed:6.2f}s  transient peak {transient_mb:7.1f} MiB")
+
+    print(f"payload size: {len(world_info) / 1024 / 1024:.1f} MiB, entries: {entry_count}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.entries))
+
+
+if __name__ == "__main__":
+    main()
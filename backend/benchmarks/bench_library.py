@@ -0,0 +1,68 @@
+"""
+GET /lorebooks latency against library size, right after an edit.
+
+Every edit invalidates the cached full listing, so the sidebar's next request
+rebuilds it; a page from the library index should not grow with the library.
+Each library size gets a fresh app, filled through the store.
+
+Usage: python -m benchmarks.bench_library [--books 1000,10000,30000] [--page 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+
+from src.app import create_app
+
+WORDS = ("Ashen", "Gilded", "Hollow", "Iron", "Silent", "Verdant", "Crimson", "Frozen")
+
+
+def _timed(client: TestClient, book_ids, params, iterations: int) -> float:
+    samples = []
+    for i in range(iterations):
+        # An edit first, as in the editor: it moves a book to the top of the
+        # lastEdited order and drops the cached listing.
+        client.patch(
+            f"/lorebooks/{book_ids[i % len(book_ids)]}", json={"name": f"{WORDS[i % 8]} Book {i}"}
+        ).raise_for_status()
+        started = time.perf_counter()
+        response = client.get("/lorebooks", params=params)
+        samples.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", default="1000,10000,30000")
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    cases = {
+        "full library": {},
+        "first page": {"limit": args.page},
+        "name page, prefix": {"sort": "name", "prefix": "iron", "limit": args.page},
+        "edited page, prefix": {"prefix": "iron", "limit": args.page},
+    }
+    print(f"{'books':>7}  " + "  ".join(f"{name:>20}" for name in cases) + "   (median ms)")
+    for count in (int(value) for value in args.books.split(",")):
+        app = create_app()
+        store = app.state.store
+        book_ids = [
+            store.create_lorebook(f"{WORDS[i % 8]} Book {i}", []).id for i in range(count)
+        ]
+        with TestClient(app) as client:
+            row = [
+                _timed(client, book_ids, params, args.iterations)
+                for params in cases.values()
+            ]
+        print(f"{count:>7}  " + "  ".join(f"{value:>20.2f}" for value in row))
+
+
+if __name__ == "__main__":
+    main()
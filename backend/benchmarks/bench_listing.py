@@ -0,0 +1,53 @@
+"""
+First-paint payload and latency: full GET /lorebooks/{id} vs a projected
+first page from GET /lorebooks/{id}/entries.
+
+Usage: python -m benchmarks.bench_listing [--entries 10000] [--page 100]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+from src.app import create_app
+
+from .synthetic import make_entries
+
+CARD_FIELDS = "uid,comment,key,enabled,constant,disabled,order,position"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--page", type=int, default=100)
+    args = parser.parse_args()
+
+    app = create_app()
+    book = app.state.store.create_lorebook("Bench", make_entries(args.entries))
+
+    with TestClient(app) as client:
+        requests = {
+            "full book": (f"/lorebooks/{book.id}", {}),
+            "page, all fields": (
+                f"/lorebooks/{book.id}/entries",
+                {"limit": args.page, "sort": "order"},
+            ),
+            "page, card fields": (
+                f"/lorebooks/{book.id}/entries",
+                {"limit": args.page, "sort": "order", "fields": CARD_FIELDS},
+            ),
+        }
+        print(f"{'request':<20} {'bytes':>12} {'latency':>10}")
+        for label, (url, params) in requests.items():
+            client.get(url, params=params)  # warm sorted views
+            started = time.perf_counter()
+            response = client.get(url, params=params)
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"{label:<20} {len(response.content):>12,} {elapsed:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
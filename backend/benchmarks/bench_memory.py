@@ -0,0 +1,91 @@
+"""
+Per-entry memory of the store's compact entries vs. one LoreEntry per entry.
+
+Entries are decoded from stored JSON rows, as on a cold start. Bytes per
+entry are measured with tracemalloc; library RSS (peak growth while loading)
+is measured in a fresh subprocess per layout so the runs do not share an
+allocator.
+
+Usage: python -m benchmarks.bench_memory [--entries 10000] [--library 100000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tracemalloc
+
+from src.models import LoreEntry
+from src.services.records import CompactEntry
+
+from .synthetic import make_entry
+
+LAYOUTS = ("model", "compact")
+
+
+def _load(layout: str, rows: list) -> list:
+    """Decode stored JSON rows the way each layout would on a cold start."""
+    if layout == "model":
+        return [LoreEntry.model_validate_json(row) for row in rows]
+    return [CompactEntry.from_dict(json.loads(row)) for row in rows]
+
+
+def _rows(count: int) -> list:
+    rng = random.Random(1234)
+    return [json.dumps(make_entry(i, rng)) for i in range(count)]
+
+
+def _bytes_per_entry(layout: str, count: int) -> float:
+    rows = _rows(count)
+    tracemalloc.start()
+    kept = _load(layout, rows)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current / count
+
+
+def _rss_child(layout: str, count: int) -> None:
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    entries = _load(layout, _rows(count))
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(rss_kb, rss_before, len(entries))
+
+
+def _library_rss_mib(layout: str, count: int) -> float:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_memory", "--rss-child", layout,
+         "--library", str(count)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    peak_kb, baseline_kb, _ = output.split()
+    return (int(peak_kb) - int(baseline_kb)) / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=10_000)
+    parser.add_argument("--library", type=int, default=100_000)
+    parser.add_argument("--rss-child", choices=LAYOUTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rss_child:
+        _rss_child(args.rss_child, args.library)
+        return
+
+    print(f"{'layout':<10}{'bytes/entry':>14}{'library RSS':>16}")
+    for layout in LAYOUTS:
+        per_entry = _bytes_per_entry(layout, args.entries)
+        rss = _library_rss_mib(layout, args.library)
+        print(f"{layout:<10}{per_entry:>14,.0f}{rss:>12.1f} MiB")
+    print(f"(bytes/entry over {args.entries} entries, RSS for {args.library} entries)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Overhead of the metrics middleware.
+
+The same routes are timed in process through two apps, one with
+MetricsMiddleware and one with it removed, alternating rounds so drift in
+machine load affects both alike. Also reports the cost of one histogram
+observation and of rendering /metrics.
+
+Usage: python -m benchmarks.bench_metrics [--requests 2000] [--rounds 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+from src.api.middleware import MetricsMiddleware
+from src.app import create_app
+from src.services import metrics
+
+from .synthetic import make_entries
+
+
+async def _timed(client: httpx.AsyncClient, url: str, count: int) -> List[float]:
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        await client.get(url)
+        samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+async def _compare(requests: int, rounds: int) -> None:
+    entries = make_entries(200)
+    clients: Dict[str, httpx.AsyncClient] = {}
+    paths: Dict[str, str] = {}
+    for label, keep in (("with metrics", True), ("without", False)):
+        app = create_app()
+        if not keep:
+            app.user_middleware = [
+                m for m in app.user_middleware if m.cls is not MetricsMiddleware
+            ]
+        book = app.state.store.create_lorebook("Bench", entries)
+        paths[label] = f"/lorebooks/{book.id}/entries?limit=20"
+        clients[label] = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench"
+        )
+
+    for route in ("/health", "entries"):
+        medians: Dict[str, List[float]] = {label: [] for label in clients}
+        for _ in range(rounds):
+            for label, client in clients.items():
+                url = paths[label] if route == "entries" else route
+                medians[label].append(statistics.median(await _timed(client, url, requests)))
+        with_us = statistics.median(medians["with metrics"])
+        without_us = statistics.median(medians["without"])
+        name = "GET /lorebooks/{id}/entries" if route == "entries" else f"GET {route}"
+        print(f"{name:<30} with {with_us:8.1f}us  without {without_us:8.1f}us  "
+              f"overhead {with_us - without_us:+6.1f}us")
+
+    for client in clients.values():
+        await client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(_compare(args.requests, args.rounds))
+
+    histogram = metrics.Histogram("bench_seconds", "bench", ("route",))
+    count = 200_000
+    started = time.perf_counter()
+    for i in range(count):
+        histogram.observe(0.003, "/lorebooks/{lorebook_id}")
+    observe_ns = (time.perf_counter() - started) / count * 1e9
+    print(f"Histogram.observe:             {observe_ns:.0f}ns")
+
+    started = time.perf_counter()
+    text = metrics.render()
+    print(f"render /metrics body:          {(time.perf_counter() - started) * 1000:.2f}ms "
+          f"({len(text.splitlines())} lines)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Latency of small requests while a huge book is created and imported.
+
+One client creates a book with `--entries` entries and then streams the same
+number of entries into it as NDJSON. Meanwhile a second client polls
+GET /health and a small entry page every few milliseconds. Two configurations
+are compared, each in a fresh subprocess serving over real HTTP:
+
+- store calls inline on the event loop (LOREMASTER_WORKER_THREADS=0), the
+  behaviour before the worker pool;
+- the default worker pool.
+
+Usage: python -m benchmarks.bench_offload [--entries 50000] [--interval 0.005]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from .server import serve
+from .synthetic import make_entries
+
+
+async def _poll(client: httpx.AsyncClient, url: str, interval: float, done: asyncio.Event,
+                samples: List[float]) -> None:
+    while not done.is_set():
+        started = time.perf_counter()
+        response = await client.get(url)
+        response.raise_for_status()
+        samples.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(interval)
+
+
+async def _drive(origin: str, entries: int, interval: float) -> Dict:
+    payload = json.dumps({"name": "Huge", "entries": make_entries(entries)}).encode()
+    ndjson = "\n".join(json.dumps(entry) for entry in make_entries(entries, seed=7)).encode()
+    timeout = httpx.Timeout(600.0)
+    async with httpx.AsyncClient(base_url=origin, timeout=timeout) as heavy, \
+            httpx.AsyncClient(base_url=origin, timeout=timeout) as light:
+        small = (await light.post("/lorebooks", json={"name": "Small",
+                                                      "entries": make_entries(20)})).json()
+        urls = {"GET /health": "/health",
+                "GET /lorebooks/{id}/entries": f"/lorebooks/{small['id']}/entries?limit=20"}
+        samples: Dict[str, List[float]] = {name: [] for name in urls}
+        done = asyncio.Event()
+        pollers = [
+            asyncio.create_task(_poll(light, url, interval, done, samples[name]))
+            for name, url in urls.items()
+        ]
+
+        started = time.perf_counter()
+        created = await heavy.post("/lorebooks", content=payload,
+                                   headers={"Content-Type": "application/json"})
+        created.raise_for_status()
+        create_s = time.perf_counter() - started
+        started = time.perf_counter()
+        imported = await heavy.post(f"/lorebooks/{created.json()['id']}/import",
+                                    content=ndjson,
+                                    headers={"Content-Type": "application/x-ndjson"})
+        imported.raise_for_status()
+        import_s = time.perf_counter() - started
+
+        done.set()
+        await asyncio.gather(*pollers)
+
+    def summary(values: List[float]) -> Dict:
+        ordered = sorted(values)
+        return {
+            "count": len(values),
+            "p50_ms": round(statistics.median(ordered), 2),
+            "p99_ms": round(ordered[int(len(ordered) * 0.99) - 1], 2),
+            "max_ms": round(ordered[-1], 2),
+        }
+
+    return {
+        "create_s": round(create_s, 2),
+        "import_s": round(import_s, 2),
+        "small": {name: summary(values) for name, values in samples.items()},
+    }
+
+
+def _child(args) -> None:
+    from src.app import create_app
+
+    with serve(create_app()) as origin:
+        result = asyncio.run(_drive(origin, args.entries, args.interval))
+    print(json.dumps(result))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=50_000)
+    parser.add_argument("--interval", type=float, default=0.005)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args)
+        return
+
+    modes = {"inline on the event loop": "0", "worker pool": ""}
+    for label, threads in modes.items():
+        env = dict(os.environ, LOREMASTER_SESSION_SECRET="bench" * 8)
+        if threads:
+            env["LOREMASTER_WORKER_THREADS"] = threads
+        else:
+            env.pop("LOREMASTER_WORKER_THREADS", None)
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_offload", "--child",
+             "--entries", str(args.entries), "--interval", str(args.interval)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output)
+        print(f"{label}: create {result['create_s']}s, import {result['import_s']}s")
+        for name, stats in result["small"].items():
+            print(f"  {name:<30} n={stats['count']:<5} p50 {stats['p50_ms']:>8}ms  "
+                  f"p99 {stats['p99_ms']:>8}ms  max {stats['max_ms']:>8}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Requests per second for repeated reads of an unchanged lorebook and library,
+served from the store's cached bytes versus the response_model path (fresh
+model + validation + serialization on every request).
+
+Usage: python -m benchmarks.bench_reads [--entries 50 2000] [--seconds 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List
+
+import httpx
+
+from src.app import create_app
+from src.models import Lorebook, LorebookMeta
+
+from .server import serve
+from .synthetic import make_entries
+
+
+def _rps(client: httpx.Client, url: str, seconds: float) -> float:
+    client.get(url).raise_for_status()  # warm caches
+    done = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        client.get(url)
+        done += 1
+    return done / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, nargs="+", default=[50, 2000])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    app = create_app()
+    store = app.state.store
+
+    # The pre-cache behaviour, kept here only as a baseline.
+    @app.get("/baseline/lorebooks", response_model=List[LorebookMeta])
+    async def baseline_library():
+        return store.list_library()
+
+    @app.get("/baseline/lorebooks/{lorebook_id}", response_model=Lorebook)
+    async def baseline_book(lorebook_id: str):
+        return store.get_lorebook(lorebook_id)
+
+    books = [
+        store.create_lorebook(f"Bench {count}", make_entries(count))
+        for count in args.entries
+    ]
+
+    cases = [("GET /lorebooks", "/lorebooks", "/baseline/lorebooks")]
+    for book in books:
+        cases.append(
+            (
+                f"GET /lorebooks/{{id}} ({len(book.entries)} entries)",
+                f"/lorebooks/{book.id}",
+                f"/baseline/lorebooks/{book.id}",
+            )
+        )
+
+    with serve(app) as base_url, httpx.Client(base_url=base_url, timeout=120) as client:
+        print(f"{'route':<36} {'response_model':>15} {'cached':>10} {'speedup':>8}")
+        for label, cached_url, baseline_url in cases:
+            before = _rps(client, baseline_url, args.seconds)
+            after = _rps(client, cached_url, args.seconds)
+            print(
+                f"{label:<36} {before:>11.0f} rps {after:>6.0f} rps {after / before:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Keyword scan throughput: compiled matcher vs a naive per-key regex loop, and
+recursive scans (where activated entries' content is scanned again) vs
+walking the whole recursion buffer with the automata.
+
+Usage: python -m benchmarks.bench_scan [--entries 5000] [--scans 10] [--recursion 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+
+from src.models import LoreEntry
+from src.services.activation import KeywordMatcher
+
+from .synthetic import make_entries
+
+
+def naive_scan(entries, messages, depth):
+    window = "\n".join(messages[-depth:]).lower()
+    hits = []
+    for entry in entries:
+        for key in entry.key:
+            if re.search(rf"(?:^|\W)({re.escape(key.lower())})(?:$|\W)", window):
+                hits.append(entry)
+                break
+    return hits
+
+
+class FullBufferMatcher(KeywordMatcher):
+    """Searches recursion buffers character by character, like the first pass."""
+
+    def _search_buffer(self, text):
+        return {
+            "cs": self._search(self._sensitive, [text], lower=False),
+            "ci": self._search(self._insensitive, [text], lower=True),
+        }
+
+
+def bench_recursion(args) -> None:
+    # Keys shared across the book, as in the suite's scan: nearly every entry
+    # activates, so the recursion buffer holds most of the book's content.
+    entries = [LoreEntry(**item) for item in make_entries(args.entries, field_mix=0.15)]
+    chat = [" ".join(entry.key + ["and", "so", "on"]) for entry in entries[:4]]
+    results = {}
+    for label, matcher in (
+        ("distinct words", KeywordMatcher(entries)),
+        ("whole buffer", FullBufferMatcher(entries)),
+    ):
+        started = time.perf_counter()
+        for _ in range(args.scans):
+            hits = matcher.scan(chat, 4, args.recursion, random.Random(1))
+        elapsed = time.perf_counter() - started
+        results[label] = {entry.uid for entry in hits}
+        print(f"recursive scan, {label + ':':16}{elapsed / args.scans * 1000:.2f}ms"
+              f" ({len(hits)} activated)")
+    assert results["distinct words"] == results["whole buffer"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--scans", type=int, default=10)
+    parser.add_argument("--recursion", type=int, default=3, help="maxRecursion of the recursive case")
+    args = parser.parse_args()
+
+    raw = make_entries(args.entries)
+    # Real books key on names: give every entry its own keys so the key set
+    # grows with the book and a chat only mentions a handful of them.
+    for item in raw:
+        item["key"] = [f"{word}{item['uid']}" for word in item["key"]]
+    entries = [LoreEntry(**item, selective=False) for item in raw]
+
+    rng = random.Random(7)
+    chats = []
+    for _ in range(args.scans):
+        chat = []
+        for _ in range(4):
+            words = raw[rng.randrange(len(raw))]["content"].split()[:40]
+            words.append(rng.choice(raw)["key"][0])
+            chat.append(" ".join(words))
+        chats.append(chat)
+
+    started = time.perf_counter()
+    matcher = KeywordMatcher(entries)
+    compile_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for chat in chats:
+        compiled_hits = matcher.scan(chat, 4)
+    compiled_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for chat in chats:
+        naive_hits = naive_scan(entries, chat, 4)
+    naive_s = time.perf_counter() - started
+
+    assert {e.uid for e in compiled_hits} == {e.uid for e in naive_hits}
+    print(f"entries:            {args.entries}")
+    print(f"compile (once):     {compile_s * 1000:.1f}ms")
+    print(f"compiled per scan:  {compiled_s / args.scans * 1000:.2f}ms")
+    print(f"naive per scan:     {naive_s / args.scans * 1000:.2f}ms")
+    bench_recursion(args)
+
+
+if __name__ == "__main__":
+    main()
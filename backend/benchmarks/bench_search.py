@@ -0,0 +1,51 @@
+"""
+Search latency as books grow, plus the cost of keeping the index current.
+
+Usage: python -m benchmarks.bench_search [--sizes 1000 10000 50000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from src.services.store import LorebookStore
+
+from .synthetic import make_entries
+
+
+def _avg_ms(fn, runs):
+    started = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - started) / runs * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    print(f"{'entries':>8} {'rare q':>9} {'prefix q':>9} {'common q':>9} {'edit':>9}")
+    for size in args.sizes:
+        store = LorebookStore()
+        book = store.create_lorebook("Bench", make_entries(size))
+        store.search(book.id, "warmup")  # builds the index once
+
+        uids = [entry.uid for entry in book.entries]
+        rare = _avg_ms(lambda: store.search(book.id, str(rng.randrange(size))), 200)
+        prefix = _avg_ms(lambda: store.search(book.id, "entry 12"), 50)
+        common = _avg_ms(lambda: store.search(book.id, "dragon queen", limit=20), 5)
+
+        def edit():
+            uid = rng.choice(uids)
+            store.update_entry(book.id, uid, {"comment": "edited", "content": "new text"})
+
+        edit_ms = _avg_ms(edit, 200)
+        print(f"{size:>8} {rare:>8.3f}ms {prefix:>8.3f}ms {common:>8.3f}ms {edit_ms:>8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
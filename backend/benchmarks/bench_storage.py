@@ -0,0 +1,64 @@
+"""
+Write latency and cold-start time for the SQLite storage backend.
+
+Usage: python -m benchmarks.bench_storage [--entries 10000] [--writes 500]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from src.services.storage import SQLiteStorage
+from src.services.store import LorebookStore
+
+from .synthetic import make_entries
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=10_000)
+    parser.add_argument("--writes", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.sqlite3")
+        store = LorebookStore(SQLiteStorage(path))
+
+        started = time.perf_counter()
+        book = store.create_lorebook("Bench", make_entries(args.entries))
+        import_s = time.perf_counter() - started
+
+        uids = [entry.uid for entry in book.entries]
+        latencies = []
+        for i in range(args.writes):
+            uid = uids[i % len(uids)]
+            payload = {"uid": uid, "comment": f"edit {i}", "content": "x" * 400}
+            t0 = time.perf_counter()
+            store.update_entry(book.id, uid, payload)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        store.close()
+
+        started = time.perf_counter()
+        reopened = LorebookStore(SQLiteStorage(path))
+        cold_start_s = time.perf_counter() - started
+        assert len(reopened.get_lorebook(book.id).entries) == args.entries
+        reopened.close()
+
+    print(f"entries:          {args.entries}")
+    print(f"initial import:   {import_s:.3f}s")
+    print(f"update p50:       {statistics.median(latencies):.3f}ms")
+    print(f"update p99:       {_percentile(latencies, 0.99):.3f}ms")
+    print(f"cold start:       {cold_start_s:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Process RSS while thousands of signed-in users each create and read their
+own lorebook, with and without a tenant memory budget.
+
+Each user is a distinct session token, so every request goes through tenant
+lookup, lazy load and (when over budget) LRU eviction. Every layout runs in
+a fresh subprocess so allocations from one do not mask the other.
+
+Usage: python -m benchmarks.bench_tenants [--tenants 2000] [--budget-mb 32]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+import httpx
+
+from .synthetic import make_entries
+
+
+def _rss_mib() -> float:
+    try:
+        with open("/proc/self/statm") as handle:
+            pages = int(handle.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:  # not Linux: fall back to the peak
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _drive(tenants: int, entries: int, samples: int) -> dict:
+    from src.app import create_app
+    from src.services.sessions import SessionUser
+
+    app = create_app()
+    sessions = app.state.sessions
+    book_entries = make_entries(entries)
+    curve = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(tenants):
+            token = sessions.issue(SessionUser(str(i), f"user{i}")).access_token
+            headers = {"Authorization": f"Bearer {token}"}
+            created = await client.post(
+                "/lorebooks", json={"name": f"Book {i}", "entries": book_entries},
+                headers=headers,
+            )
+            await client.get(f"/lorebooks/{created.json()['id']}", headers=headers)
+            if (i + 1) % max(1, tenants // samples) == 0:
+                curve.append((i + 1, round(_rss_mib(), 1)))
+        metrics = (await client.get("/health/memory")).json()
+    return {"curve": curve, "metrics": metrics}
+
+
+def _child(args) -> None:
+    result = asyncio.run(_drive(args.tenants, args.entries, args.samples))
+    print(json.dumps(result))
+
+
+def _run(budget_mb: int, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            LOREMASTER_DATA_DIR=tmp,
+            LOREMASTER_MEMORY_BUDGET_MB=str(budget_mb),
+            LOREMASTER_SESSION_SECRET="bench" * 8,
+        )
+        output = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.bench_tenants", "--child",
+                "--tenants", str(args.tenants), "--entries", str(args.entries),
+                "--samples", str(args.samples),
+            ],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+    return json.loads(output)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenants", type=int, default=2000)
+    parser.add_argument("--entries", type=int, default=100, help="entries per book")
+    parser.add_argument("--budget-mb", type=int, default=32)
+    parser.add_argument("--samples", type=int, default=8)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args)
+        return
+
+    runs = {
+        f"budget {args.budget_mb} MiB": args.budget_mb,
+        "unbounded": 1024 * 1024,
+    }
+    for label, budget in runs.items():
+        result = _run(budget, args)
+        metrics = result["metrics"]
+        print(f"{label}: {metrics['tenants']} tenants open, "
+              f"{metrics['approxBytes'] / 1024 / 1024:.1f} MiB estimated, "
+              f"{metrics['evictions']} evictions")
+        print("  tenants  RSS")
+        for done, rss in result["curve"]:
+            print(f"  {done:>7}  {rss:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Throughput and read consistency with 1..N uvicorn worker processes sharing
+one SQLite database.
+
+Each run starts `uvicorn src.main:app --workers N` on a fresh database, then
+several client processes drive a mixed workload (mostly GET /lorebooks/{id},
+some entry edits). After every edit the client reads the book back on a new
+connection, which usually lands on a different worker, and counts a stale
+read if the returned version is older than the one the edit produced.
+
+Usage: python -m benchmarks.bench_workers [--workers 1 2 4] [--seconds 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+from .server import free_port
+from .synthetic import make_entries
+
+
+def _start(workers: int, db_path: str) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    # Every client reads the whole book, which admission control would
+    # queue and shed; this measures the workers themselves.
+    env = dict(os.environ, LOREMASTER_DB_PATH=db_path, LOREMASTER_HEAVY_CONCURRENCY="0")
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "src.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/lorebooks", timeout=1).raise_for_status()
+            return proc, base_url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+def _version(response: httpx.Response) -> int:
+    return int(response.headers["etag"].strip('"').lstrip("v"))
+
+
+async def _client_loop(
+    base_url: str, book_id: str, uids: List[int], seconds: float, write_ratio: float,
+    seed: int,
+) -> Dict[str, int]:
+    rng = random.Random(seed)
+    stats = {"requests": 0, "writes": 0, "stale": 0}
+    deadline = time.monotonic() + seconds
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        while time.monotonic() < deadline:
+            if rng.random() < write_ratio:
+                uid = rng.choice(uids)
+                response = await client.put(
+                    f"/lorebooks/{book_id}/entries/{uid}",
+                    json={"uid": uid, "comment": f"edit {rng.random()}", "content": "x"},
+                )
+                written = response.json()["lorebook"]["version"]
+                # New connection, so the read may be served by another worker.
+                async with httpx.AsyncClient(base_url=base_url, timeout=30) as fresh:
+                    check = await fresh.get(f"/lorebooks/{book_id}")
+                stats["writes"] += 1
+                stats["requests"] += 2
+                if _version(check) < written:
+                    stats["stale"] += 1
+            else:
+                await client.get(f"/lorebooks/{book_id}")
+                stats["requests"] += 1
+    return stats
+
+
+def _client_process(args) -> Dict[str, int]:
+    base_url, book_id, uids, seconds, write_ratio, concurrency, seed = args
+
+    async def run() -> List[Dict[str, int]]:
+        return await asyncio.gather(
+            *(
+                _client_loop(base_url, book_id, uids, seconds, write_ratio, seed * 100 + i)
+                for i in range(concurrency)
+            )
+        )
+
+    totals = {"requests": 0, "writes": 0, "stale": 0}
+    for stats in asyncio.run(run()):
+        for key, value in stats.items():
+            totals[key] += value
+    return totals
+
+
+def _run(workers: int, args) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        proc, base_url = _start(workers, os.path.join(tmp, "bench.sqlite3"))
+        try:
+            created = httpx.post(
+                f"{base_url}/lorebooks",
+                json={"name": "Bench", "entries": make_entries(args.entries)},
+                timeout=60,
+            ).json()
+            uids = [entry["uid"] for entry in created["entries"]]
+
+            jobs = [
+                (base_url, created["id"], uids, args.seconds, args.write_ratio,
+                 args.concurrency, seed)
+                for seed in range(args.clients)
+            ]
+            started = time.perf_counter()
+            with multiprocessing.Pool(args.clients) as pool:
+                results = pool.map(_client_process, jobs)
+            elapsed = time.perf_counter() - started
+
+            # Every worker must now agree on the book's version.
+            versions = set()
+            for _ in range(workers * 8):
+                versions.add(_version(httpx.get(f"{base_url}/lorebooks/{created['id']}")))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    totals = {key: sum(result[key] for result in results) for key in results[0]}
+    return {
+        "rps": totals["requests"] / elapsed,
+        "writes": totals["writes"],
+        "stale": totals["stale"],
+        "final_versions": len(versions),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--entries", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=4, help="client processes")
+    parser.add_argument("--concurrency", type=int, default=8, help="per client process")
+    parser.add_argument("--write-ratio", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"cpus: {os.cpu_count()}")
+    print(f"{'workers':>7} {'rps':>9} {'writes':>7} {'stale reads':>12} {'final versions':>15}")
+    for workers in args.workers:
+        result = _run(workers, args)
+        print(
+            f"{workers:>7} {result['rps']:>9.0f} {result['writes']:>7} "
+            f"{result['stale']:>12} {result['final_versions']:>15}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,544 @@
+"""
+End-to-end benchmark of every API route, for catching regressions.
+
+A synthetic lorebook (size and shape set on the command line) is created
+through the API, then each scenario is called `--iterations` times, in
+process through the ASGI app and/or over real HTTP against uvicorn. Each
+transport gets a fresh app. Read scenarios run before mutations, so the
+mutations do not invalidate caches for the reads. The change stream is only
+measured over HTTP: the in-process transport buffers a response until it
+ends, and a stream never does.
+
+For every scenario the report gives throughput, p50/p95/p99 latency and the
+peak Python heap allocated while it ran (tracemalloc, measured in a separate
+short pass so tracing does not skew the timings), each the median of
+`--runs` back-to-back measurements so one noisy run does not decide. The
+report is JSON. With `--baseline`, results are compared with a stored report
+and the exit status is 1 when any scenario is slower or uses more memory than
+the threshold plus an absolute noise floor allows.
+
+`--save-baseline` only adds scenarios the stored baseline does not have yet;
+existing numbers stay put, so a slowdown cannot be recorded over. Timings only
+compare well with a baseline taken on the same machine: when the hardware
+changes, rewrite the whole file with `--replace-baseline`.
+
+The Discord OAuth callback is not covered; see bench_discord.
+
+Usage:
+    python -m benchmarks.suite [--entries 1000] [--content-words 60] [--keys 3]
+        [--field-mix 0.15] [--iterations 200] [--transport asgi|http|both]
+        [--runs 3] [--output report.json] [--baseline benchmarks/baseline.json]
+        [--save-baseline | --replace-baseline] [--threshold 0.25]
+        [--noise-floor-ms 0.2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from .server import serve
+from .synthetic import make_entries
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+MEMORY_ITERATIONS = 10
+# Sub-millisecond routes jitter by more than any sensible threshold.
+NOISE_FLOOR_MS = 0.2
+# Small heaps are noisy too.
+MEMORY_NOISE_FLOOR_KIB = 64
+
+Context = Dict[str, Any]
+Call = Callable[[httpx.AsyncClient, Context, int], Awaitable[httpx.Response]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    call: Call
+    # Untimed preparation before each call (e.g. creating what it deletes).
+    setup: Optional[Call] = None
+    transports: Tuple[str, ...] = ("asgi", "http")
+
+
+def _book(ctx: Context) -> str:
+    return f"/lorebooks/{ctx['book_id']}"
+
+
+def _uid(ctx: Context, i: int) -> int:
+    return ctx["uids"][i % len(ctx["uids"])]
+
+
+async def _add_scratch_entry(client: httpx.AsyncClient, ctx: Context, i: int):
+    response = await client.post(
+        f"{_book(ctx)}/entries", json={"comment": f"scratch {i}", "key": ["scratch"]}
+    )
+    ctx["scratch_uid"] = response.json()["entry"]["uid"]
+    return response
+
+
+async def _create_scratch_book(client: httpx.AsyncClient, ctx: Context, i: int):
+    response = await client.post("/lorebooks", json={"name": f"Scratch {i}"})
+    ctx["scratch_book"] = response.json()["id"]
+    return response
+
+
+def _scenarios() -> List[Scenario]:
+    """Every route, reads first, then mutations."""
+
+    def get(path: Callable[[Context, int], str], **kwargs: Any) -> Call:
+        async def call(client: httpx.AsyncClient, ctx: Context, i: int):
+            return await client.get(path(ctx, i), **kwargs)
+
+        return call
+
+    def conditional(path: Callable[[Context], str]) -> Call:
+        async def call(client: httpx.AsyncClient, ctx: Context, i: int):
+            url = path(ctx)
+            return await client.get(url, headers={"If-None-Match": ctx["etags"][url]})
+
+        return call
+
+    async def auth_me(client: httpx.AsyncClient, ctx: Context, i: int):
+        return await client.get("/auth/me", headers=ctx["auth"])
+
+    async def scan(client: httpx.AsyncClient, ctx: Context, i: int):
+        return await client.post(f"{_book(ctx)}/scan", json=ctx["scan"])
+
+    async def set_active(client: httpx.AsyncClient, ctx: Context, i: int):
+        return await client.put(f"/active-lorebook/{ctx['book_id']}")
+
+    async def clear_active(client: httpx.AsyncClient, ctx: Context, i: int):
+        return await client.delete("/active-lorebook")
+
+    async def rename(client: httpx.AsyncClient, ctx: Context, i: int):
+        return await client.patch(_book(ctx), json={"name": f"Bench {i}"})
+
+    async def stream_change(client: httpx.AsyncClient, ctx: Context, i: int):
+        # From an edit to its event arriving on an open stream, including the
+        # coalescing window.
+        async with client.stream("GET", "/changes") as stream:
+            lines = stream.aiter_lines()
+            await anext(lines)  # the retry frame; the stream is subscribed
+            await client.patch(_book(ctx), json={"name": f"Streamed {i}"})
+            async for line in lines:
+                if line == "event: change":
+                    break
+        return stream
+
+    async def add_entry(client: httpx.AsyncClient, ctx: Context, i: int):
+        return await client.post(f"{_book(ctx)}/entries", json=ctx["new_entry"])
+
+    async def update_entry(client: httpx.AsyncClient, ctx: Context, i: int):
+        uid = _uid(ctx, i)
+        return await client.put(
+            f"{_book(ctx)}/entries/{uid}",
+            json={**ctx["entries"][uid % len(ctx["entries"])], "uid": uid, "order": i},
+        )
+
+    async def delete_entry(client: httpx.AsyncClient, ctx: Context, i: int):
+        return await client.delete(f"{_book(ctx)}/entries/{ctx['scratch_uid']}")
+
+    async def batch(client: httpx.AsyncClient, ctx: Context, i: int):
+        operations = [
+            {"op": "update", "uid": _uid(ctx, i * 10 + n), "entry": {"order": n}}
+            for n in range(10)
+        ]
+        return await client.post(
+            f"{_book(ctx)}/entries:batch", json={"operations": operations}
+        )
+
+    async def import_ndjson(client: httpx.AsyncClient, ctx: Context, i: int):
+        return await client.post(
+            f"/lorebooks/{ctx['import_book']}/import",
+            content=ctx["ndjson"],
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+    async def create(client: httpx.AsyncClient, ctx: Context, i: int):
+        return await client.post(
+            "/lorebooks", json={"name": f"Created {i}", "entries": ctx["small_book"]}
+        )
+
+    async def delete_book(client: httpx.AsyncClient, ctx: Context, i: int):
+        return await client.delete(f"/lorebooks/{ctx['scratch_book']}")
+
+    async def refresh(client: httpx.AsyncClient, ctx: Context, i: int):
+        # Refresh tokens are single use; carry the rotated one forward.
+        response = await client.post(
+            "/auth/refresh", json={"refresh_token": ctx["refresh_token"]}
+        )
+        if response.status_code == 200:
+            ctx["refresh_token"] = response.json()["refresh_token"]
+        return response
+
+    return [
+        Scenario("GET /", get(lambda ctx, i: "/")),
+        Scenario("GET /health", get(lambda ctx, i: "/health")),
+        Scenario("GET /health/memory", get(lambda ctx, i: "/health/memory")),
+        Scenario("GET /metrics", get(lambda ctx, i: "/metrics")),
+        Scenario("GET /auth/login/discord", get(lambda ctx, i: "/auth/login/discord")),
+        Scenario("GET /auth/me", auth_me),
+        Scenario("GET /lorebooks", get(lambda ctx, i: "/lorebooks")),
+        Scenario("GET /lorebooks (304)", conditional(lambda ctx: "/lorebooks")),
+        Scenario(
+            "GET /lorebooks (page by name)",
+            get(lambda ctx, i: "/lorebooks", params={"sort": "name", "limit": 50}),
+        ),
+        Scenario(
+            "GET /lorebooks (next page)",
+            get(lambda ctx, i: f"/lorebooks?limit=1&cursor={ctx['library_cursor']}"),
+        ),
+        Scenario("GET /lorebooks/{id}", get(lambda ctx, i: _book(ctx))),
+        Scenario("GET /lorebooks/{id} (304)", conditional(_book)),
+        Scenario(
+            "GET /lorebooks/{id}/changes",
+            get(lambda ctx, i: f"{_book(ctx)}/changes?since={ctx['version']}"),
+        ),
+        *[
+            Scenario(
+                f"GET /lorebooks/{{id}}/export ({fmt})",
+                get(lambda ctx, i, fmt=fmt: f"{_book(ctx)}/export?format={fmt}"),
+            )
+            for fmt in ("native", "sillytavern", "ndjson")
+        ],
+        Scenario(
+            "GET /lorebooks/{id}/entries",
+            get(lambda ctx, i: f"{_book(ctx)}/entries?limit=100"),
+        ),
+        Scenario(
+            "GET /lorebooks/{id}/entries (sorted, fields)",
+            get(
+                lambda ctx, i: f"{_book(ctx)}/entries?sort=order&direction=desc"
+                "&limit=100&fields=comment,key"
+            ),
+        ),
+        Scenario(
+            "GET /lorebooks/{id}/search",
+            get(lambda ctx, i: f"{_book(ctx)}/search", params={"q": "dragon temple"}),
+        ),
+        Scenario("POST /lorebooks/{id}/scan", scan),
+        Scenario(
+            "GET /lorebooks/{id}/budget",
+            get(lambda ctx, i: f"{_book(ctx)}/budget?budget=4096"),
+        ),
+        Scenario(
+            "GET /lorebooks/{id}/duplicates",
+            get(lambda ctx, i: f"{_book(ctx)}/duplicates"),
+        ),
+        Scenario("GET /lorebooks:duplicates", get(lambda ctx, i: "/lorebooks:duplicates")),
+        Scenario(
+            "GET /lorebooks/{id}/import",
+            get(lambda ctx, i: f"/lorebooks/{ctx['import_book']}/import"),
+        ),
+        Scenario("GET /active-lorebook", get(lambda ctx, i: "/active-lorebook")),
+        Scenario("PUT /active-lorebook/{id}", set_active),
+        Scenario("DELETE /active-lorebook", clear_active),
+        Scenario("POST /auth/refresh", refresh),
+        Scenario("PATCH /lorebooks/{id}", rename),
+        Scenario("GET /changes (edit to event)", stream_change, transports=("http",)),
+        Scenario("POST /lorebooks/{id}/entries", add_entry),
+        Scenario("PUT /lorebooks/{id}/entries/{uid}", update_entry),
+        Scenario(
+            "DELETE /lorebooks/{id}/entries/{uid}", delete_entry, setup=_add_scratch_entry
+        ),
+        Scenario("POST /lorebooks/{id}/entries:batch (10 ops)", batch),
+        Scenario("POST /lorebooks/{id}/import (100 entries)", import_ndjson),
+        Scenario("POST /lorebooks (50 entries)", create),
+        Scenario("DELETE /lorebooks/{id}", delete_book, setup=_create_scratch_book),
+    ]
+
+
+async def _prepare(client: httpx.AsyncClient, app: Any, args) -> Context:
+    from src.services.sessions import SessionUser
+
+    entries = make_entries(
+        args.entries,
+        content_words=args.content_words,
+        key_count=args.keys,
+        field_mix=args.field_mix,
+    )
+    response = await client.post("/lorebooks", json={"name": "Bench", "entries": entries})
+    response.raise_for_status()
+    book = response.json()
+    imported = await client.post("/lorebooks", json={"name": "Import target"})
+    tokens = app.state.sessions.issue(SessionUser("1", "bench"))
+    extra = make_entries(
+        100, seed=99, content_words=args.content_words,
+        key_count=args.keys, field_mix=args.field_mix,
+    )
+    ctx: Context = {
+        "book_id": book["id"],
+        "uids": [entry["uid"] for entry in book["entries"]],
+        "entries": entries,
+        "version": book["version"],
+        "import_book": imported.json()["id"],
+        "auth": {"Authorization": f"Bearer {tokens.access_token}"},
+        "refresh_token": tokens.refresh_token,
+        "new_entry": {key: value for key, value in extra[0].items() if key != "uid"},
+        "ndjson": "\n".join(
+            json.dumps({k: v for k, v in entry.items() if k != "uid"}) for entry in extra
+        ).encode(),
+        "small_book": extra[:50],
+        "scan": {
+            "messages": [" ".join(entry["key"] + ["and", "so", "on"]) for entry in extra[:4]],
+            "seed": 1,
+        },
+        "etags": {},
+    }
+    # Gives the import progress route something to report.
+    await client.post(
+        f"/lorebooks/{ctx['import_book']}/import",
+        content=ctx["ndjson"],
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    for url in ("/lorebooks", _book(ctx)):
+        ctx["etags"][url] = (await client.get(url)).headers["ETag"]
+    first_page = await client.get("/lorebooks", params={"limit": 1})
+    ctx["library_cursor"] = first_page.headers["X-Next-Cursor"]
+    return ctx
+
+
+def _percentile(samples: List[float], pct: int) -> float:
+    if len(samples) < 2:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+async def _measure(
+    client: httpx.AsyncClient, ctx: Context, scenario: Scenario, iterations: int
+) -> Dict[str, float]:
+    if scenario.setup:  # one untimed call to warm caches
+        await scenario.setup(client, ctx, -1)
+    await scenario.call(client, ctx, -1)
+
+    samples: List[float] = []
+    busy = 0.0
+    for i in range(iterations):
+        if scenario.setup:
+            await scenario.setup(client, ctx, i)
+        started = time.perf_counter()
+        response = await scenario.call(client, ctx, i)
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f"{scenario.name}: HTTP {response.status_code} {response.text[:200]}"
+            )
+        busy += elapsed
+        samples.append(elapsed * 1000)
+
+    # Separate pass for memory: tracemalloc slows allocation-heavy code down.
+    tracemalloc.start()
+    floor = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    for i in range(iterations, iterations + MEMORY_ITERATIONS):
+        if scenario.setup:
+            await scenario.setup(client, ctx, i)
+        await scenario.call(client, ctx, i)
+    peak = tracemalloc.get_traced_memory()[1] - floor
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "throughput_rps": round(iterations / busy, 1),
+        "p50_ms": round(_percentile(samples, 50), 3),
+        "p95_ms": round(_percentile(samples, 95), 3),
+        "p99_ms": round(_percentile(samples, 99), 3),
+        "peak_mem_kib": round(max(peak, 0) / 1024, 1),
+    }
+
+
+async def _run_transport(transport: str, args) -> Dict[str, Dict[str, float]]:
+    from src.app import create_app
+
+    app = create_app()
+    results: Dict[str, Dict[str, float]] = {}
+
+    async def drive(client: httpx.AsyncClient) -> None:
+        ctx = await _prepare(client, app, args)
+        for scenario in _scenarios():
+            if transport not in scenario.transports:
+                continue
+            if args.only and not any(part in scenario.name for part in args.only):
+                continue
+            runs = [
+                await _measure(client, ctx, scenario, args.iterations)
+                for _ in range(args.runs)
+            ]
+            results[scenario.name] = _median(runs)
+            print(f"  {scenario.name:<48} {results[scenario.name]['p50_ms']:>9.3f}ms p50",
+                  file=sys.stderr)
+
+    if transport == "asgi":
+        asgi = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=asgi, base_url="http://bench") as client:
+            await drive(client)
+    else:
+        with serve(app) as origin:
+            async with httpx.AsyncClient(base_url=origin) as client:
+                await drive(client)
+    app.state.tenants.close()
+    return results
+
+
+def _median(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    """Each metric's median over repeated measurements of one scenario."""
+    result = {metric: statistics.median(run[metric] for run in runs) for metric in runs[0]}
+    result["runs"] = len(runs)
+    return result
+
+
+def _slower(
+    current_ms: float, previous_ms: float, threshold: float, floor_ms: float
+) -> bool:
+    return current_ms > previous_ms * (1 + threshold) + floor_ms
+
+
+def compare(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+    floor_ms: float = NOISE_FLOOR_MS,
+) -> List[str]:
+    """Human-readable regressions of `report` against `baseline`."""
+    regressions = []
+    for transport, scenarios in report["results"].items():
+        for name, current in scenarios.items():
+            previous = baseline.get("results", {}).get(transport, {}).get(name)
+            if previous is None:
+                continue
+            checks = [
+                (metric, _slower(current[metric], previous[metric], threshold, floor_ms))
+                for metric in ("p50_ms", "p95_ms")
+            ]
+            checks.append((
+                "throughput_rps",
+                _slower(
+                    1000 / current["throughput_rps"],
+                    1000 / previous["throughput_rps"],
+                    threshold,
+                    floor_ms,
+                ),
+            ))
+            checks.append((
+                "peak_mem_kib",
+                current["peak_mem_kib"]
+                > max(
+                    previous["peak_mem_kib"] * (1 + threshold),
+                    previous["peak_mem_kib"] + MEMORY_NOISE_FLOOR_KIB,
+                ),
+            ))
+            for metric, failed in checks:
+                if failed:
+                    regressions.append(
+                        f"{transport} {name}: {metric} {previous[metric]} -> {current[metric]}"
+                    )
+    return regressions
+
+
+def merge_baseline(baseline: Dict[str, Any], report: Dict[str, Any]) -> Dict[str, Any]:
+    """`baseline` plus the scenarios only `report` has; stored numbers win."""
+    merged = json.loads(json.dumps(baseline))
+    for transport, scenarios in report["results"].items():
+        stored = merged["results"].setdefault(transport, {})
+        for name, result in scenarios.items():
+            stored.setdefault(name, result)
+    return merged
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--content-words", type=int, default=60)
+    parser.add_argument("--keys", type=int, default=3, help="primary keys per entry")
+    parser.add_argument(
+        "--field-mix", type=float, default=0.15,
+        help="chance of each group of non-default entry settings",
+    )
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=3,
+                        help="measurements per scenario; the report holds their medians")
+    parser.add_argument("--transport", choices=["asgi", "http", "both"], default="both")
+    parser.add_argument("--only", nargs="+", help="run scenarios whose name contains any of these")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="compare with this report (default: stored baseline)",
+                        nargs="?", const=DEFAULT_BASELINE)
+    saving = parser.add_mutually_exclusive_group()
+    saving.add_argument("--save-baseline", action="store_true",
+                        help=f"add scenarios missing from {os.path.relpath(DEFAULT_BASELINE)}")
+    saving.add_argument("--replace-baseline", action="store_true",
+                        help="rewrite the whole stored baseline (after a hardware change)")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative slowdown before a scenario counts as a regression")
+    parser.add_argument("--noise-floor-ms", type=float, default=NOISE_FLOOR_MS,
+                        help="absolute slowdown always tolerated on top of the threshold")
+    args = parser.parse_args()
+
+    # Stable settings so runs are comparable; an explicit environment wins.
+    os.environ.setdefault("LOREMASTER_SESSION_SECRET", "benchmark" * 4)
+    os.environ.setdefault("DISCORD_CLIENT_ID", "benchmark")
+
+    transports = ["asgi", "http"] if args.transport == "both" else [args.transport]
+    report: Dict[str, Any] = {
+        "meta": {
+            "config": {
+                "entries": args.entries,
+                "content_words": args.content_words,
+                "keys": args.keys,
+                "field_mix": args.field_mix,
+                "iterations": args.iterations,
+            },
+            "runs": args.runs,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": {},
+    }
+    for transport in transports:
+        print(f"{transport}:", file=sys.stderr)
+        report["results"][transport] = asyncio.run(_run_transport(transport, args))
+    report["meta"]["max_rss_mib"] = round(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+    )
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE) as handle:
+            text = json.dumps(merge_baseline(json.load(handle), report), indent=2)
+    if args.save_baseline or args.replace_baseline:
+        with open(DEFAULT_BASELINE, "w") as handle:
+            handle.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        if baseline["meta"]["config"] != report["meta"]["config"]:
+            print("warning: baseline was taken with a different configuration",
+                  file=sys.stderr)
+        regressions = compare(report, baseline, args.threshold, args.noise_floor_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.threshold:.0%} of the baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Synthetic lorebook data shared by the benchmark scripts."""
+
+from __future__ import annotations
+
+import random
+from typing import Any, Callable, Dict, List, Tuple
+
+_WORDS = (
+    "ancient kingdom river dragon shadow mage guild forest tower oath blade "
+    "empire harbor relic storm queen knight ruin spirit market winter crown "
+    "temple exile beacon serpent frontier archive hollow ember citadel veil"
+).split()
+
+
+# Non-default settings seen in real SillyTavern books, each applied to an entry
+# with probability `field_mix`. The last one is a third-party extra key.
+_OPTIONAL_FIELDS: Tuple[Callable[[random.Random], Dict[str, Any]], ...] = (
+    lambda rng: {"keysecondary": rng.sample(_WORDS, 2), "selectiveLogic": rng.randint(0, 3)},
+    lambda rng: {"constant": True},
+    lambda rng: {"position": rng.randint(0, 4), "depth": rng.randint(1, 8)},
+    lambda rng: {"useProbability": True, "probability": rng.randint(10, 99)},
+    lambda rng: {"disabled": True},
+    lambda rng: {"group": rng.choice(_WORDS), "groupWeight": rng.randint(1, 100)},
+    lambda rng: {"caseSensitive": True, "matchWholeWords": False},
+    lambda rng: {"scanDepth": rng.randint(1, 10)},
+    lambda rng: {"extensions": {"display_index": rng.randint(0, 1000), "vectorized": False}},
+)
+
+
+def make_entry(
+    index: int,
+    rng: random.Random,
+    content_words: int = 60,
+    key_count: int = 3,
+    field_mix: float = 0.0,
+) -> Dict:
+    keys = rng.sample(_WORDS, key_count)
+    entry = {
+        "uid": index,
+        "comment": f"Entry {index} {keys[0] if keys else ''}",
+        "content": " ".join(rng.choice(_WORDS) for _ in range(content_words)),
+        "key": keys,
+        "keysecondary": [],
+        "order": rng.randint(0, 200),
+    }
+    if field_mix:
+        for make_fields in _OPTIONAL_FIELDS:
+            if rng.random() < field_mix:
+                entry.update(make_fields(rng))
+    return entry
+
+
+def make_entries(
+    count: int,
+    seed: int = 1234,
+    content_words: int = 60,
+    key_count: int = 3,
+    field_mix: float = 0.0,
+) -> List[Dict]:
+    """
+    `count` reproducible entries. `field_mix` is the chance that each optional
+    group of non-default settings is applied to an entry (0 = all defaults).
+    """
+    rng = random.Random(seed)
+    return [
+        make_entry(i, rng, content_words, key_count, field_mix) for i in range(count)
+    ]
@@ -1,7 +1,8 @@
 """Package init for the Loremaster backend."""
 
 from .api import api_router
-from .app import app, create_app
 from .services.store import LorebookStore
 
-__all__ = ["app", "create_app", "api_router", "LorebookStore"]
+# The ASGI app lives in src.main; importing it here would build one in every
+# process that imports the package, including spawned worker processes.
+__all__ = ["api_router", "LorebookStore"]
@@ -1,15 +1,94 @@
 """FastAPI dependencies shared by route modules."""
 
-from fastapi import Request
+from typing import AsyncIterator, Optional
 
+from fastapi import Depends, HTTPException, Query, Request
+
+from ..services.discord import DiscordClient
+from ..services.sessions import SessionError, SessionUser
 from ..services.store import LorebookStore
+from ..services.tenants import TenantRegistry, tenant_for
+from ..services.workers import WorkerPool
+
+
+async def get_discord(request: Request) -> DiscordClient:
+    """Shared Discord client opened and closed by the app lifespan."""
+    return request.app.state.discord
+
+
+async def get_workers(request: Request) -> WorkerPool:
+    """Thread/process pool for store calls too slow for the event loop."""
+    return request.app.state.workers
+
+
+async def get_optional_user(request: Request) -> Optional[SessionUser]:
+    """
+    Verify the bearer session token, if any, without calling Discord.
+
+    A missing header means an anonymous request; a present but invalid or
+    expired token is rejected so the client knows to refresh.
+    """
+    header = request.headers.get("authorization")
+    if not header:
+        return None
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Invalid authorization header")
+    return _verify_token(request, token.strip())
+
+
+async def get_stream_user(
+    request: Request, token: Optional[str] = Query(default=None)
+) -> Optional[SessionUser]:
+    """
+    get_optional_user that also takes the token as `?token=`, because browsers
+    cannot set headers on an EventSource. The header wins when both are sent.
+    """
+    if token is None or request.headers.get("authorization"):
+        return await get_optional_user(request)
+    return _verify_token(request, token)
+
+
+def _verify_token(request: Request, token: str) -> SessionUser:
+    try:
+        return request.app.state.sessions.verify(token)
+    except SessionError as exc:
+        raise HTTPException(
+            status_code=401, detail=str(exc), headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+async def get_current_user(request: Request) -> SessionUser:
+    """Like get_optional_user, but the request must be signed in."""
+    user = await get_optional_user(request)
+    if user is None:
+        raise HTTPException(
+            status_code=401, detail="Not signed in", headers={"WWW-Authenticate": "Bearer"}
+        )
+    return user
 
 
-def get_store(request: Request) -> LorebookStore:
+async def get_store(
+    request: Request, user: Optional[SessionUser] = Depends(get_optional_user)
+) -> AsyncIterator[LorebookStore]:
     """
-    Pull the LorebookStore off the app state so routes can remain thin.
+    Pull the caller's LorebookStore (their tenant) off the app state so routes
+    can remain thin.
 
     Keeping this in a dedicated dependency avoids importing the app instance
-    inside route modules (which keeps testability high).
+    inside route modules (which keeps testability high). Signed-in users get
+    their own library; anonymous requests share the public one. The tenant
+    stays checked out (safe from eviction) for the whole request. Syncing
+    here means every request sees writes made by other workers sharing the
+    database. Only the check for such writes runs on the event loop;
+    reloading changed books, or waiting for a worker thread that is
+    mid-write, happens on the pool. Loading a tenant that is not open also
+    happens on the pool.
     """
-    return request.app.state.store
+    tenants: TenantRegistry = request.app.state.tenants
+    workers: WorkerPool = request.app.state.workers
+    tenant = tenant_for(user.id if user else None)
+    async with tenants.checkout(tenant, workers) as store:
+        if not store.try_sync():
+            await workers.run(store.sync)
+        yield store
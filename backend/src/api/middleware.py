@@ -0,0 +1,231 @@
+"""
+ASGI middleware shared by all routes.
+
+Written against raw ASGI rather than BaseHTTPMiddleware, which would wrap
+every response body in an extra task and memory stream.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hmac
+import json
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..services import metrics
+from ..services.admission import BUSY_DETAIL, Admission
+from ..services.profiling import (
+    PROFILE_HEADER,
+    ProfilerConfig,
+    RequestProfile,
+    profile_id,
+)
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "unmatched"
+
+RouteCache = Dict[Callable[..., Any], str]
+
+
+def _route_template(scope: Scope, cache: RouteCache) -> str:
+    """The matched route's path template; the router fills scope["endpoint"]."""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    template = cache.get(endpoint)
+    if template is None:
+        for route in scope["app"].routes:
+            if getattr(route, "endpoint", None) is endpoint:
+                template = route.path
+                break
+        else:
+            template = UNMATCHED_ROUTE
+        cache[endpoint] = template
+    return template
+
+
+def _resolve_route(scope: Scope) -> None:
+    """Match the route as the router would, for requests that never reach it."""
+    for route in scope["app"].routes:
+        match, child_scope = route.matches(scope)
+        if match is Match.FULL:
+            scope.update(child_scope)
+            return
+
+
+class MetricsMiddleware:
+    """
+    Record request count, latency and body sizes per route template.
+
+    Routes are labelled by their template (`/lorebooks/{lorebook_id}`), never
+    the raw path, so the number of series stays fixed however many books
+    exist. Requests that match no route share one label.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._templates: RouteCache = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request_bytes = 0
+        response_bytes = 0
+        status = 500
+
+        async def counting_receive() -> Message:
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: Message) -> None:
+            nonlocal response_bytes, status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            route = _route_template(scope, self._templates)
+            method = scope["method"]
+            metrics.HTTP_REQUESTS.inc(method, route, str(status))
+            metrics.HTTP_LATENCY.observe(time.perf_counter() - started, method, route)
+            metrics.HTTP_REQUEST_SIZE.observe(request_bytes, method, route)
+            metrics.HTTP_RESPONSE_SIZE.observe(response_bytes, method, route)
+
+
+class AdmissionMiddleware:
+    """
+    Hold each request until its lane has a free slot, or answer 503 with
+    Retry-After when the lane's queue is full (see services/admission.py).
+    """
+
+    def __init__(self, app: ASGIApp, admission: Admission) -> None:
+        self.app = app
+        self.admission = admission
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        lane = None
+        if scope["type"] == "http":
+            lane = self.admission.lane_for(scope["method"], scope["path"])
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await lane.acquire():
+            # Lets the metrics label the 503 with the route that was refused.
+            _resolve_route(scope)
+            await _overloaded(send, lane.retry_after())
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release(time.perf_counter() - started)
+
+
+async def _overloaded(send: Send, retry_after: int) -> None:
+    body = json.dumps({"detail": BUSY_DETAIL}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests that send the secret profile header, plus a random
+    `sample_rate` share of all requests (see services/profiling.py).
+
+    Profiled responses carry an `X-Loremaster-Profile-Id` header naming the
+    files written to the profile directory.
+    """
+
+    def __init__(self, app: ASGIApp, config: ProfilerConfig) -> None:
+        self.app = app
+        self.config = config
+        self._secret = config.secret.encode() if config.secret else None
+        self._header = PROFILE_HEADER.encode()
+        self._active = False
+        self._templates: RouteCache = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None or self._active:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(profile_id(scope["method"], scope["path"]))
+        status = 500
+
+        async def tagging_send(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-loremaster-profile-id", profile.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        self._active = True
+        profile.start()
+        try:
+            await self.app(scope, receive, tagging_send)
+        finally:
+            profile.stop()
+            self._active = False
+            tags = self._tags(scope, status, trigger)
+            try:
+                await asyncio.to_thread(profile.write, self.config.directory, tags)
+            except OSError:
+                logger.exception("Could not write profile %s", profile.id)
+
+    def _trigger(self, scope: Scope) -> Optional[str]:
+        if self._secret is not None:
+            for name, value in scope["headers"]:
+                if name == self._header:
+                    if hmac.compare_digest(value, self._secret):
+                        return "header"
+                    break
+        if self.config.sample_rate and random.random() < self.config.sample_rate:
+            return "sample"
+        return None
+
+    def _tags(self, scope: Scope, status: int, trigger: str) -> Dict[str, Any]:
+        book_id = scope.get("path_params", {}).get("lorebook_id")
+        entries = None
+        if book_id:
+            entries = scope["app"].state.tenants.book_size(book_id)
+        return {
+            "method": scope["method"],
+            "route": _route_template(scope, self._templates),
+            "path": scope["path"],
+            "status": status,
+            "trigger": trigger,
+            "bookId": book_id,
+            "entries": entries,
+            "timestamp": time.time(),
+        }
@@ -1,10 +1,11 @@
 from fastapi import APIRouter
 
-from . import auth, health, lorebooks
+from . import auth, changes, health, lorebooks
 
 api_router = APIRouter()
 api_router.include_router(health.router)
 api_router.include_router(auth.router)
 api_router.include_router(lorebooks.router)
+api_router.include_router(changes.router)
 
 __all__ = ["api_router"]
@@ -3,10 +3,13 @@
 from __future__ import annotations
 
 import httpx
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 
-from ...services.discord import exchange_code, get_auth_url, get_user_info
+from ..dependencies import get_current_user, get_discord, get_workers
+from ...services.discord import DiscordClient, get_auth_url
+from ...services.sessions import SessionError, SessionTokens, SessionUser
+from ...services.workers import WorkerPool
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -19,11 +22,32 @@ class AuthCallback(BaseModel):
     code: str
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
 class AuthResponse(BaseModel):
     access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int
     user: dict[str, object]
 
 
+def _auth_response(tokens: SessionTokens, user: dict[str, object]) -> AuthResponse:
+    return AuthResponse(
+        access_token=tokens.access_token,
+        refresh_token=tokens.refresh_token,
+        expires_in=tokens.expires_in,
+        user=user,
+    )
+
+
+def _fallback_profile(user: SessionUser) -> dict[str, object]:
+    """Profile rebuilt from token claims when the cache has none."""
+    return {"id": user.id, "username": user.username, "avatar": user.avatar}
+
+
 @router.get("/login/discord", response_model=LoginUrlResponse)
 async def login_discord():
     """Return the Discord OAuth authorize URL."""
@@ -34,22 +58,38 @@ async def login_discord():
 
 
 @router.post("/callback/discord", response_model=AuthResponse)
-async def callback_discord(payload: AuthCallback):
-    """Exchange the OAuth code for a Discord token and basic user info."""
+async def callback_discord(
+    payload: AuthCallback,
+    request: Request,
+    discord: DiscordClient = Depends(get_discord),
+    workers: WorkerPool = Depends(get_workers),
+):
+    """
+    Exchange the OAuth code for Discord user info and start a session.
+
+    The returned tokens are signed by this backend; the Discord access token
+    itself never leaves the server.
+    """
     try:
-        token_data = await exchange_code(payload.code)
+        token_data = await discord.exchange_code(payload.code)
         access_token = token_data.get("access_token")
         if not access_token:
             raise HTTPException(
                 status_code=502, detail="Discord did not return an access token"
             )
 
-        user_info = await get_user_info(access_token)
+        user_info = await discord.get_user_info(access_token)
+        user = SessionUser(
+            id=str(user_info["id"]),
+            username=str(user_info.get("global_name") or user_info.get("username") or ""),
+            avatar=user_info.get("avatar"),
+        )
 
-        # In a real app, you might issue your own session JWT here.
-        # For this base implementation, we'll return the Discord access token
-        # as the session token (or a wrapped version).
-        return {"access_token": access_token, "user": user_info}
+        sessions = request.app.state.sessions
+        sessions.profiles.put(user.id, user_info)
+        # Starting a token family writes to the session database.
+        tokens = await workers.run(sessions.issue, user)
+        return _auth_response(tokens, user_info)
     except HTTPException:
         raise
     except ValueError as exc:
@@ -61,3 +101,27 @@ async def callback_discord(payload: AuthCallback):
         )
     except Exception as exc:  # pragma: no cover - defensive fallback
         raise HTTPException(status_code=500, detail="Unexpected auth failure") from exc
+
+
+@router.post("/refresh", response_model=AuthResponse)
+async def refresh_session(
+    payload: RefreshRequest,
+    request: Request,
+    workers: WorkerPool = Depends(get_workers),
+):
+    """Trade a refresh token for a new access/refresh pair."""
+    sessions = request.app.state.sessions
+    try:
+        user, tokens = await workers.run(sessions.refresh, payload.refresh_token)
+    except SessionError as exc:
+        raise HTTPException(status_code=401, detail=str(exc))
+    profile = sessions.profiles.get(user.id) or _fallback_profile(user)
+    return _auth_response(tokens, profile)
+
+
+@router.get("/me")
+async def read_current_user(
+    request: Request, user: SessionUser = Depends(get_current_user)
+) -> dict[str, object]:
+    """The signed-in user's profile, served from cache with no Discord call."""
+    return request.app.state.sessions.profiles.get(user.id) or _fallback_profile(user)
@@ -0,0 +1,75 @@
+"""Live change stream (Server-Sent Events)."""
+
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from ..dependencies import get_stream_user
+from ...services.changes import KEEPALIVE_FRAME, RETRY_FRAME, ChangeBroker
+from ...services.sessions import SessionUser
+from ...services.tenants import tenant_for
+
+router = APIRouter(tags=["changes"])
+
+
+class EventStreamResponse(Response):
+    """
+    Sends one tenant's change events until the client disconnects.
+
+    StreamingResponse would run a task group with two tasks per connection;
+    with thousands of idle subscribers that is most of their memory. Here a
+    single task waits for the disconnect and closes the subscription.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, broker: ChangeBroker, tenant: str) -> None:
+        self.broker = broker
+        self.tenant = tenant
+        self.status_code = 200
+        self.background = None
+        # Keep proxies from buffering or caching the stream.
+        self.init_headers({"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        with self.broker.subscribe(self.tenant) as subscription:
+            disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+            disconnect.add_done_callback(lambda _: subscription.close())
+            try:
+                await send(
+                    {"type": "http.response.start", "status": 200, "headers": self.raw_headers}
+                )
+                await send({"type": "http.response.body", "body": RETRY_FRAME, "more_body": True})
+                while True:
+                    frames = await subscription.next(self.broker.keepalive)
+                    if subscription.closed:
+                        break
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": frames or KEEPALIVE_FRAME,
+                            "more_body": True,
+                        }
+                    )
+            finally:
+                disconnect.cancel()
+
+
+async def _wait_for_disconnect(receive: Receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+@router.get("/changes", response_class=EventStreamResponse, status_code=200)
+async def stream_changes(
+    request: Request, user: Optional[SessionUser] = Depends(get_stream_user)
+) -> EventStreamResponse:
+    """
+    Push edits to the caller's library as they happen (see
+    services/changes.py for the event shapes). Signed-in browsers pass their
+    session token as `?token=`.
+    """
+    return EventStreamResponse(request.app.state.changes, tenant_for(user.id if user else None))
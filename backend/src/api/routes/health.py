@@ -1,6 +1,10 @@
 """Health and root endpoints."""
 
-from fastapi import APIRouter
+from typing import Any
+
+from fastapi import APIRouter, Request, Response
+
+from ...services import metrics
 
 router = APIRouter(tags=["health"])
 
@@ -13,3 +17,85 @@ async def read_root() -> dict[str, str]:
 @router.get("/health")
 async def health_check() -> dict[str, str]:
     return {"status": "ok"}
+
+
+@router.get("/health/memory")
+async def memory_usage(request: Request) -> dict[str, Any]:
+    """Estimated memory of open tenant libraries against the budget."""
+    return request.app.state.tenants.metrics()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request) -> Response:
+    """Request, store and Discord metrics in the Prometheus text format."""
+    usage = request.app.state.tenants.metrics()
+    store = [
+        ("loremaster_tenants_open", "Tenant libraries loaded in memory.", "tenants"),
+        ("loremaster_books", "Lorebooks in open tenants.", "books"),
+        ("loremaster_entries", "Entries in open tenants.", "entries"),
+        (
+            "loremaster_store_approx_bytes",
+            "Estimated memory of open tenants, including cached responses.",
+            "approxBytes",
+        ),
+        ("loremaster_memory_budget_bytes", "Tenant memory budget.", "memoryBudget"),
+    ]
+    lines = []
+    for name, documentation, key in store:
+        lines.extend(metrics.sample(name, documentation, usage[key]))
+    lines.extend(
+        metrics.sample(
+            "loremaster_tenant_evictions_total",
+            "Tenants closed to stay under the memory budget.",
+            usage["evictions"],
+            kind="counter",
+        )
+    )
+    changes = request.app.state.changes
+    lines.extend(
+        metrics.sample(
+            "loremaster_change_subscribers",
+            "Open GET /changes streams.",
+            changes.subscriber_count,
+        )
+    )
+    lines.extend(
+        metrics.sample(
+            "loremaster_change_events_total",
+            "Change events broadcast to subscribers.",
+            changes.events,
+            kind="counter",
+        )
+    )
+    lines.extend(
+        metrics.sample(
+            "loremaster_change_resyncs_total",
+            "Subscribers told to resync after falling too far behind.",
+            changes.resyncs,
+            kind="counter",
+        )
+    )
+    for name, lane in request.app.state.admission.lanes.items():
+        lines.extend(
+            metrics.sample(
+                f"loremaster_admission_{name}_in_flight",
+                f"Requests running in the {name} admission lane.",
+                lane.active,
+            )
+        )
+        lines.extend(
+            metrics.sample(
+                f"loremaster_admission_{name}_queued",
+                f"Requests waiting for a slot in the {name} admission lane.",
+                lane.queued,
+            )
+        )
+        lines.extend(
+            metrics.sample(
+                f"loremaster_admission_{name}_rejected_total",
+                f"Requests answered 503 because the {name} lane's queue was full.",
+                lane.rejected,
+                kind="counter",
+            )
+        )
+    return Response(metrics.render(lines), media_type=metrics.CONTENT_TYPE)
@@ -1,48 +1,273 @@
-"""Lorebook CRUD endpoints."""
+"""
+Lorebook CRUD endpoints.
+
+Handlers answer cheap reads (cached bodies, versions) on the event loop and
+hand anything that walks a book or writes to storage to the worker pool, so
+one large book never stalls other clients.
+"""
 
 from __future__ import annotations
 
-from typing import List
+from functools import partial
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
-from ..dependencies import get_store
+from ..dependencies import get_store, get_workers
 from ...models import (
     ActiveLorebookPayload,
+    BatchEntryRequest,
+    BatchEntryResponse,
     CreateLorebookPayload,
+    DuplicateReport,
     EntryMutationResponse,
+    EntryPage,
     EntryPayload,
+    ImportProgress,
     Lorebook,
+    LorebookChanges,
     LorebookMeta,
+    ScanRequest,
+    ScanResponse,
+    SearchResponse,
+    TokenBudget,
     UpdateLorebookPayload,
 )
+from ...services.exporter import EXPORT_FORMATS
+from ...services.importer import ImportFormatError, stream_import
 from ...services.store import LorebookStore
+from ...services.workers import WorkerPool
 
 router = APIRouter(tags=["lorebooks"])
 
 
+def _body_schema(model: type) -> Dict[str, Any]:
+    """OpenAPI request body for handlers that parse their body themselves."""
+    schema = model.model_json_schema(ref_template="#/components/schemas/{model}")
+    schema.pop("$defs", None)
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": schema}},
+        }
+    }
+
+
+def _parse_create_payload(body: bytes) -> CreateLorebookPayload:
+    try:
+        return CreateLorebookPayload.model_validate_json(body)
+    except ValidationError as exc:
+        # Same 422 shape FastAPI gives when it parses the body itself.
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in exc.errors(include_url=False)]
+        )
+
+
+def _etag(version: int) -> str:
+    return f'"v{version}"'
+
+
+def _cache_headers(etag: str) -> Dict[str, str]:
+    # Every tenant counts versions from the same start, so the same ETag
+    # names different libraries for different users.
+    return {"ETag": etag, "Vary": "Authorization"}
+
+
+def _json_bytes(body: bytes, etag: str) -> Response:
+    """Send a body the store already encoded, skipping response_model."""
+    return Response(
+        content=body, media_type="application/json", headers=_cache_headers(etag)
+    )
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    """True when the client's If-None-Match already names `etag`."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates or "*" in candidates
+
+
 @router.get("/lorebooks", response_model=List[LorebookMeta])
 async def list_lorebooks(
+    request: Request,
+    sort: Literal["lastEdited", "name"] = "lastEdited",
+    direction: Optional[Literal["asc", "desc"]] = Query(
+        None, description="Defaults to desc for lastEdited and asc for name."
+    ),
+    limit: Optional[int] = Query(
+        None, ge=1, le=1000, description="Page size; omit to get every matching book."
+    ),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page."),
+    prefix: Optional[str] = Query(
+        None, description="Only books whose name starts with this (case-insensitive)."
+    ),
     store: LorebookStore = Depends(get_store),
-) -> List[LorebookMeta]:
-    """Return lightweight metadata for the library sidebar."""
-    return store.list_library()
+    workers: WorkerPool = Depends(get_workers),
+):
+    """
+    Return lightweight metadata for the library sidebar, most recently edited
+    first by default. When more books follow the page, the `X-Next-Cursor`
+    response header holds the cursor for the next request.
+    """
+    etag = _etag(store.library_version)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    if direction is None:
+        direction = "desc" if sort == "lastEdited" else "asc"
+    if sort == "lastEdited" and direction == "desc" and not (limit or cursor or prefix):
+        # The whole library in its default order is cached as bytes. The
+        # ETag is the version the body was built at, which trails
+        # library_version while an edit is being applied.
+        cached = store.try_list_library_json()
+        if cached is None:
+            cached = await workers.run(store.list_library_json)
+        version, body = cached
+        return _json_bytes(body, _etag(version))
+
+    # Likewise a page is tagged with the version it was read at.
+    page = partial(
+        store.list_library_page_json,
+        sort=sort, descending=direction == "desc", limit=limit, cursor=cursor, prefix=prefix,
+    )
+    found = page(blocking=False)
+    if found is None:
+        found = await workers.run(page)
+    version, body, next_cursor = found
+    response = _json_bytes(body, _etag(version))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 
 @router.get("/lorebooks/{lorebook_id}", response_model=Lorebook)
 async def get_lorebook(
-    lorebook_id: str, store: LorebookStore = Depends(get_store)
-) -> Lorebook:
+    lorebook_id: str,
+    request: Request,
+    store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
+):
     """Fetch a full lorebook (metadata + entries)."""
-    return store.get_lorebook(lorebook_id)
+    etag = _etag(store.get_lorebook_version(lorebook_id))
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    cached = store.cached_lorebook_json(lorebook_id)
+    if cached is None:
+        # Encoding a whole book is heavy work, unlike serving the cached
+        # body; clients opening the same book at once share one encode.
+        async def encode() -> Tuple[int, bytes]:
+            async with request.app.state.admission.heavy.hold():
+                return await workers.run(store.get_lorebook_json, lorebook_id)
+
+        cached = await workers.share((store, "book", lorebook_id, etag), encode)
+    # An edit may have landed since the version above was read; the body is
+    # tagged with the version it was encoded at, never a newer one.
+    version, body = cached
+    return _json_bytes(body, _etag(version))
 
 
-@router.post("/lorebooks", response_model=Lorebook, status_code=201)
+@router.get("/lorebooks/{lorebook_id}/changes", response_model=LorebookChanges)
+async def get_lorebook_changes(
+    lorebook_id: str,
+    since: int = Query(..., ge=0),
+    store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
+) -> LorebookChanges:
+    """
+    Entries added, updated or deleted since `since` (a book `version`). When
+    `reset` is true the change log no longer reaches back that far and the
+    client should refetch the full book.
+    """
+    return await workers.share(
+        (store, "changes", lorebook_id, since, store.get_lorebook_version(lorebook_id)),
+        lambda: workers.run(store.changes_since, lorebook_id, since),
+    )
+
+
+@router.get("/lorebooks/{lorebook_id}/export")
+async def export_lorebook(
+    lorebook_id: str,
+    fmt: Literal["native", "sillytavern", "ndjson"] = Query("native", alias="format"),
+    store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
+) -> StreamingResponse:
+    """
+    Stream a full lorebook entry by entry (native JSON, SillyTavern world-info
+    JSON, or NDJSON) instead of building the whole response in memory.
+    """
+    # Starlette iterates the chunks on its own threadpool.
+    chunks = await workers.run(store.export_lorebook, lorebook_id, fmt)
+    extension = "ndjson" if fmt == "ndjson" else "json"
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{lorebook_id}.{extension}"'
+        },
+    )
+
+
+@router.post(
+    "/lorebooks",
+    response_model=Lorebook,
+    status_code=201,
+    openapi_extra=_body_schema(CreateLorebookPayload),
+)
 async def create_lorebook(
-    payload: CreateLorebookPayload, store: LorebookStore = Depends(get_store)
-) -> Lorebook:
-    """Create a lorebook and persist its initial entries."""
-    return store.create_lorebook(payload.name, payload.entries)
+    request: Request,
+    store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
+) -> Response:
+    """
+    Create a lorebook and persist its initial entries.
+
+    The body (CreateLorebookPayload) is validated on the worker pool rather
+    than by FastAPI on the event loop, since it can hold a whole book.
+    """
+    body = await request.body()
+
+    def create() -> bytes:
+        payload = _parse_create_payload(body)
+        return store.create_lorebook_json(payload.name, payload.entries)
+
+    encoded = await workers.run(create)
+    return Response(content=encoded, status_code=201, media_type="application/json")
+
+
+@router.post("/lorebooks/{lorebook_id}/import", response_model=ImportProgress)
+async def import_entries(
+    lorebook_id: str,
+    request: Request,
+    fmt: Optional[Literal["json", "ndjson"]] = Query(None, alias="format"),
+    store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
+) -> ImportProgress:
+    """
+    Stream entries from the request body into an existing lorebook.
+
+    Accepts SillyTavern world-info JSON, a native export, or NDJSON (one entry
+    per line). Entries are stored as they are parsed, so large files never sit
+    in memory whole; poll the GET variant of this route for progress.
+    """
+    if fmt is None:
+        content_type = request.headers.get("content-type", "")
+        fmt = "ndjson" if "ndjson" in content_type else "json"
+    try:
+        return await stream_import(store, lorebook_id, request.stream(), fmt, workers)
+    except ImportFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.get("/lorebooks/{lorebook_id}/import", response_model=ImportProgress)
+async def get_import_progress(
+    lorebook_id: str, store: LorebookStore = Depends(get_store)
+) -> ImportProgress:
+    """Progress of the latest streaming import into this lorebook."""
+    return store.get_import(lorebook_id)
 
 
 @router.patch("/lorebooks/{lorebook_id}", response_model=LorebookMeta)
@@ -50,29 +275,80 @@ async def rename_lorebook(
     lorebook_id: str,
     payload: UpdateLorebookPayload,
     store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
 ) -> LorebookMeta:
-    return store.update_lorebook_name(lorebook_id, payload.name)
+    return await workers.run(store.update_lorebook_name, lorebook_id, payload.name)
 
 
 # Return 200 with a tiny payload to avoid 204/body constraints in FastAPI.
 @router.delete("/lorebooks/{lorebook_id}", status_code=200)
 async def delete_lorebook(
-    lorebook_id: str, store: LorebookStore = Depends(get_store)
+    lorebook_id: str,
+    store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
 ) -> dict[str, str]:
-    store.delete_lorebook(lorebook_id)
+    await workers.run(store.delete_lorebook, lorebook_id)
     return {"status": "deleted"}
 
 
+@router.get("/lorebooks/{lorebook_id}/entries", response_model=EntryPage)
+async def list_entries(
+    lorebook_id: str,
+    sort: Literal["uid", "order", "position"] = "uid",
+    direction: Literal["asc", "desc"] = "asc",
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated LoreEntry fields to return (uid is always included)."
+    ),
+    store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
+) -> EntryPage:
+    """Paginated entry listing for views that do not need the whole book."""
+    projection = None
+    if fields:
+        projection = {name.strip() for name in fields.split(",") if name.strip()}
+    return await workers.run(
+        lambda: store.list_entries(
+            lorebook_id,
+            sort=sort,
+            descending=direction == "desc",
+            limit=limit,
+            cursor=cursor,
+            fields=projection,
+        )
+    )
+
+
 @router.post(
     "/lorebooks/{lorebook_id}/entries",
     response_model=EntryMutationResponse,
     status_code=201,
 )
 async def add_entry(
-    lorebook_id: str, payload: EntryPayload, store: LorebookStore = Depends(get_store)
+    lorebook_id: str,
+    payload: EntryPayload,
+    store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
 ) -> EntryMutationResponse:
     """Add a new entry. The backend will mint the UID if the client omitted it."""
-    return store.add_entry(lorebook_id, payload)
+    return await workers.run(store.add_entry, lorebook_id, payload)
+
+
+@router.post(
+    "/lorebooks/{lorebook_id}/entries:batch", response_model=BatchEntryResponse
+)
+async def batch_entries(
+    lorebook_id: str,
+    payload: BatchEntryRequest,
+    store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
+) -> BatchEntryResponse:
+    """
+    Apply many add/update/delete operations in one request. Either all of
+    them succeed or none are applied.
+    """
+    return await workers.run(store.apply_batch, lorebook_id, payload.operations)
 
 
 @router.put(
@@ -84,9 +360,10 @@ async def update_entry(
     entry_uid: int,
     payload: EntryPayload,
     store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
 ) -> EntryMutationResponse:
     """Replace an entry payload by UID."""
-    return store.update_entry(lorebook_id, entry_uid, payload)
+    return await workers.run(store.update_entry, lorebook_id, entry_uid, payload)
 
 
 @router.delete(
@@ -97,12 +374,78 @@ async def delete_entry(
     lorebook_id: str,
     entry_uid: int,
     store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
 ) -> EntryMutationResponse:
     """
     Delete an entry and return the updated metadata so the client can keep its
     counts and timestamps in sync.
     """
-    return store.delete_entry(lorebook_id, entry_uid)
+    return await workers.run(store.delete_entry, lorebook_id, entry_uid)
+
+
+@router.post("/lorebooks/{lorebook_id}/scan", response_model=ScanResponse)
+async def scan_lorebook(
+    lorebook_id: str,
+    payload: ScanRequest,
+    store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
+) -> ScanResponse:
+    """Run chat messages through the book's keyword triggers."""
+    return await workers.run(store.scan, lorebook_id, payload)
+
+
+@router.get("/lorebooks/{lorebook_id}/search", response_model=SearchResponse)
+async def search_lorebook(
+    lorebook_id: str,
+    q: str = Query(..., min_length=1),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
+) -> SearchResponse:
+    """Ranked search across entry comments, content and keywords."""
+    return await workers.run(store.search, lorebook_id, q, offset, limit)
+
+
+@router.get("/lorebooks:duplicates", response_model=DuplicateReport)
+async def find_library_duplicates(
+    threshold: float = Query(
+        0.7, ge=0.5, le=1.0, description="Minimum estimated similarity of linked entries."
+    ),
+    limit: int = Query(100, ge=1, le=1000, description="Clusters to return."),
+    store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
+) -> DuplicateReport:
+    """Clusters of near-duplicate entries across every book in the library."""
+    return await workers.run(store.find_library_duplicates, threshold, limit)
+
+
+@router.get("/lorebooks/{lorebook_id}/duplicates", response_model=DuplicateReport)
+async def find_duplicates(
+    lorebook_id: str,
+    threshold: float = Query(
+        0.7, ge=0.5, le=1.0, description="Minimum estimated similarity of linked entries."
+    ),
+    limit: int = Query(100, ge=1, le=1000, description="Clusters to return."),
+    store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
+) -> DuplicateReport:
+    """
+    Clusters of entries whose content and keywords mostly overlap, such as
+    the same character imported twice with slightly reworded text.
+    """
+    return await workers.run(store.find_duplicates, lorebook_id, threshold, limit)
+
+
+@router.get("/lorebooks/{lorebook_id}/budget", response_model=TokenBudget)
+async def get_token_budget(
+    lorebook_id: str,
+    budget: Optional[int] = Query(None, ge=0),
+    store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
+) -> TokenBudget:
+    """Token totals for the book's enabled entries, checked against `budget`."""
+    return await workers.run(store.token_budget, lorebook_id, budget)
 
 
 @router.get("/active-lorebook", response_model=ActiveLorebookPayload)
@@ -117,14 +460,16 @@ async def get_active_lorebook(
 async def set_active_lorebook(
     lorebook_id: str,
     store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
 ) -> ActiveLorebookPayload:
     """Persist the active lorebook selection server-side."""
-    return store.set_active(lorebook_id)
+    return await workers.run(store.set_active, lorebook_id)
 
 
 @router.delete("/active-lorebook", response_model=ActiveLorebookPayload)
 async def clear_active_lorebook(
     store: LorebookStore = Depends(get_store),
+    workers: WorkerPool = Depends(get_workers),
 ) -> ActiveLorebookPayload:
     """Explicitly clear the active pointer (used when the last lorebook is removed)."""
-    return store.clear_active()
+    return await workers.run(store.clear_active)
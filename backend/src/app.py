@@ -5,11 +5,34 @@ Keeping app creation here allows tests and CLIs to import a configured FastAPI
 instance without side effects.
 """
 
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .api import api_router
-from .services.store import LorebookStore
+from .api.middleware import AdmissionMiddleware, MetricsMiddleware, ProfilingMiddleware
+from .services.admission import Admission
+from .services.changes import ChangeBroker
+from .services.discord import DiscordClient
+from .services.profiling import ProfilerConfig
+from .services.sessions import SessionManager
+from .services.tenants import TenantRegistry
+from .services.tokens import load_tokenizer
+from .services.workers import WorkerPool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled Discord client per process, so logins reuse connections.
+    app.state.discord = DiscordClient.from_env()
+    yield
+    await app.state.discord.aclose()
+    app.state.workers.close()
+    # Release every tenant's storage so SQLite checkpoints its WAL cleanly.
+    app.state.tenants.close()
+    app.state.sessions.close()
 
 
 def create_app() -> FastAPI:
@@ -17,8 +40,12 @@ def create_app() -> FastAPI:
         title="Loremaster API",
         version="1.0.0",
         summary="Backend for storing lorebooks previously kept in localStorage.",
+        lifespan=lifespan,
     )
 
+    # Innermost, so requests turned away still get CORS headers and metrics.
+    app.state.admission = Admission.from_env()
+    app.add_middleware(AdmissionMiddleware, admission=app.state.admission)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=[
@@ -29,16 +56,38 @@ def create_app() -> FastAPI:
         ],
         allow_methods=["*"],
         allow_headers=["*"],
+        # Lets the frontend read the library pagination cursor and how long
+        # to back off after a 503.
+        expose_headers=["X-Next-Cursor", "Retry-After"],
+    )
+    # Opt-in request profiling; not installed at all unless
+    # LOREMASTER_PROFILE_DIR is set.
+    profiler = ProfilerConfig.from_env()
+    if profiler is not None:
+        app.add_middleware(ProfilingMiddleware, config=profiler)
+    # Added last so it wraps everything else and times the whole request.
+    app.add_middleware(MetricsMiddleware)
+
+    # Attach stores to the app so dependencies can grab them without
+    # re-importing. Each signed-in user gets their own library (tenant);
+    # app.state.store is the public one used by anonymous requests. Setting
+    # LOREMASTER_DB_PATH / LOREMASTER_DATA_DIR switches from in-memory to
+    # SQLite persistence. Every edit is also pushed to the tenant's open
+    # GET /changes streams.
+    app.state.changes = ChangeBroker.from_env()
+    app.state.tenants = TenantRegistry.from_env(
+        tokenizer=load_tokenizer(os.getenv("LOREMASTER_TOKENIZER")),
+        changes=app.state.changes,
     )
+    app.state.store = app.state.tenants.public
+
+    # Slow store calls run here instead of on the event loop.
+    app.state.workers = WorkerPool.from_env()
 
-    # Attach store to the app so dependencies can grab it without re-importing.
-    app.state.store = LorebookStore()
+    # Signs and verifies session tokens; LOREMASTER_SESSION_SECRET sets the key.
+    app.state.sessions = SessionManager.from_env()
 
     # Routes are grouped under api_router for modularity.
     app.include_router(api_router)
 
     return app
-
-
-# Expose a module-level app for `uvicorn backend.src.main:app` entrypoints.
-app = create_app()
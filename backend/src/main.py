@@ -1,5 +1,12 @@
-"""Entry point for FastAPI/uvicorn runners."""
+"""
+Entry point for FastAPI/uvicorn runners (`uvicorn src.main:app`).
 
-from .app import app
+The app is only built here, so importing the package (as worker processes
+do) has no side effects.
+"""
+
+from .app import create_app
+
+app = create_app()
 
 __all__ = ["app"]
@@ -7,7 +7,7 @@ frontend and backend is lossless.
 
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -74,6 +74,8 @@ class Lorebook(BaseModel):
     id: str
     name: str
     entryCount: int = Field(default=0)
+    tokenCount: int = Field(default=0)
+    version: int = Field(default=0)
     lastEdited: int
     created: int
     entries: List[LoreEntry] = Field(default_factory=list)
@@ -87,6 +89,8 @@ class LorebookMeta(BaseModel):
     id: str
     name: str
     entryCount: int
+    tokenCount: int = 0
+    version: int = 0
     lastEdited: int
     created: int
 
@@ -162,3 +166,146 @@ class EntryPayload(BaseModel):
     outletName: Optional[str] = ""
     characterFilter: Optional[Dict] = None
     scanDepth: int | str | None = None
+
+
+class ScanRequest(BaseModel):
+    """Chat text to run through a lorebook's keyword triggers."""
+
+    messages: List[str] = Field(
+        default_factory=list, description="Chat messages, oldest first."
+    )
+    scanDepth: int = Field(
+        default=4, ge=0, description="Messages scanned for entries without their own scanDepth."
+    )
+    maxRecursion: int = Field(
+        default=3, ge=0, description="Extra passes over activated entry content."
+    )
+    seed: Optional[int] = Field(
+        default=None, description="Seed for probability rolls (deterministic scans)."
+    )
+
+
+class ScanResponse(BaseModel):
+    """Entries activated by a scan, in lorebook order."""
+
+    entries: List[LoreEntry]
+
+
+class SearchHit(BaseModel):
+    """One ranked search result."""
+
+    score: float
+    entry: LoreEntry
+
+
+class SearchResponse(BaseModel):
+    """A page of search results plus the total match count."""
+
+    total: int
+    offset: int
+    limit: int
+    results: List[SearchHit]
+
+
+class DuplicateEntry(BaseModel):
+    """One member of a near-duplicate cluster."""
+
+    lorebookId: str
+    uid: int
+    comment: str = ""
+    key: List[str] = Field(default_factory=list)
+
+
+class DuplicateCluster(BaseModel):
+    """Entries whose content and keywords mostly overlap."""
+
+    similarity: float = Field(
+        description="Lowest estimated similarity (0-1) among the cluster's links."
+    )
+    entries: List[DuplicateEntry]
+
+
+class DuplicateReport(BaseModel):
+    """Near-duplicate clusters, largest first."""
+
+    threshold: float
+    entriesScanned: int
+    total: int = Field(description="Clusters found, before `limit`.")
+    clusters: List[DuplicateCluster]
+
+
+class TokenBudget(BaseModel):
+    """Token usage of a lorebook's enabled entries against an optional budget."""
+
+    tokenizer: str
+    budget: Optional[int] = None
+    totalTokens: int
+    budgetedTokens: int = Field(description="Tokens that count toward the budget.")
+    ignoredTokens: int = Field(description="Tokens from entries with ignoreBudget.")
+    remaining: Optional[int] = None
+    withinBudget: bool = True
+
+
+class ImportProgress(BaseModel):
+    """Progress of a streaming import into a lorebook."""
+
+    lorebookId: str
+    format: str
+    status: str = "running"  # running | done | failed
+    entriesImported: int = 0
+    entriesSkipped: int = 0
+    bytesRead: int = 0
+    started: int
+    finished: Optional[int] = None
+    error: Optional[str] = None
+    lorebook: Optional[LorebookMeta] = None
+
+
+class EntryOperation(BaseModel):
+    """One add/update/delete inside a batch mutation."""
+
+    op: Literal["add", "update", "delete"]
+    uid: Optional[int] = Field(
+        default=None, description="Target UID for update/delete (update may use entry.uid)."
+    )
+    entry: Optional[EntryPayload] = None
+
+
+class BatchEntryRequest(BaseModel):
+    """Mixed entry mutations applied all-or-nothing."""
+
+    operations: List[EntryOperation] = Field(default_factory=list)
+
+
+class EntryOperationResult(BaseModel):
+    op: str
+    uid: int
+    entry: Optional[LoreEntry] = None
+
+
+class BatchEntryResponse(BaseModel):
+    """Per-operation results plus the book metadata after the whole batch."""
+
+    results: List[EntryOperationResult]
+    lorebook: LorebookMeta
+
+
+class LorebookChanges(BaseModel):
+    """Entry-level delta between a client's version and the current book."""
+
+    lorebook: LorebookMeta
+    since: int
+    reset: bool = Field(
+        default=False,
+        description="True when the change log cannot cover `since`; refetch the book.",
+    )
+    upserted: List[LoreEntry] = Field(default_factory=list)
+    deleted: List[int] = Field(default_factory=list)
+
+
+class EntryPage(BaseModel):
+    """One page of (optionally projected) entries."""
+
+    items: List[Dict[str, Any]]
+    total: int
+    nextCursor: Optional[str] = None
@@ -1,6 +1,6 @@
 """Service layer modules."""
 
-from .discord import exchange_code, get_auth_url, get_user_info
+from .discord import DiscordClient, get_auth_url
 from .store import LorebookStore
 
-__all__ = ["exchange_code", "get_auth_url", "get_user_info", "LorebookStore"]
+__all__ = ["DiscordClient", "get_auth_url", "LorebookStore"]
@@ -0,0 +1,361 @@
+"""
+Keyword activation engine for lore entries.
+
+Evaluates the SillyTavern-style trigger fields on `LoreEntry` (primary and
+secondary keys, selective logic, case sensitivity, whole-word matching,
+constants, probability, scan depth and recursion) against chat messages.
+
+All plain-text keys of a book are compiled into Aho-Corasick automata, so one
+pass over the chat finds every key at once instead of running one regex per
+key per entry. Recursion buffers (the content of every entry activated so
+far) are large but repetitive, so there the automata only walk the distinct
+words. The compiled matcher is cached on the book by the store and dropped
+whenever the book mutates.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..models import LoreEntry
+
+# SillyTavern's selectiveLogic values.
+AND_ANY = 0
+NOT_ALL = 1
+NOT_ANY = 2
+AND_ALL = 3
+
+_REGEX_KEY = re.compile(r"^/(.+)/([a-z]*)$", re.DOTALL)
+_REGEX_FLAGS = {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL}
+_NEVER = float("inf")
+
+# (kind, ref): kind is "ci"/"cs" with an automaton pattern id, or "re" with a
+# compiled regex.
+KeyRef = Tuple[str, object]
+# pattern id -> (closest message hit, closest whole-word hit), as distance from
+# the newest message.
+Hits = Dict[int, Tuple[float, float]]
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher (goto/fail automaton)."""
+
+    def __init__(self, patterns: Sequence[str]) -> None:
+        self.patterns = list(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            node = 0
+            for char in pattern:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = nxt
+            self._out[node] += (pattern_id,)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] += self._out[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int]]:
+        """Yield `(pattern_id, end_index)` for every occurrence in `text`."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for idx, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                for pattern_id in out[node]:
+                    yield pattern_id, idx + 1
+
+
+class _Rule:
+    """Pre-digested trigger settings for one entry."""
+
+    __slots__ = ("entry", "primary", "secondary", "depth", "whole_words")
+
+    def __init__(
+        self,
+        entry: LoreEntry,
+        primary: List[KeyRef],
+        secondary: List[KeyRef],
+        depth: Optional[int],
+    ) -> None:
+        self.entry = entry
+        self.primary = primary
+        self.secondary = secondary
+        self.depth = depth
+        self.whole_words = entry.matchWholeWords
+
+
+class _Haystack:
+    """Text searched in one pass, with hit distances per pattern."""
+
+    def __init__(
+        self,
+        matcher: "KeywordMatcher",
+        messages: Sequence[str],
+        hits: Optional[Dict[str, Hits]] = None,
+    ) -> None:
+        self.messages = messages
+        self.hits: Dict[str, Hits] = hits or {
+            "cs": matcher._search(matcher._sensitive, messages, lower=False),
+            "ci": matcher._search(matcher._insensitive, messages, lower=True),
+        }
+        self._regex_cache: Dict[Tuple[int, int], bool] = {}
+
+    def key_hit(self, ref: KeyRef, depth: int, whole_word: bool) -> bool:
+        kind, target = ref
+        if kind == "re":
+            cache_key = (id(target), depth)
+            if cache_key not in self._regex_cache:
+                window = "\n".join(self.messages[-depth:]) if depth else ""
+                self._regex_cache[cache_key] = bool(target.search(window))
+            return self._regex_cache[cache_key]
+
+        hit = self.hits[kind].get(target)
+        if hit is None:
+            return False
+        return (hit[1] if whole_word else hit[0]) < depth
+
+
+class KeywordMatcher:
+    """Compiled activation rules for every entry of one lorebook."""
+
+    def __init__(self, entries: Iterable[LoreEntry]) -> None:
+        self._patterns: Dict[str, Dict[str, int]] = {"cs": {}, "ci": {}}
+        self._single_word: Dict[str, List[bool]] = {"cs": [], "ci": []}
+        self._rules: List[_Rule] = []
+        # Rules reachable from each plain-text key, so a scan only evaluates
+        # entries whose keys actually occurred (plus constants / regex keys).
+        self._by_pattern: Dict[Tuple[str, int], List[int]] = {}
+        self._always: List[int] = []
+
+        for entry in entries:
+            if entry.disabled or not entry.enabled:
+                continue
+            primary = [self._compile_key(entry, key) for key in entry.key if key]
+            secondary = [
+                self._compile_key(entry, key) for key in entry.keysecondary if key
+            ]
+            if not primary and not entry.constant:
+                continue
+            rule_idx = len(self._rules)
+            self._rules.append(
+                _Rule(entry, primary, secondary, _parse_depth(entry.scanDepth))
+            )
+            if entry.constant or any(kind == "re" for kind, _ in primary):
+                self._always.append(rule_idx)
+            else:
+                for ref in primary:
+                    self._by_pattern.setdefault(ref, []).append(rule_idx)
+
+        self._sensitive = AhoCorasick(list(self._patterns["cs"]))
+        self._insensitive = AhoCorasick(list(self._patterns["ci"]))
+        # Keys containing whitespace, which can span words.
+        self._spaced = {
+            kind: [pid for pid, single in enumerate(flags) if not single]
+            for kind, flags in self._single_word.items()
+        }
+
+    def scan(
+        self,
+        messages: Sequence[str],
+        default_depth: int,
+        max_recursion: int = 0,
+        rng: Optional[random.Random] = None,
+    ) -> List[LoreEntry]:
+        """
+        Return the entries activated by `messages` (oldest first).
+
+        Activated entries feed their content back in as a recursion buffer, up
+        to `max_recursion` extra passes, honoring the per-entry recursion flags.
+        """
+        rng = rng or random.Random()
+        depths = [rule.depth if rule.depth is not None else default_depth for rule in self._rules]
+        window = max(depths, default=0)
+        haystack = _Haystack(self, list(messages[-window:]) if window else [])
+
+        activated: Dict[int, LoreEntry] = {}
+        pending = self._evaluate(haystack, depths, activated, rng, recursion=False)
+
+        passes = 0
+        while pending and passes < max_recursion:
+            buffer = [
+                entry.content
+                for entry in pending
+                if entry.content and not entry.preventRecursion
+            ]
+            if not buffer:
+                break
+            passes += 1
+            text = "\n".join(buffer)
+            haystack = _Haystack(self, [text], self._search_buffer(text))
+            pending = self._evaluate(
+                haystack, [1] * len(self._rules), activated, rng, recursion=True
+            )
+
+        return list(activated.values())
+
+    # -- helpers ------------------------------------------------------------ #
+    def _compile_key(self, entry: LoreEntry, key: str) -> KeyRef:
+        regex = _REGEX_KEY.match(key)
+        if regex:
+            flags = 0
+            for flag in regex.group(2):
+                flags |= _REGEX_FLAGS.get(flag, 0)
+            try:
+                return ("re", re.compile(regex.group(1), flags))
+            except re.error:
+                pass  # Not a valid regex; treat it as literal text.
+
+        kind = "cs" if entry.caseSensitive else "ci"
+        text = key if entry.caseSensitive else key.lower()
+        patterns = self._patterns[kind]
+        if text not in patterns:
+            patterns[text] = len(patterns)
+            self._single_word[kind].append(not any(ch.isspace() for ch in text))
+        return (kind, patterns[text])
+
+    def _search(
+        self, automaton: AhoCorasick, messages: Sequence[str], lower: bool
+    ) -> Hits:
+        if not automaton.patterns or not messages:
+            return {}
+
+        texts = [message.lower() for message in messages] if lower else messages
+        starts: List[int] = []
+        offset = 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + 1
+        haystack = "\n".join(texts)
+        single_word = self._single_word["ci" if lower else "cs"]
+        newest = len(texts) - 1
+
+        hits: Hits = {}
+        for pattern_id, end in automaton.iter_matches(haystack):
+            distance = newest - (bisect_right(starts, end - 1) - 1)
+            any_hit, word_hit = hits.get(pattern_id, (_NEVER, _NEVER))
+            if distance < any_hit:
+                any_hit = distance
+            if distance < word_hit:
+                start = end - len(automaton.patterns[pattern_id])
+                bounded = not single_word[pattern_id] or (
+                    (start == 0 or not _is_word_char(haystack[start - 1]))
+                    and (end == len(haystack) or not _is_word_char(haystack[end]))
+                )
+                if bounded:
+                    word_hit = distance
+            hits[pattern_id] = (any_hit, word_hit)
+        return hits
+
+    def _search_buffer(self, text: str) -> Dict[str, Hits]:
+        """
+        Hits in a recursion buffer. It is one message, so every distance is 0.
+
+        A key without whitespace always lies inside one whitespace-separated
+        word, with the same neighbours, so those keys are searched in the
+        buffer's distinct words only. Keys with whitespace are rare and are
+        looked up in the whole buffer with `in`.
+        """
+        words = ["\n".join(set(text.split()))]
+        hits: Dict[str, Hits] = {}
+        for kind, automaton in (("cs", self._sensitive), ("ci", self._insensitive)):
+            single_word = self._single_word[kind]
+            found = {
+                pattern_id: hit
+                for pattern_id, hit in self._search(automaton, words, kind == "ci").items()
+                if single_word[pattern_id]
+            }
+            if self._spaced[kind]:
+                buffer = text.lower() if kind == "ci" else text
+                for pattern_id in self._spaced[kind]:
+                    if automaton.patterns[pattern_id] in buffer:
+                        found[pattern_id] = (0, 0)
+            hits[kind] = found
+        return hits
+
+    def _evaluate(
+        self,
+        haystack: _Haystack,
+        depths: List[int],
+        activated: Dict[int, LoreEntry],
+        rng: random.Random,
+        recursion: bool,
+    ) -> List[LoreEntry]:
+        candidates = set(self._always)
+        for kind, hits in haystack.hits.items():
+            for pattern_id in hits:
+                candidates.update(self._by_pattern.get((kind, pattern_id), ()))
+
+        fresh: List[LoreEntry] = []
+        for rule_idx in sorted(candidates):
+            rule, depth = self._rules[rule_idx], depths[rule_idx]
+            entry = rule.entry
+            if entry.uid in activated:
+                continue
+            if recursion and entry.excludeRecursion:
+                continue
+            if not recursion and entry.delayUntilRecursion:
+                continue
+            if not (entry.constant and not recursion) and not self._matches(
+                rule, haystack, depth
+            ):
+                continue
+            if entry.useProbability and entry.probability < 100:
+                if rng.random() * 100 >= entry.probability:
+                    continue
+            activated[entry.uid] = entry
+            fresh.append(entry)
+        return fresh
+
+    def _matches(self, rule: _Rule, haystack: _Haystack, depth: int) -> bool:
+        whole = rule.whole_words
+        if not any(haystack.key_hit(ref, depth, whole) for ref in rule.primary):
+            return False
+        if not rule.entry.selective or not rule.secondary:
+            return True
+
+        found = [haystack.key_hit(ref, depth, whole) for ref in rule.secondary]
+        logic = rule.entry.selectiveLogic
+        if logic == NOT_ALL:
+            return not all(found)
+        if logic == NOT_ANY:
+            return not any(found)
+        if logic == AND_ALL:
+            return all(found)
+        return any(found)
+
+
+def _parse_depth(value: object) -> Optional[int]:
+    """Entry-level scanDepth may be null, an int, or a numeric string."""
+    if value is None or value == "":
+        return None
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
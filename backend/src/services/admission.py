@@ -0,0 +1,174 @@
+"""
+Admission control: separate concurrency limits for cheap and heavy routes.
+
+A few clients importing or downloading huge books should not be able to make
+the rest of the API unusable. Every request is put in one of two lanes:
+
+- heavy: whole-book work (create, import, export, duplicate detection). A
+  small number run at a time, fewer than the worker threads, so the thread
+  pool always has room for the cheap lane. A full-book read is cheap while
+  the book's encoded body is cached; the route takes a heavy slot with
+  `hold()` only to encode it.
+- cheap: everything else (library metadata, health, single-entry CRUD).
+
+Each lane runs up to `limit` requests at once and queues up to `queue` more
+in arrival order. A request that finds the queue full is answered 503 at
+once, with a Retry-After estimated from how long the lane's requests have
+been taking. Streams that stay open for the life of a client (GET /changes)
+take no slot.
+
+Configured with LOREMASTER_HEAVY_CONCURRENCY / LOREMASTER_HEAVY_QUEUE and
+LOREMASTER_CHEAP_CONCURRENCY / LOREMASTER_CHEAP_QUEUE; a concurrency of 0
+turns a lane's limit off.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.routing import compile_path
+
+DEFAULT_HEAVY_CONCURRENCY = 2
+DEFAULT_HEAVY_QUEUE = 16
+DEFAULT_CHEAP_CONCURRENCY = 64
+DEFAULT_CHEAP_QUEUE = 256
+
+# Route templates per lane; anything not listed is cheap.
+HEAVY_ROUTES = (
+    ("POST", "/lorebooks"),
+    ("POST", "/lorebooks/{lorebook_id}/import"),
+    ("GET", "/lorebooks/{lorebook_id}/export"),
+    ("GET", "/lorebooks/{lorebook_id}/duplicates"),
+    ("GET", "/lorebooks:duplicates"),
+)
+UNLIMITED_ROUTES = (("GET", "/changes"),)
+
+BUSY_DETAIL = "Server is busy, retry later"
+
+# Weight of the newest request in a lane's average duration.
+_DURATION_SMOOTHING = 0.2
+
+
+class Lane:
+    """A concurrency limit with a bounded FIFO queue in front of it."""
+
+    def __init__(self, name: str, limit: int, queue: int) -> None:
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.active = 0
+        self.rejected = 0
+        # Seconds a request in this lane usually takes; feeds Retry-After.
+        self.average_duration = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Wait for a slot; False (without waiting) when the queue is full."""
+        if not self.limit:
+            self.active += 1
+            return True
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.queue:
+            self.rejected += 1
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled.
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        return True
+
+    def release(self, duration: Optional[float] = None) -> None:
+        """Free a slot, handing it straight to the oldest queued request."""
+        if duration is not None:
+            self.average_duration += _DURATION_SMOOTHING * (duration - self.average_duration)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def hold(self) -> AsyncIterator[None]:
+        """Run the block in a slot; 503 with Retry-After when the queue is full."""
+        if not await self.acquire():
+            raise HTTPException(
+                status_code=503,
+                detail=BUSY_DETAIL,
+                headers={"Retry-After": str(self.retry_after())},
+            )
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def retry_after(self) -> int:
+        """Seconds until the queue has likely drained enough to take a request."""
+        if not self.limit:
+            return 1
+        backlog = (len(self._waiters) + 1) / self.limit
+        return max(1, math.ceil(backlog * self.average_duration))
+
+
+class Admission:
+    """Sorts requests into lanes by method and route template."""
+
+    def __init__(self, heavy: Lane, cheap: Lane) -> None:
+        self.heavy = heavy
+        self.cheap = cheap
+        self._routes: Tuple[Tuple[str, re.Pattern, Optional[Lane]], ...] = tuple(
+            (method, compile_path(path)[0], lane)
+            for lane, routes in ((heavy, HEAVY_ROUTES), (None, UNLIMITED_ROUTES))
+            for method, path in routes
+        )
+
+    @classmethod
+    def from_env(cls) -> "Admission":
+        def setting(name: str, default: int) -> int:
+            return int(os.getenv(name, str(default)))
+
+        return cls(
+            heavy=Lane(
+                "heavy",
+                setting("LOREMASTER_HEAVY_CONCURRENCY", DEFAULT_HEAVY_CONCURRENCY),
+                setting("LOREMASTER_HEAVY_QUEUE", DEFAULT_HEAVY_QUEUE),
+            ),
+            cheap=Lane(
+                "cheap",
+                setting("LOREMASTER_CHEAP_CONCURRENCY", DEFAULT_CHEAP_CONCURRENCY),
+                setting("LOREMASTER_CHEAP_QUEUE", DEFAULT_CHEAP_QUEUE),
+            ),
+        )
+
+    @property
+    def lanes(self) -> Dict[str, Lane]:
+        return {"heavy": self.heavy, "cheap": self.cheap}
+
+    def lane_for(self, method: str, path: str) -> Optional[Lane]:
+        """The request's lane, or None for routes that take no slot."""
+        for route_method, pattern, lane in self._routes:
+            if method == route_method and pattern.match(path):
+                return lane
+        return self.cheap
@@ -0,0 +1,296 @@
+"""
+Live change stream for open clients (GET /changes, Server-Sent Events).
+
+Every LorebookStore reports its edits through a hook the TenantRegistry
+installs. The hook runs on whichever thread made the edit, while the book is
+still write-locked, and builds the entry-level diff there (only when the
+tenant has subscribers). It then hands the diff to the event loop, which:
+
+- coalesces edits to the same book that arrive within `coalesce_window`
+  (the editor saves several times a second while typing) into one event;
+- encodes each event once and appends the same bytes to every subscriber;
+- bounds each subscriber's queue. A subscriber `queue_limit` events behind
+  has its queue replaced by a single `resync` event, so a slow client costs
+  a fixed amount of memory and never holds up the others.
+
+Events (the `event:` field; `data:` is JSON):
+
+- `change`: `{"lorebook": meta, "since": v, "reset": bool, "upserted": [...],
+  "deleted": [...]}`. Entries changed between book version `since` and
+  `lorebook.version`. With `reset`, the diff was too large to send and the
+  client should fetch `/lorebooks/{id}/changes?since=...` or the whole book.
+- `created`: `{"lorebook": meta}`.
+- `deleted`: `{"lorebookId": id}`.
+- `resync`: `{}`; events were dropped, refetch the library.
+
+Subscribers are per process. With several worker processes, edits made by
+another process reach this one's subscribers as `reset` changes when this
+process next syncs with the database (on its next request for the tenant).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from .encoding import dumps
+from .records import BookRecord
+
+DEFAULT_COALESCE_WINDOW = 0.05
+DEFAULT_QUEUE_LIMIT = 64
+# Diffs touching more entries than this are sent as `reset` changes.
+MAX_EVENT_ENTRIES = 500
+KEEPALIVE_INTERVAL = 15.0
+
+RETRY_FRAME = b"retry: 3000\n\n"
+KEEPALIVE_FRAME = b": keepalive\n\n"
+RESYNC_FRAME = b"event: resync\ndata: {}\n\n"
+
+# (kind, book, version the book had before the edit, UIDs of changed entries).
+# Kinds are "change", "created", "deleted" and "reset" (a book reloaded from
+# storage after another process changed it).
+ChangeHook = Callable[[str, BookRecord, int, Sequence[int]], None]
+
+
+class _Change:
+    """One book's pending event; later edits within the window merge into it."""
+
+    __slots__ = ("kind", "book_id", "since", "meta", "upserted", "deleted", "reset")
+
+    def __init__(
+        self,
+        kind: str,
+        book_id: str,
+        since: int,
+        meta: Dict[str, Any],
+        upserted: Dict[int, Dict[str, Any]],
+        deleted: Set[int],
+        reset: bool,
+    ) -> None:
+        self.kind = kind
+        self.book_id = book_id
+        self.since = since
+        self.meta = meta
+        self.upserted = upserted
+        self.deleted = deleted
+        self.reset = reset
+
+    def absorb(self, later: "_Change", max_entries: int) -> None:
+        self.meta = later.meta
+        if self.reset or later.reset:
+            self._reset()
+            return
+        for uid, entry in later.upserted.items():
+            self.deleted.discard(uid)
+            self.upserted[uid] = entry
+        for uid in later.deleted:
+            self.upserted.pop(uid, None)
+            self.deleted.add(uid)
+        if len(self.upserted) + len(self.deleted) > max_entries:
+            self._reset()
+
+    def _reset(self) -> None:
+        self.reset = True
+        self.upserted = {}
+        self.deleted = set()
+
+    def encode(self) -> bytes:
+        if self.kind == "change":
+            data: Dict[str, Any] = {
+                "lorebook": self.meta,
+                "since": self.since,
+                "reset": self.reset,
+                "upserted": list(self.upserted.values()),
+                "deleted": sorted(self.deleted),
+            }
+        elif self.kind == "created":
+            data = {"lorebook": self.meta}
+        else:
+            data = {"lorebookId": self.book_id}
+        return b"event: %s\ndata: %s\n\n" % (self.kind.encode(), dumps(data))
+
+
+class Subscription:
+    """
+    One open stream: a bounded queue of encoded events.
+
+    Kept small, since thousands may sit idle: no Event or wait_for task, just
+    a future created while the stream waits and a timer for the keepalive.
+    """
+
+    __slots__ = ("tenant", "closed", "_queue", "_waiter", "_limit")
+
+    def __init__(self, tenant: str, limit: int) -> None:
+        self.tenant = tenant
+        self.closed = False
+        self._queue: List[bytes] = []
+        self._waiter: Optional[asyncio.Future] = None
+        self._limit = limit
+
+    def close(self) -> None:
+        """Stop the stream (the client went away); wakes a waiting next()."""
+        self.closed = True
+        _wake(self._waiter)
+
+    def push(self, frame: bytes) -> bool:
+        """Queue a frame; returns False when the queue overflowed into a resync."""
+        overflowed = len(self._queue) >= self._limit
+        if overflowed:
+            self._queue = [RESYNC_FRAME]
+        else:
+            self._queue.append(frame)
+        _wake(self._waiter)
+        return not overflowed
+
+    async def next(self, timeout: float) -> bytes:
+        """
+        Everything queued, or an empty string after `timeout` seconds idle or
+        once closed.
+        """
+        if not self._queue and not self.closed:
+            loop = asyncio.get_running_loop()
+            self._waiter = loop.create_future()
+            timer = loop.call_later(timeout, _wake, self._waiter)
+            try:
+                await self._waiter
+            finally:
+                timer.cancel()
+                self._waiter = None
+        frames = b"".join(self._queue)
+        self._queue = []
+        return frames
+
+
+def _wake(waiter: Optional[asyncio.Future]) -> None:
+    if waiter is not None and not waiter.done():
+        waiter.set_result(None)
+
+
+class ChangeBroker:
+    """Fans store edits out to the subscribers of each tenant."""
+
+    def __init__(
+        self,
+        coalesce_window: float = DEFAULT_COALESCE_WINDOW,
+        queue_limit: int = DEFAULT_QUEUE_LIMIT,
+        max_entries: int = MAX_EVENT_ENTRIES,
+        keepalive: float = KEEPALIVE_INTERVAL,
+    ) -> None:
+        self.coalesce_window = coalesce_window
+        self.queue_limit = queue_limit
+        self.max_entries = max_entries
+        self.keepalive = keepalive
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._pending: Dict[Tuple[str, str], _Change] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.events = 0
+        self.resyncs = 0
+
+    @classmethod
+    def from_env(cls) -> "ChangeBroker":
+        """
+        LOREMASTER_CHANGE_COALESCE_MS merges edits to a book made within that
+        many milliseconds; LOREMASTER_CHANGE_QUEUE_LIMIT is how many events a
+        subscriber may fall behind before it is told to resync.
+        """
+        window_ms = os.getenv("LOREMASTER_CHANGE_COALESCE_MS")
+        queue_limit = os.getenv("LOREMASTER_CHANGE_QUEUE_LIMIT")
+        return cls(
+            coalesce_window=(
+                int(window_ms) / 1000 if window_ms else DEFAULT_COALESCE_WINDOW
+            ),
+            queue_limit=int(queue_limit) if queue_limit else DEFAULT_QUEUE_LIMIT,
+        )
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def hook(self, tenant: str) -> ChangeHook:
+        """The LorebookStore change hook for one tenant."""
+
+        def publish(kind: str, book: BookRecord, since: int, changed: Sequence[int]) -> None:
+            # Called on the editing thread with the book locked; bail out
+            # before doing any work if nobody listens.
+            loop = self._loop
+            if loop is None or not self._subscribers.get(tenant):
+                return
+            upserted: Dict[int, Dict[str, Any]] = {}
+            deleted: Set[int] = set()
+            reset = kind == "reset"
+            if reset:
+                kind = "change"
+            elif len(changed) > self.max_entries:
+                reset = True
+            else:
+                for uid in changed:
+                    entry = book.entries.get(uid)
+                    if entry is None:
+                        deleted.add(uid)
+                    else:
+                        upserted[uid] = entry.to_dict()
+            change = _Change(
+                kind, book.id, since, book.to_meta().model_dump(), upserted, deleted, reset
+            )
+            try:
+                loop.call_soon_threadsafe(self._merge, tenant, change)
+            except RuntimeError:  # loop closed during shutdown
+                pass
+
+        return publish
+
+    # -- event loop side ------------------------------------------------------ #
+    @contextmanager
+    def subscribe(self, tenant: str) -> Iterator[Subscription]:
+        """Receive the tenant's events for the duration of the block."""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(tenant, self.queue_limit)
+        subscribers = self._subscribers.setdefault(tenant, set())
+        subscribers.add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscribers.discard(subscription)
+            if not subscribers and self._subscribers.get(tenant) is subscribers:
+                del self._subscribers[tenant]
+
+    def _merge(self, tenant: str, change: _Change) -> None:
+        key = (tenant, change.book_id)
+        if change.kind != "change":
+            # Creations and deletions go out at once; a deletion also drops
+            # edits to the book still waiting in the window.
+            self._pending.pop(key, None)
+            self._broadcast(tenant, change.encode())
+            return
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending.absorb(change, self.max_entries)
+        elif self.coalesce_window:
+            self._pending[key] = change
+            self._loop.call_later(self.coalesce_window, self._flush, key)
+        else:
+            self._broadcast(tenant, change.encode())
+
+    def _flush(self, key: Tuple[str, str]) -> None:
+        change = self._pending.pop(key, None)
+        if change is not None:
+            self._broadcast(key[0], change.encode())
+
+    def _broadcast(self, tenant: str, frame: bytes) -> None:
+        subscribers: List[Subscription] = list(self._subscribers.get(tenant, ()))
+        self.events += 1
+        for subscription in subscribers:
+            if not subscription.push(frame):
+                self.resyncs += 1
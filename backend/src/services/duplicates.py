@@ -0,0 +1,235 @@
+"""
+Near-duplicate entry detection with MinHash signatures and LSH.
+
+Comparing every pair of entries is quadratic. Instead each entry is reduced
+to a short signature whose positions agree with another entry's about as
+often as their shingle sets overlap (Jaccard similarity):
+
+- Shingles are the entry's content as overlapping runs of SHINGLE_WORDS
+  words, plus each keyword on its own, so rewording a sentence or adding a
+  keyword only changes a few of them.
+- The signature is one-permutation MinHash: every shingle is hashed once,
+  the low bits pick one of SIGNATURE_SIZE bins and each bin keeps the
+  smallest value that lands in it. Bins no shingle reached borrow from the
+  next filled bin (rotation densification), so short entries still compare.
+- Locality-sensitive hashing splits the signature into BANDS bands. Entries
+  sharing any whole band land in the same bucket and become candidates;
+  only candidates have their signatures compared.
+
+With 16 bands of 4 rows, pairs at 0.5 similarity become candidates about
+two times in three and pairs at 0.7 almost always, so thresholds below 0.5
+miss matches. Within a bucket, entries are compared with the bucket's first
+member only; a pair this skips is usually linked through another band.
+
+A DuplicateIndex holds the signatures and buckets of one book. Like the
+search index it is built on first use and then kept current entry by entry
+by the store. Signatures use Python's string hash, which is salted per
+process, so they are never persisted or compared across processes.
+"""
+
+from __future__ import annotations
+
+import operator
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ..models import LoreEntry
+from .search import tokenize
+
+SHINGLE_WORDS = 3
+SIGNATURE_SIZE = 64
+BANDS = 16
+ROWS = SIGNATURE_SIZE // BANDS
+
+_BIN_MASK = SIGNATURE_SIZE - 1
+_VALUE_MASK = (1 << 32) - 1
+# Added per bin travelled when an empty bin borrows a neighbour's value.
+_ROTATION_STEP = 0x9E3779B1
+
+# (lorebook ID, entry UID)
+Member = Tuple[str, int]
+
+
+def signature(entry: LoreEntry) -> Optional[array]:
+    """The entry's MinHash signature, or None when it has nothing to compare."""
+    words = tokenize(entry.content)
+    if len(words) >= SHINGLE_WORDS:
+        shingles: Set[object] = set(zip(*(words[i:] for i in range(SHINGLE_WORDS))))
+    else:
+        shingles = {" ".join(words)} if words else set()
+    shingles.update(("key", keyword.casefold()) for keyword in entry.key)
+    if not shingles:
+        return None
+
+    # Highest hash first, so each bin ends up with its smallest hash.
+    hashes = sorted(map(hash, shingles), reverse=True)
+    bins = {value & _BIN_MASK: (value >> 32) & _VALUE_MASK for value in hashes}
+    values = list(map(bins.get, range(SIGNATURE_SIZE)))
+    if len(bins) < SIGNATURE_SIZE:
+        for position in range(SIGNATURE_SIZE):
+            if values[position] is None:
+                distance = 1
+                while (position + distance) & _BIN_MASK not in bins:
+                    distance += 1
+                borrowed = bins[(position + distance) & _BIN_MASK]
+                values[position] = (borrowed + distance * _ROTATION_STEP) & _VALUE_MASK
+    return array("I", values)
+
+
+def band_keys(sig: array) -> array:
+    raw = sig.tobytes()
+    width = len(raw) // BANDS
+    return array("q", (hash((band, raw[band * width : (band + 1) * width])) for band in range(BANDS)))
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimated Jaccard similarity: the share of positions that agree."""
+    return sum(map(operator.eq, a, b)) / SIGNATURE_SIZE
+
+
+class DuplicateIndex:
+    """MinHash signatures and LSH buckets for one lorebook."""
+
+    def __init__(self, entries: Iterable[LoreEntry] = ()) -> None:
+        self.signatures: Dict[int, array] = {}
+        self._bands: Dict[int, array] = {}
+        # Band key -> UIDs whose signature has that band.
+        self.buckets: Dict[int, Set[int]] = {}
+        for entry in entries:
+            self.add(entry)
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def add(self, entry: LoreEntry) -> None:
+        sig = signature(entry)
+        if sig is None:
+            return
+        keys = band_keys(sig)
+        self.signatures[entry.uid] = sig
+        self._bands[entry.uid] = keys
+        buckets = self.buckets
+        for key in keys:
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = {entry.uid}
+            else:
+                bucket.add(entry.uid)
+
+    def remove(self, entry_uid: int) -> None:
+        keys = self._bands.pop(entry_uid, None)
+        if keys is None:
+            return
+        del self.signatures[entry_uid]
+        for key in keys:
+            bucket = self.buckets[key]
+            bucket.discard(entry_uid)
+            if not bucket:
+                del self.buckets[key]
+
+    def replace(self, entry: LoreEntry) -> None:
+        self.remove(entry.uid)
+        self.add(entry)
+
+
+class _Clusters:
+    """Union-find over member numbers, tracking each cluster's weakest link."""
+
+    def __init__(self, size: int) -> None:
+        self._parent = list(range(size))
+        self.weakest: Dict[int, float] = {}
+
+    def find(self, member: int) -> int:
+        parent = self._parent
+        root = member
+        while parent[root] != root:
+            root = parent[root]
+        while member != root:  # point the whole path at the root
+            parent[member], member = root, parent[member]
+        return root
+
+    def union(self, a: int, b: int, score: float) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self._parent[root_b] = root_a
+            score = min(score, self.weakest.pop(root_b, score))
+        self.weakest[root_a] = min(score, self.weakest.get(root_a, score))
+
+    def groups(self) -> List[Tuple[float, List[int]]]:
+        """Clusters of two or more members, with their weakest link."""
+        members: Dict[int, List[int]] = {}
+        for root in self.weakest:
+            members[root] = []
+        for member in range(len(self._parent)):
+            root = self.find(member)
+            if root in members:
+                members[root].append(member)
+        return [(self.weakest[root], group) for root, group in members.items()]
+
+
+class ClusterFinder:
+    """
+    Finds clusters across the books added to it. add() takes what it needs
+    from a book's index right away, so the caller only has to hold the book's
+    lock during that call.
+    """
+
+    def __init__(self) -> None:
+        # Entries are numbered in the order they are added; plain ints keep
+        # the bucket maps below out of the garbage collector's way.
+        self._members: List[Member] = []
+        self._signatures: List[array] = []
+        # Band key -> member; most keys belong to a single entry, so a
+        # member list is only built once a key turns up a second time.
+        self._first: Dict[int, int] = {}
+        self._shared: Dict[int, List[int]] = {}
+
+    @property
+    def scanned(self) -> int:
+        return len(self._members)
+
+    def add(self, book_id: str, index: DuplicateIndex) -> None:
+        base = len(self._members)
+        number = {uid: base + offset for offset, uid in enumerate(index.signatures)}
+        self._members.extend((book_id, uid) for uid in number)
+        # Signatures are replaced, never changed in place, so they stay valid
+        # after the book is edited.
+        self._signatures.extend(index.signatures.values())
+        first, shared = self._first, self._shared
+        for key, uids in index.buckets.items():
+            if len(uids) == 1 and key not in first and key not in shared:
+                (uid,) = uids
+                first[key] = number[uid]
+                continue
+            bucket = shared.get(key)
+            if bucket is None:
+                bucket = shared[key] = []
+                seen = first.pop(key, None)
+                if seen is not None:
+                    bucket.append(seen)
+            bucket.extend(number[uid] for uid in uids)
+
+    def clusters(self, threshold: float) -> List[Tuple[float, List[Member]]]:
+        """
+        Clusters linked by estimated similarity of at least `threshold`,
+        largest first, each with the lowest similarity among its links.
+        """
+        signatures = self._signatures
+        clusters = _Clusters(len(signatures))
+        for bucket in self._shared.values():
+            anchor = bucket[0]
+            anchor_sig = signatures[anchor]
+            for member in bucket[1:]:
+                if clusters.find(member) == clusters.find(anchor):
+                    continue
+                score = similarity(anchor_sig, signatures[member])
+                if score >= threshold:
+                    clusters.union(anchor, member, score)
+
+        members = self._members
+        groups = [
+            (score, sorted(members[number] for number in group))
+            for score, group in clusters.groups()
+        ]
+        groups.sort(key=lambda item: (-len(item[1]), -item[0], item[1][0]))
+        return groups
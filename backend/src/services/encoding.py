@@ -0,0 +1,28 @@
+"""
+JSON encoding for responses the store caches as bytes.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise. Both produce compact UTF-8 JSON that FastAPI can send as-is.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def dumps(value: Any) -> bytes:
+    """Encode plain Python data (dicts, lists, scalars) to JSON bytes."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            # orjson rejects integers outside 64 bits, which extra entry keys
+            # may contain; the standard library handles them.
+            pass
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
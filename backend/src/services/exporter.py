@@ -0,0 +1,67 @@
+"""
+Streaming lorebook export.
+
+Books are serialized one entry at a time and yielded in small chunks, so the
+first bytes go out immediately and memory use does not depend on book size.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Iterator, List
+
+from .records import CompactEntry
+from ..models import LorebookMeta
+
+EXPORT_FORMATS = {
+    "native": "application/json",
+    "sillytavern": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+# Entries serialized per yielded chunk; keeps per-chunk overhead low while
+# still flushing early.
+EXPORT_CHUNK_ENTRIES = 128
+
+
+def _st_entry(entry: CompactEntry) -> str:
+    """
+    SillyTavern spells the disabled flag `disable`; emit both spellings. Any
+    extra field already named `disable` is overwritten, so the entry carries
+    the flag once.
+    """
+    data = entry.to_dict()
+    data["disable"] = entry.disabled
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def iter_export(
+    meta: LorebookMeta, entries: List[CompactEntry], fmt: str
+) -> Iterator[str]:
+    """
+    Yield the serialized book in `fmt` (see EXPORT_FORMATS). Runs lazily, long
+    after the caller's lock is gone, so it takes snapshots, not the book.
+    """
+    if fmt == "ndjson":
+        for start in range(0, len(entries), EXPORT_CHUNK_ENTRIES):
+            chunk = entries[start : start + EXPORT_CHUNK_ENTRIES]
+            yield "".join(entry.dump_json() + "\n" for entry in chunk)
+        return
+
+    if fmt == "sillytavern":
+        yield '{"entries":{'
+        for start in range(0, len(entries), EXPORT_CHUNK_ENTRIES):
+            chunk = entries[start : start + EXPORT_CHUNK_ENTRIES]
+            body = ",".join(f'"{entry.uid}":{_st_entry(entry)}' for entry in chunk)
+            yield ("," if start else "") + body
+        yield "}}"
+        return
+
+    head = meta.model_dump_json()
+    yield f'{head[:-1]},"entries":['
+    for start in range(0, len(entries), EXPORT_CHUNK_ENTRIES):
+        chunk = entries[start : start + EXPORT_CHUNK_ENTRIES]
+        yield ("," if start else "") + ",".join(
+            entry.dump_json() for entry in chunk
+        )
+    yield "]}"
@@ -0,0 +1,273 @@
+"""
+Streaming lorebook import.
+
+Entries are parsed out of the request body as bytes arrive and handed to the
+store in small batches, so memory use is bounded by the batch size and the
+largest single entry rather than the size of the upload.
+
+Two formats are accepted:
+
+- JSON: a SillyTavern world-info file (`{"entries": {"0": {...}, ...}}`), a
+  native export (`{"name": ..., "entries": [...]}`), or a bare entry array.
+- NDJSON: one entry object per line.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+import json
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from .normalize import normalize_entries
+from .store import LorebookStore
+from .workers import WorkerPool
+from ..models import ImportProgress
+
+# Entries are committed to the store (and storage backend) in batches of this
+# size, which also sets how often progress advances.
+IMPORT_BATCH_SIZE = 500
+
+# Largest single JSON value we are willing to buffer while waiting for it to
+# complete. Anything bigger is almost certainly not a lore entry.
+MAX_PENDING_CHARS = 16 * 1024 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+
+class ImportFormatError(ValueError):
+    """Raised when the uploaded body cannot be parsed."""
+
+
+class _NeedMore(Exception):
+    """Internal signal: the buffer ends before the next token is complete."""
+
+
+class NdjsonEntryParser:
+    """Yields one entry dict per non-empty line."""
+
+    def __init__(self) -> None:
+        self._buf = ""
+
+    def feed(self, text: str) -> List[Dict]:
+        self._buf += text
+        *lines, self._buf = self._buf.split("\n")
+        if len(self._buf) > MAX_PENDING_CHARS:
+            raise ImportFormatError("NDJSON line too long")
+        return [entry for line in lines if (entry := self._parse(line)) is not None]
+
+    def close(self) -> List[Dict]:
+        entry = self._parse(self._buf)
+        self._buf = ""
+        return [entry] if entry is not None else []
+
+    @staticmethod
+    def _parse(line: str) -> Optional[Dict]:
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ImportFormatError(f"Invalid NDJSON line: {exc}") from exc
+        return value if isinstance(value, dict) else None
+
+
+class JsonEntryParser:
+    """
+    Incremental parser that walks the top level of a lorebook JSON document.
+
+    Only the entries container is streamed; each entry (and every other
+    top-level value) is decoded whole with `json.JSONDecoder.raw_decode` once
+    its text has fully arrived. Nothing is consumed from the buffer until a
+    complete token is available, so parsing simply resumes on the next feed.
+    """
+
+    def __init__(self) -> None:
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._final = False
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._entries_kind: Optional[str] = None  # "dict" or "list"
+        self._top_level_array = False
+        self.meta: Dict[str, object] = {}
+
+    def feed(self, text: str) -> List[Dict]:
+        self._buf = self._buf[self._pos :] + text
+        self._pos = 0
+        entries: List[Dict] = []
+        try:
+            while self._state != "end":
+                self._step(entries)
+        except _NeedMore:
+            if len(self._buf) - self._pos > MAX_PENDING_CHARS:
+                raise ImportFormatError("JSON value too large to import")
+        return entries
+
+    def close(self) -> List[Dict]:
+        self._final = True
+        entries = self.feed("")
+        if self._state != "end":
+            raise ImportFormatError("Unexpected end of JSON document")
+        return entries
+
+    # -- state machine ------------------------------------------------------ #
+    def _step(self, entries: List[Dict]) -> None:
+        state = self._state
+        pos = self._skip_ws(self._pos)
+
+        if state == "start":
+            char = self._peek(pos)
+            if char == "[":
+                self._top_level_array = True
+                self._entries_kind = "list"
+                self._commit(pos + 1, "entries")
+            elif char == "{":
+                self._commit(pos + 1, "top")
+            else:
+                raise ImportFormatError("Expected a JSON object or array")
+
+        elif state == "top":
+            pos = self._skip_comma(pos)
+            if self._peek(pos) == "}":
+                self._commit(pos + 1, "end")
+                return
+            key, pos = self._decode_key(pos)
+            if key == "entries":
+                self._commit(pos, "entries_open")
+            else:
+                self._key = key
+                self._commit(pos, "top_value")
+
+        elif state == "top_value":
+            value, pos = self._decode(pos)
+            self.meta[self._key] = value
+            self._commit(pos, "top")
+
+        elif state == "entries_open":
+            char = self._peek(pos)
+            if char in "{[":
+                self._entries_kind = "dict" if char == "{" else "list"
+                self._commit(pos + 1, "entries")
+            else:
+                _, pos = self._decode(pos)  # e.g. `"entries": null`
+                self._commit(pos, "top")
+
+        elif state == "entries":
+            pos = self._skip_comma(pos)
+            closer = "}" if self._entries_kind == "dict" else "]"
+            if self._peek(pos) == closer:
+                self._commit(pos + 1, "end" if self._top_level_array else "top")
+                return
+            if self._entries_kind == "dict":
+                _, pos = self._decode_key(pos)
+            value, pos = self._decode(pos)
+            if isinstance(value, dict):
+                entries.append(value)
+            self._commit(pos, "entries")
+
+    # -- low-level helpers -------------------------------------------------- #
+    def _commit(self, pos: int, state: str) -> None:
+        self._pos = pos
+        self._state = state
+
+    def _peek(self, pos: int) -> str:
+        if pos >= len(self._buf):
+            raise _NeedMore
+        return self._buf[pos]
+
+    def _skip_ws(self, pos: int) -> int:
+        buf = self._buf
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        return pos
+
+    def _skip_comma(self, pos: int) -> int:
+        if self._peek(pos) == ",":
+            pos = self._skip_ws(pos + 1)
+        return pos
+
+    def _decode(self, pos: int):
+        pos = self._skip_ws(pos)
+        try:
+            value, end = self._decoder.raw_decode(self._buf, pos)
+        except json.JSONDecodeError as exc:
+            if self._final:
+                raise ImportFormatError(f"Invalid JSON: {exc}") from exc
+            raise _NeedMore
+        # A number at the very end of the buffer may still be growing.
+        if end >= len(self._buf) and not self._final:
+            raise _NeedMore
+        return value, self._skip_ws(end)
+
+    def _decode_key(self, pos: int):
+        key, pos = self._decode(pos)
+        if not isinstance(key, str) or self._peek(pos) != ":":
+            raise ImportFormatError("Expected an object key")
+        return key, pos + 1
+
+
+def open_entry_parser(fmt: str):
+    if fmt == "ndjson":
+        return NdjsonEntryParser()
+    if fmt == "json":
+        return JsonEntryParser()
+    raise ImportFormatError(f"Unsupported import format: {fmt}")
+
+
+async def stream_import(
+    store: LorebookStore,
+    lorebook_id: str,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    workers: WorkerPool,
+) -> ImportProgress:
+    """
+    Feed an uploaded byte stream into a lorebook, batch by batch. Parsing
+    stays on the event loop (it is interleaved with reading the body);
+    validating and storing each batch runs on the worker pool.
+    """
+    parser = open_entry_parser(fmt)
+    progress = store.start_import(lorebook_id, fmt)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    batch: List[Dict] = []
+
+    async def flush(entries: List[Dict]) -> None:
+        normalized, skipped = await workers.run_cpu(normalize_entries, entries)
+        progress.entriesSkipped += skipped
+        await workers.run(store.import_normalized, lorebook_id, normalized, progress)
+
+    # Every way out of the loop, including the book being deleted, a worker
+    # failing or the client going away, marks the import finished.
+    error: Optional[str] = None
+    try:
+        async for chunk in chunks:
+            progress.bytesRead += len(chunk)
+            batch.extend(parser.feed(decoder.decode(chunk)))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await flush(batch)
+                batch = []
+
+        batch.extend(parser.feed(decoder.decode(b"", final=True)))
+        batch.extend(parser.close())
+        if batch:
+            await flush(batch)
+    except (ImportFormatError, UnicodeDecodeError) as exc:
+        error = str(exc)
+        raise ImportFormatError(error) from exc
+    except HTTPException as exc:
+        error = str(exc.detail)
+        raise
+    except asyncio.CancelledError:
+        error = "Import cancelled"
+        raise
+    except BaseException as exc:
+        error = str(exc) or type(exc).__name__
+        raise
+    finally:
+        store.finish_import(progress, error=error)
+    return progress
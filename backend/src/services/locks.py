@@ -0,0 +1,92 @@
+"""Thread synchronisation helpers for state shared with worker threads."""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class RWLock:
+    """
+    Many readers or one writer.
+
+    A waiting writer blocks new readers, so a steady stream of reads cannot
+    starve an edit. The writer may re-enter `write()` and may call `read()`
+    while it holds the lock; readers must not nest `read()` calls.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer: Optional[int] = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                owned = False
+            else:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+                self._readers += 1
+                owned = True
+        try:
+            yield
+        finally:
+            if owned:
+                with self._cond:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._cond.notify_all()
+
+    @contextmanager
+    def try_read(self) -> Iterator[bool]:
+        """
+        Like `read()` but never waits: yields False, holding nothing, when a
+        writer holds the lock or is waiting for it.
+        """
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                acquired, owned = True, False
+            elif self._writer is not None or self._waiting_writers:
+                acquired = owned = False
+            else:
+                self._readers += 1
+                acquired = owned = True
+        try:
+            yield acquired
+        finally:
+            if owned:
+                with self._cond:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+            else:
+                self._waiting_writers += 1
+                try:
+                    while self._writer is not None or self._readers:
+                        self._cond.wait()
+                finally:
+                    self._waiting_writers -= 1
+                self._writer = me
+                self._writer_depth = 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer_depth -= 1
+                if not self._writer_depth:
+                    self._writer = None
+                    self._cond.notify_all()
@@ -0,0 +1,183 @@
+"""
+Process-wide metrics in the Prometheus text format.
+
+Only counters and histograms are needed, so they are implemented here
+instead of pulling in prometheus_client. Recording a value is a bisect and a
+few adds under an uncontended lock, cheap enough to leave on in production.
+The lock matters because worker threads record too (entry normalization),
+and a read-modify-write on a shared dict is not atomic.
+Gauges that describe current state (store size) are computed when
+`/metrics` is scraped rather than kept up to date on every write.
+
+With several worker processes each keeps its own numbers, and a scrape
+reports whichever worker answered it.
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = tuple(float(4 ** power) for power in range(2, 13))  # 16 B .. 16 MiB
+NORMALIZE_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: [per-bucket counts (last one is +Inf), sum, count].
+        self._series: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str, count: int = 1) -> None:
+        """Record `value`; `count` records it that many times (batch means)."""
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bucket] += count
+            series[1] += value * count
+            series[2] += count
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        bounds = [_number(bound) for bound in self.buckets] + ["+Inf"]
+        with self._lock:
+            snapshot = sorted(
+                (labels, (list(counts), total, count))
+                for labels, (counts, total, count) in self._series.items()
+            )
+        for labels, (counts, total, count) in snapshot:
+            cumulative = 0
+            for bound, bucket in zip(bounds, counts):
+                cumulative += bucket
+                series_labels = _labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{series_labels} {cumulative}")
+            plain = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{plain} {_number(total)}")
+            lines.append(f"{self.name}_count{plain} {count}")
+        return lines
+
+
+def sample(name: str, documentation: str, value: float, kind: str = "gauge") -> List[str]:
+    """Render one unlabelled value read at scrape time."""
+    return [
+        f"# HELP {name} {documentation}",
+        f"# TYPE {name} {kind}",
+        f"{name} {_number(value)}",
+    ]
+
+
+HTTP_REQUESTS = Counter(
+    "loremaster_http_requests_total",
+    "HTTP requests by route template and status.",
+    ("method", "route", "status"),
+)
+HTTP_LATENCY = Histogram(
+    "loremaster_http_request_duration_seconds",
+    "Time from receiving a request to sending the last response byte.",
+    ("method", "route"),
+)
+HTTP_REQUEST_SIZE = Histogram(
+    "loremaster_http_request_size_bytes",
+    "Request body size.",
+    ("method", "route"),
+    SIZE_BUCKETS,
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "loremaster_http_response_size_bytes",
+    "Response body size.",
+    ("method", "route"),
+    SIZE_BUCKETS,
+)
+NORMALIZE_DURATION = Histogram(
+    "loremaster_entry_normalize_duration_seconds",
+    "Time to coerce and validate one entry payload; batches record their mean per entry.",
+    buckets=NORMALIZE_BUCKETS,
+)
+DISCORD_LATENCY = Histogram(
+    "loremaster_discord_request_duration_seconds",
+    "Outbound Discord API calls, one sample per attempt.",
+    ("endpoint", "status"),
+)
+
+COLLECTORS = (
+    HTTP_REQUESTS,
+    HTTP_LATENCY,
+    HTTP_REQUEST_SIZE,
+    HTTP_RESPONSE_SIZE,
+    NORMALIZE_DURATION,
+    DISCORD_LATENCY,
+)
+
+
+def render(extra: Iterable[str] = ()) -> str:
+    """All process metrics plus `extra` pre-rendered lines, as exposition text."""
+    lines: List[str] = []
+    for collector in COLLECTORS:
+        lines.extend(collector.render())
+    lines.extend(extra)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,113 @@
+"""
+Coercion of entry payloads into LoreEntry models.
+
+Kept apart from the store, with no side effects on import, because
+normalize_entries() runs in worker processes: a spawned process unpickling
+it imports only this module and what it needs.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Annotated, Any, Dict, List, Optional, Tuple, Union
+
+from pydantic import BaseModel, Field, TypeAdapter
+
+from ..models import EntryPayload, LoreEntry
+from ..utils import generate_entry_uid, normalize_string_list
+from . import metrics
+
+EntryLike = Union[LoreEntry, EntryPayload, Dict[str, object]]
+
+
+def normalize_entry(entry: EntryLike, force_uid: Optional[int] = None) -> LoreEntry:
+    """
+    Accept either a BaseModel or raw dict and coerce fields into the shape
+    the frontend expects (arrays instead of dicts, populated UID, etc.).
+    """
+    started = time.perf_counter()
+    if isinstance(entry, LoreEntry) and force_uid is None and entry.uid:
+        extra = entry.__pydantic_extra__ or {}
+        if "disable" not in extra and not any(value is None for value in extra.values()):
+            # Already validated (e.g. CreateLorebookPayload entries) and
+            # dumping it again would change nothing.
+            return entry
+    if isinstance(entry, BaseModel):
+        data = entry.model_dump(exclude_none=True)
+    elif isinstance(entry, dict):
+        data = dict(entry)
+    else:
+        raise ValueError("Unsupported entry payload")
+
+    data["key"] = normalize_string_list(data.get("key", []))
+    data["keysecondary"] = normalize_string_list(data.get("keysecondary", []))
+    data["uid"] = force_uid or data.get("uid") or generate_entry_uid()
+    # SillyTavern spells the flag `disable`. It becomes `disabled` (unless
+    # that was given as well) rather than an extra field the model ignores.
+    disable = data.pop("disable", None)
+    if disable is not None:
+        given = entry.model_fields_set if isinstance(entry, BaseModel) else entry
+        if "disabled" not in given:
+            data["disabled"] = disable
+
+    if isinstance(entry, EntryPayload) and disable is None:
+        # Every field already passed EntryPayload's validation with the type
+        # LoreEntry declares (minus None, dropped above); only the keyword
+        # lists were reshaped, so validating again would change nothing.
+        normalized = LoreEntry.model_construct(**data)
+    else:
+        normalized = LoreEntry(**data)
+    metrics.NORMALIZE_DURATION.observe(time.perf_counter() - started)
+    return normalized
+
+
+# Validates a whole batch in one call. An item that is strictly valid as it
+# stands comes back as a LoreEntry; anything else is returned untouched
+# (LoreEntry is tried first, then Any) for normalize_entry() to handle.
+_ENTRY_BATCH = TypeAdapter(
+    List[Annotated[Union[LoreEntry, Any], Field(union_mode="left_to_right")]]
+)
+
+
+def normalize_entries(
+    entries: List[EntryLike], skip_invalid: bool = True
+) -> Tuple[List[LoreEntry], int]:
+    """
+    Normalize a batch of imported entries, skipping invalid ones (or raising
+    the first error when `skip_invalid` is false). Returns the valid entries
+    and the number skipped. Pure, so it can run in a worker process.
+
+    The batch is validated in one strict pass, which accepts a raw entry only
+    when every field already has its final type: nothing needs coercing, so
+    the result is what normalize_entry() would build. The entries it leaves
+    alone (keywords as an object, "3" for a number, model instances, ...) and
+    those spelling the disabled flag `disable` go through normalize_entry()
+    one by one.
+    """
+    started = time.perf_counter()
+    validated = _ENTRY_BATCH.validate_python(entries, strict=True)
+    elapsed = time.perf_counter() - started
+
+    normalized: List[LoreEntry] = []
+    skipped = batched = 0
+    for raw, entry in zip(entries, validated):
+        if (
+            entry is not raw
+            and type(entry) is LoreEntry
+            and "disable" not in entry.__pydantic_extra__
+        ):
+            if not entry.uid:
+                entry.uid = generate_entry_uid()
+            normalized.append(entry)
+            batched += 1
+            continue
+        try:
+            normalized.append(normalize_entry(raw))
+        except ValueError:
+            if not skip_invalid:
+                raise
+            skipped += 1
+
+    if batched:
+        metrics.NORMALIZE_DURATION.observe(elapsed / batched, count=batched)
+    return normalized, skipped
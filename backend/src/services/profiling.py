@@ -0,0 +1,187 @@
+"""
+On-demand profiles of single requests, for slow operations reported by users
+that cannot be reproduced locally.
+
+Operators enable it with LOREMASTER_PROFILE_DIR. A request is profiled when
+it carries `X-Loremaster-Profile: <LOREMASTER_PROFILE_SECRET>`, or at random
+with probability LOREMASTER_PROFILE_SAMPLE_RATE. For each profiled request
+three files named after one profile ID are written:
+
+- `<id>.pstats`: a deterministic cProfile profile of the event-loop thread
+  (`python -m pstats`, snakeviz, gprof2dot).
+- `<id>.speedscope.json`: stacks of every thread sampled each millisecond,
+  one speedscope sampled profile per thread (https://www.speedscope.app).
+- `<id>.json`: the tags (route, status, book ID and size, duration, trigger).
+
+Only one request is profiled at a time, because cProfile and the sampler see
+the whole event loop. Other requests interleaving on the loop still show up
+in a profile, so profile on a quiet instance when you can. When the
+directory is unset, the middleware is not installed and costs nothing.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from types import FrameType
+from typing import Any, Dict, List, Optional, Tuple
+
+PROFILE_HEADER = "x-loremaster-profile"
+SAMPLE_INTERVAL = 0.001
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+_SLUG = re.compile(r"[^A-Za-z0-9]+")
+
+
+@dataclass(frozen=True)
+class ProfilerConfig:
+    directory: str
+    secret: Optional[str] = None
+    sample_rate: float = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional["ProfilerConfig"]:
+        """None unless LOREMASTER_PROFILE_DIR is set."""
+        directory = os.getenv("LOREMASTER_PROFILE_DIR")
+        if not directory:
+            return None
+        return cls(
+            directory=directory,
+            secret=os.getenv("LOREMASTER_PROFILE_SECRET") or None,
+            sample_rate=float(os.getenv("LOREMASTER_PROFILE_SAMPLE_RATE", "0")),
+        )
+
+
+def profile_id(method: str, path: str) -> str:
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    slug = _SLUG.sub("-", f"{method} {path}").strip("-").lower()[:60]
+    return f"{stamp}-{slug}-{os.urandom(3).hex()}"
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of every thread from a background thread.
+
+    Work the request hands to worker threads (streamed responses, offloaded
+    store operations) is only visible here; cProfile sees just the thread
+    that enabled it.
+    """
+
+    def __init__(self, main_thread: int, interval: float = SAMPLE_INTERVAL) -> None:
+        self.main_thread = main_thread
+        self.interval = interval
+        self._frames: Dict[Tuple[str, str, int], int] = {}
+        # Per thread: (stacks, weights in milliseconds).
+        self._threads: Dict[int, Tuple[List[List[int]], List[float]]] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            weight = (now - last) * 1000
+            last = now
+            for thread_id, frame in frames.items():
+                if thread_id == own:
+                    continue
+                stacks, weights = self._threads.setdefault(thread_id, ([], []))
+                stacks.append(self._stack(frame))
+                weights.append(weight)
+
+    def _stack(self, frame: Optional[FrameType]) -> List[int]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            index = self._frames.get(key)
+            if index is None:
+                index = self._frames[key] = len(self._frames)
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()  # speedscope wants the root first
+        return stack
+
+    def speedscope(self, name: str) -> Dict[str, Any]:
+        """One sampled profile per thread, the request's own thread first."""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        order = sorted(self._threads, key=lambda ident: ident != self.main_thread)
+        profiles = []
+        for ident in order:
+            stacks, weights = self._threads[ident]
+            label = "request thread" if ident == self.main_thread else names.get(ident, ident)
+            profiles.append(
+                {
+                    "type": "sampled",
+                    "name": f"{name} [{label}]",
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": stacks,
+                    "weights": weights,
+                }
+            )
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "loremaster",
+            "activeProfileIndex": 0,
+            "shared": {
+                "frames": [
+                    {"name": func, "file": path, "line": line}
+                    for func, path, line in self._frames
+                ]
+            },
+            "profiles": profiles,
+        }
+
+
+class RequestProfile:
+    """cProfile plus stack sampling around one request."""
+
+    def __init__(self, profile_id: str) -> None:
+        self.id = profile_id
+        self._profiler = cProfile.Profile()
+        self._sampler = StackSampler(threading.get_ident())
+        self._started = 0.0
+        self.duration = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._sampler.start()
+        self._profiler.enable()
+
+    def stop(self) -> None:
+        self._profiler.disable()
+        self._sampler.stop()
+        self.duration = time.perf_counter() - self._started
+
+    def write(self, directory: str, tags: Dict[str, Any]) -> None:
+        """Write `<id>.pstats`, `<id>.speedscope.json` and `<id>.json`."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.id)
+        tags = {**tags, "id": self.id, "durationMs": round(self.duration * 1000, 3)}
+        name = f"{tags.get('method')} {tags.get('route')} ({tags['durationMs']}ms"
+        if tags.get("entries") is not None:
+            name += f", {tags['entries']} entries"
+        name += ")"
+        self._profiler.dump_stats(f"{base}.pstats")
+        with open(f"{base}.speedscope.json", "w") as handle:
+            json.dump(self._sampler.speedscope(name), handle)
+        with open(f"{base}.json", "w") as handle:
+            json.dump(tags, handle, indent=2)
@@ -0,0 +1,379 @@
+"""
+Internal containers the store uses to hold lorebooks.
+
+Routes never see these directly; they are converted to the Pydantic models in
+`models.py` at the API boundary.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .encoding import dumps
+from .locks import RWLock
+from ..models import LoreEntry, Lorebook, LorebookMeta
+
+# Entry-level changes remembered per book for delta sync. Clients that fall
+# further behind than this get told to refetch the whole book.
+CHANGELOG_LIMIT = 1000
+
+if TYPE_CHECKING:
+    from .activation import KeywordMatcher
+    from .duplicates import DuplicateIndex
+    from .search import SearchIndex
+
+
+# LoreEntry field defaults (uid is always stored, so it is left out).
+_FIELD_DEFAULTS: Dict[str, Any] = {
+    name: info.default_factory() if info.default_factory else info.default
+    for name, info in LoreEntry.model_fields.items()
+    if name != "uid"
+}
+_FIELD_ORDER = tuple(LoreEntry.model_fields)
+_HOT_FIELDS = frozenset({"uid", "comment", "content", "key", "keysecondary"})
+
+# Rough per-entry bookkeeping cost (object, index slot, token count, key
+# tuples) and per non-default field, used for memory budgeting.
+ENTRY_OVERHEAD_BYTES = 400
+FIELD_OVERHEAD_BYTES = 100
+
+
+def _intern_keys(values: Iterable[object]) -> Tuple[str, ...]:
+    return tuple(sys.intern(str(value)) for value in values)
+
+
+class CompactEntry:
+    """
+    Memory-lean stand-in for a LoreEntry inside the store.
+
+    The fields every entry carries (uid, comment, content, keywords) live in
+    slots, keywords as tuples of interned strings. Of the ~40 remaining
+    fields only those that differ from their defaults are kept, together
+    with any extra third-party keys, in one small dict (or None when there
+    are none). Reading any other LoreEntry attribute falls back to the field
+    default, so store internals can treat this like a LoreEntry; full models
+    are only materialized at the API boundary via `to_model`.
+    """
+
+    __slots__ = ("uid", "comment", "content", "key", "keysecondary", "_fields")
+
+    def __init__(
+        self,
+        uid: int,
+        comment: str,
+        content: str,
+        key: Tuple[str, ...],
+        keysecondary: Tuple[str, ...],
+        fields: Optional[Dict[str, Any]],
+    ) -> None:
+        self.uid = uid
+        self.comment = comment
+        self.content = content
+        self.key = key
+        self.keysecondary = keysecondary
+        self._fields = fields
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompactEntry":
+        """Build from an already-validated LoreEntry dump."""
+        fields: Dict[str, Any] = {}
+        for name, value in data.items():
+            if name in _HOT_FIELDS:
+                continue
+            if name not in _FIELD_DEFAULTS:
+                fields[sys.intern(name)] = value
+            elif value != _FIELD_DEFAULTS[name]:
+                fields[name] = value
+        return cls(
+            uid=data["uid"],
+            comment=data.get("comment", ""),
+            content=data.get("content", ""),
+            key=_intern_keys(data.get("key", ())),
+            keysecondary=_intern_keys(data.get("keysecondary", ())),
+            fields=fields or None,
+        )
+
+    @classmethod
+    def from_model(cls, entry: LoreEntry) -> "CompactEntry":
+        data = dict(entry.__dict__)
+        if entry.__pydantic_extra__:
+            data.update(entry.__pydantic_extra__)
+        return cls.from_dict(data)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for names that are not slots.
+        fields = self._fields
+        if fields is not None and name in fields:
+            return fields[name]
+        if name in _FIELD_DEFAULTS:
+            default = _FIELD_DEFAULTS[name]
+            return default.copy() if isinstance(default, (list, dict)) else default
+        raise AttributeError(name)
+
+    def to_dict(self, include: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """Same keys and order as `LoreEntry.model_dump()` (extras last)."""
+        data: Dict[str, Any] = {}
+        for name in _FIELD_ORDER:
+            if include is None or name in include:
+                value = getattr(self, name)
+                data[name] = list(value) if isinstance(value, tuple) else value
+        if self._fields and include is None:
+            for name, value in self._fields.items():
+                if name not in _FIELD_DEFAULTS:
+                    data[name] = value
+        return data
+
+    def to_model(self) -> LoreEntry:
+        return LoreEntry.model_construct(**self.to_dict())
+
+    def approx_size(self) -> int:
+        """Estimated bytes this entry keeps alive (text counted once per char)."""
+        size = ENTRY_OVERHEAD_BYTES + len(self.content) + len(self.comment)
+        size += sum(map(len, self.key)) + sum(map(len, self.keysecondary))
+        if self._fields:
+            size += FIELD_OVERHEAD_BYTES * len(self._fields)
+        return size
+
+    def dump_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+
+class EntryIndex:
+    """
+    Entries of one lorebook, keyed by UID and kept in insertion order.
+
+    A dict gives both halves of what the store needs: constant-time get,
+    replace and remove by UID, and stable iteration order. Replacing an entry
+    keeps its slot, so edits do not reorder the book.
+    """
+
+    __slots__ = ("_entries",)
+
+    def __init__(self, entries: Iterable[CompactEntry] = ()) -> None:
+        self._entries: Dict[int, CompactEntry] = {}
+        for entry in entries:
+            self.append(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[CompactEntry]:
+        return iter(self._entries.values())
+
+    def __contains__(self, entry_uid: object) -> bool:
+        return entry_uid in self._entries
+
+    def get(self, entry_uid: int) -> Optional[CompactEntry]:
+        return self._entries.get(entry_uid)
+
+    def append(self, entry: CompactEntry) -> None:
+        if entry.uid in self._entries:
+            raise KeyError(f"Duplicate entry UID {entry.uid}")
+        self._entries[entry.uid] = entry
+
+    def replace(self, entry: CompactEntry) -> CompactEntry:
+        """Swap in a new version of an existing entry and return the old one."""
+        previous = self._entries[entry.uid]
+        self._entries[entry.uid] = entry
+        return previous
+
+    def remove(self, entry_uid: int) -> CompactEntry:
+        return self._entries.pop(entry_uid)
+
+    def to_list(self) -> List[CompactEntry]:
+        return list(self._entries.values())
+
+
+@dataclass
+class BookRecord:
+    """Mutable lorebook state owned by LorebookStore."""
+
+    id: str
+    name: str
+    created: int
+    lastEdited: int
+    # Store-wide sequence number of the last mutation that touched this book.
+    version: int = 0
+    entries: EntryIndex = field(default_factory=EntryIndex)
+    # (version, uid) pairs for recent entry changes, oldest first. Changes at
+    # or below `changelog_floor` have been dropped (or predate this process).
+    changelog: Deque[Tuple[int, int]] = field(default_factory=deque, repr=False)
+    changelog_floor: int = 0
+    # UIDs touched by the mutation in progress; stamped by the store's _touch.
+    pending_changes: List[int] = field(default_factory=list, repr=False)
+    # Derived data rebuilt lazily; the store clears it on every mutation.
+    matcher: Optional["KeywordMatcher"] = field(default=None, repr=False)
+    # Sorted (value, uid) keys per sort field for paginated listing.
+    sorted_views: Dict[str, List[Tuple[int, int]]] = field(
+        default_factory=dict, repr=False
+    )
+    # Encoded GET /lorebooks/{id} body for the current version.
+    encoded: Optional[bytes] = field(default=None, repr=False)
+    # Built on first search, then maintained entry by entry by the store.
+    search: Optional["SearchIndex"] = field(default=None, repr=False)
+    # MinHash signatures, built and maintained the same way.
+    duplicates: Optional["DuplicateIndex"] = field(default=None, repr=False)
+    # Cached token count per entry UID, plus their running sum.
+    token_counts: Dict[int, int] = field(default_factory=dict, repr=False)
+    token_total: int = 0
+    # Running sum of entry approx_size(), for memory budgeting.
+    approx_bytes: int = 0
+    # Held shared by readers and exclusively by the store while editing.
+    lock: RWLock = field(default_factory=RWLock, repr=False, compare=False)
+
+    def log_changes(self, version: int) -> None:
+        """Stamp pending entry changes with `version`, evicting the oldest."""
+        for uid in self.pending_changes:
+            if len(self.changelog) >= CHANGELOG_LIMIT:
+                self.changelog_floor = self.changelog.popleft()[0]
+            self.changelog.append((version, uid))
+        self.pending_changes.clear()
+
+    def to_meta(self) -> LorebookMeta:
+        return LorebookMeta(
+            id=self.id,
+            name=self.name,
+            entryCount=len(self.entries),
+            tokenCount=self.token_total,
+            version=self.version,
+            lastEdited=self.lastEdited,
+            created=self.created,
+        )
+
+    def to_json(self) -> bytes:
+        """Full lorebook as JSON bytes, in the same shape as `to_model()`."""
+        data = self.to_meta().model_dump()
+        data["entries"] = [entry.to_dict() for entry in self.entries]
+        return dumps(data)
+
+    def to_model(self) -> Lorebook:
+        # Entries were validated on the way in, so skip a second validation
+        # pass over the whole list.
+        return Lorebook.model_construct(
+            id=self.id,
+            name=self.name,
+            entryCount=len(self.entries),
+            tokenCount=self.token_total,
+            version=self.version,
+            lastEdited=self.lastEdited,
+            created=self.created,
+            entries=[entry.to_model() for entry in self.entries],
+        )
+
+
+# Sort keys of the library index: (lastEdited, id) and (casefolded name, id).
+LibraryKey = Tuple[Any, str]
+LIBRARY_SORT_FIELDS = ("lastEdited", "name")
+# Sorts after any character a name can continue with, for prefix ranges.
+_PREFIX_END = "\U0010ffff"
+
+
+class LibraryIndex:
+    """
+    Book IDs of one library kept sorted by lastEdited and by name.
+
+    The store updates it as books are created, deleted, renamed and edited,
+    so a page of the library costs a bisect and a slice however many books
+    there are. Edits run on worker threads while pages are read on the event
+    loop, so both briefly hold an internal lock.
+    """
+
+    __slots__ = ("_lock", "_keys", "_edited", "_named")
+
+    def __init__(self, books: Iterable[BookRecord] = ()) -> None:
+        self._lock = threading.Lock()
+        self._keys: Dict[str, Tuple[LibraryKey, LibraryKey]] = {}
+        self._edited: List[LibraryKey] = []
+        self._named: List[LibraryKey] = []
+        self.rebuild(books)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @staticmethod
+    def _keys_for(book: BookRecord) -> Tuple[LibraryKey, LibraryKey]:
+        return (book.lastEdited, book.id), (book.name.casefold(), book.id)
+
+    def rebuild(self, books: Iterable[BookRecord]) -> None:
+        keys = {book.id: self._keys_for(book) for book in books}
+        edited = sorted(pair[0] for pair in keys.values())
+        named = sorted(pair[1] for pair in keys.values())
+        with self._lock:
+            self._keys, self._edited, self._named = keys, edited, named
+
+    def put(self, book: BookRecord) -> None:
+        """Add a book or move it to its current lastEdited / name position."""
+        keys = self._keys_for(book)
+        with self._lock:
+            previous = self._keys.get(book.id)
+            if previous == keys:
+                return
+            if previous is not None:
+                self._unlink(previous)
+            self._keys[book.id] = keys
+            insort(self._edited, keys[0])
+            insort(self._named, keys[1])
+
+    def discard(self, book_id: str) -> None:
+        with self._lock:
+            previous = self._keys.pop(book_id, None)
+            if previous is not None:
+                self._unlink(previous)
+
+    def _unlink(self, keys: Tuple[LibraryKey, LibraryKey]) -> None:
+        del self._edited[bisect_left(self._edited, keys[0])]
+        del self._named[bisect_left(self._named, keys[1])]
+
+    def page(
+        self,
+        sort: str = "lastEdited",
+        descending: bool = True,
+        limit: Optional[int] = None,
+        after: Optional[LibraryKey] = None,
+        prefix: Optional[str] = None,
+    ) -> Tuple[List[str], Optional[LibraryKey]]:
+        """
+        Up to `limit` book IDs in `sort` order following the key `after`, and
+        the key to continue from (None on the last page). `prefix` keeps books
+        whose name starts with it, ignoring case; combined with the lastEdited
+        sort, the matches are sorted per call.
+        """
+        with self._lock:
+            view = self._edited if sort == "lastEdited" else self._named
+            lo, hi = 0, len(view)
+            if prefix:
+                folded = prefix.casefold()
+                lo = bisect_left(self._named, (folded,))
+                hi = bisect_left(self._named, (folded + _PREFIX_END,))
+                if sort == "lastEdited":
+                    view = sorted(self._keys[key[1]][0] for key in self._named[lo:hi])
+                    lo, hi = 0, len(view)
+
+            if descending:
+                end = hi if after is None else max(lo, min(hi, bisect_left(view, after)))
+                start = lo if limit is None else max(lo, end - limit)
+                keys = view[start:end][::-1]
+                more = start > lo
+            else:
+                start = lo if after is None else max(lo, min(hi, bisect_right(view, after)))
+                end = hi if limit is None else min(hi, start + limit)
+                keys = view[start:end]
+                more = end < hi
+        return [key[1] for key in keys], keys[-1] if keys and more else None
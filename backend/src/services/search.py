@@ -0,0 +1,139 @@
+"""
+Per-book full-text index over entry comments, content and keywords.
+
+The index is an inverted map from token to the entries containing it, with a
+field-weighted term frequency per entry. The store keeps it in sync entry by
+entry (add / replace / remove), so it never has to be rebuilt after the first
+search on a book.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Tuple
+
+from ..models import LoreEntry
+
+_TOKEN = re.compile(r"\w+")
+
+# Keyword hits matter most, then the title (comment), then the body text.
+FIELD_WEIGHTS = {"key": 3.0, "comment": 2.0, "content": 1.0}
+
+# Cap prefix expansion so a one-letter query cannot fan out to the whole
+# vocabulary.
+MAX_PREFIX_EXPANSION = 64
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.casefold())
+
+
+def _entry_terms(entry: LoreEntry) -> Dict[str, float]:
+    terms: Dict[str, float] = {}
+    fields = (
+        ("key", " ".join(entry.key + entry.keysecondary)),
+        ("comment", entry.comment),
+        ("content", entry.content),
+    )
+    for field, text in fields:
+        weight = FIELD_WEIGHTS[field]
+        for token in tokenize(text):
+            terms[token] = terms.get(token, 0.0) + weight
+    return terms
+
+
+class SearchIndex:
+    """Inverted index for one lorebook."""
+
+    def __init__(self, entries: Iterable[LoreEntry] = ()) -> None:
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        # Sorted vocabulary, used to expand query prefixes with bisect.
+        self._vocab: List[str] = []
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry: LoreEntry) -> None:
+        terms = _entry_terms(entry)
+        self._doc_terms[entry.uid] = terms
+        for token, weight in terms.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = {}
+                insort(self._vocab, token)
+            posting[entry.uid] = weight
+
+    def remove(self, entry_uid: int) -> None:
+        terms = self._doc_terms.pop(entry_uid, None)
+        if not terms:
+            return
+        for token in terms:
+            posting = self._postings[token]
+            del posting[entry_uid]
+            if not posting:
+                del self._postings[token]
+                del self._vocab[bisect_left(self._vocab, token)]
+
+    def replace(self, entry: LoreEntry) -> None:
+        self.remove(entry.uid)
+        self.add(entry)
+
+    def search(self, query: str, offset: int, limit: int) -> Tuple[int, List[Tuple[int, float]]]:
+        """
+        Return `(total, [(uid, score), ...])` for one page of results.
+
+        Every query token must match (exact token, or as a prefix of one), and
+        results are ranked by field-weighted TF-IDF.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return 0, []
+
+        doc_count = len(self._doc_terms) or 1
+        per_token: List[List[Tuple[Dict[int, float], float]]] = []
+        for token in dict.fromkeys(tokens):
+            postings = [self._postings[term] for term in self._expand(token)]
+            if not postings:
+                return 0, []
+            per_token.append(
+                [(posting, math.log(1 + doc_count / len(posting))) for posting in postings]
+            )
+
+        # Score candidates from the rarest token, then only probe the other
+        # tokens' postings for those candidates.
+        per_token.sort(key=lambda group: sum(len(posting) for posting, _ in group))
+        matches: Dict[int, float] = {}
+        for posting, idf in per_token[0]:
+            for uid, weight in posting.items():
+                score = weight * idf
+                if score > matches.get(uid, 0.0):
+                    matches[uid] = score
+
+        for group in per_token[1:]:
+            narrowed: Dict[int, float] = {}
+            for uid, total in matches.items():
+                best = 0.0
+                for posting, idf in group:
+                    weight = posting.get(uid)
+                    if weight is not None and weight * idf > best:
+                        best = weight * idf
+                if best:
+                    narrowed[uid] = total + best
+            matches = narrowed
+            if not matches:
+                return 0, []
+
+        top = heapq.nlargest(offset + limit, matches.items(), key=lambda item: item[1])
+        return len(matches), top[offset:]
+
+    def _expand(self, token: str) -> List[str]:
+        start = bisect_left(self._vocab, token)
+        terms: List[str] = []
+        for term in self._vocab[start : start + MAX_PREFIX_EXPANSION]:
+            if not term.startswith(token):
+                break
+            terms.append(term)
+        return terms
@@ -0,0 +1,359 @@
+"""
+Signed session tokens and a cache of Discord profiles.
+
+After the Discord login the backend issues its own tokens: a short-lived
+access token sent on every request and a long-lived refresh token used to
+get a new pair. Both are JWTs signed with HS256 using only the standard
+library, so checking a request is one HMAC and a JSON decode, with no call
+to Discord.
+
+Refresh tokens rotate: each login starts a token family, every refresh
+replaces the family's one valid refresh token, and presenting an older one
+(a replayed or stolen token) revokes the whole family. The current token of
+each family lives in memory, or in LOREMASTER_SESSION_DB (defaulting to
+`sessions.sqlite3` next to LOREMASTER_DB_PATH) so every worker shares it.
+
+Set LOREMASTER_SESSION_SECRET to a long random string (at least 32 bytes;
+shorter keys and the sample values from the docs are refused). Without it each
+process signs with its own random key, which means sessions do not survive
+restarts and are not accepted by other workers.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ACCESS_TTL = 60 * 60  # 1 hour
+REFRESH_TTL = 30 * 24 * 60 * 60  # 30 days
+# Shorter HS256 keys can be brute-forced from a single token.
+MIN_SECRET_BYTES = 32
+# Sample values from the docs; anyone can sign tokens with them.
+PLACEHOLDER_SECRETS = frozenset(
+    {"change_me", "changeme", "a_long_random_string", "secret", "your_secret_here"}
+)
+PROFILE_CACHE_SIZE = 1024
+PROFILE_CACHE_TTL = 10 * 60
+# Recently verified access tokens, so repeat requests skip the HMAC.
+VERIFIED_CACHE_SIZE = 4096
+
+_HEADER = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=")
+
+
+class SessionError(ValueError):
+    """Raised for malformed, forged or expired session tokens."""
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+@dataclass(frozen=True)
+class SessionUser:
+    """Identity carried inside a verified access token."""
+
+    id: str
+    username: str
+    avatar: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class SessionTokens:
+    access_token: str
+    refresh_token: str
+    expires_in: int
+
+
+def _user(claims: Dict[str, Any]) -> SessionUser:
+    return SessionUser(
+        id=str(claims["sub"]),
+        username=claims.get("name", ""),
+        avatar=claims.get("avatar"),
+    )
+
+
+class ProfileCache:
+    """Bounded LRU of Discord profiles, each kept for at most `ttl` seconds."""
+
+    def __init__(
+        self, maxsize: int = PROFILE_CACHE_SIZE, ttl: float = PROFILE_CACHE_TTL
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        item = self._items.get(user_id)
+        if item is None:
+            return None
+        expires, profile = item
+        if expires < time.monotonic():
+            del self._items[user_id]
+            return None
+        self._items.move_to_end(user_id)
+        return profile
+
+    def put(self, user_id: str, profile: Dict[str, Any]) -> None:
+        self._items[user_id] = (time.monotonic() + self.ttl, profile)
+        self._items.move_to_end(user_id)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+
+class RefreshFamilies:
+    """
+    The one refresh token (by jti) currently valid for each login family,
+    kept in memory. A revoked family keeps its entry with no jti until it
+    expires, so later tokens from it are refused too.
+    """
+
+    def __init__(self) -> None:
+        self._current: Dict[str, Tuple[Optional[str], int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._current)
+
+    def start(self, family: str, jti: str, expires: int) -> None:
+        now = int(time.time())
+        with self._lock:
+            for key in [k for k, (_, exp) in self._current.items() if exp < now]:
+                del self._current[key]
+            self._current[family] = (jti, expires)
+
+    def rotate(self, family: str, jti: str, new_jti: str, expires: int) -> bool:
+        """
+        Replace `jti` with `new_jti` if it is still the family's current
+        token. Otherwise revoke the family and return False.
+        """
+        with self._lock:
+            current = self._current.get(family)
+            if current is not None and current[0] == jti:
+                self._current[family] = (new_jti, expires)
+                return True
+            if current is not None:
+                self._current[family] = (None, current[1])
+            return False
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteRefreshFamilies(RefreshFamilies):
+    """RefreshFamilies in a SQLite file, shared by every worker process."""
+
+    def __init__(self, path: str) -> None:
+        self._conn = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS refresh_families ("
+            "family TEXT PRIMARY KEY, jti TEXT, expires INTEGER NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM refresh_families"
+            ).fetchone()[0]
+
+    def start(self, family: str, jti: str, expires: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM refresh_families WHERE expires < ?", (int(time.time()),)
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO refresh_families (family, jti, expires) "
+                "VALUES (?, ?, ?)",
+                (family, jti, expires),
+            )
+
+    def rotate(self, family: str, jti: str, new_jti: str, expires: int) -> bool:
+        with self._lock:
+            # Compare-and-set in one statement, so two workers racing on the
+            # same token cannot both win.
+            rotated = self._conn.execute(
+                "UPDATE refresh_families SET jti = ?, expires = ? "
+                "WHERE family = ? AND jti = ?",
+                (new_jti, expires, family, jti),
+            ).rowcount
+            if rotated:
+                return True
+            self._conn.execute(
+                "UPDATE refresh_families SET jti = NULL WHERE family = ?", (family,)
+            )
+            return False
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SessionManager:
+    """Issues and verifies HS256 session tokens."""
+
+    def __init__(
+        self,
+        secret: bytes,
+        access_ttl: int = ACCESS_TTL,
+        refresh_ttl: int = REFRESH_TTL,
+        profiles: Optional[ProfileCache] = None,
+        families: Optional[RefreshFamilies] = None,
+    ) -> None:
+        self._secret = secret
+        self.access_ttl = access_ttl
+        self.refresh_ttl = refresh_ttl
+        self.profiles = profiles or ProfileCache()
+        self.families = families if families is not None else RefreshFamilies()
+        self._verified: "OrderedDict[str, Tuple[float, SessionUser]]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "SessionManager":
+        secret = os.getenv("LOREMASTER_SESSION_SECRET")
+        if secret and secret.strip().lower() in PLACEHOLDER_SECRETS:
+            raise ValueError(
+                "LOREMASTER_SESSION_SECRET is a documentation placeholder; "
+                "set it to a long random string"
+            )
+        if secret and len(secret.encode()) < MIN_SECRET_BYTES:
+            raise ValueError(
+                f"LOREMASTER_SESSION_SECRET must be at least {MIN_SECRET_BYTES} bytes"
+            )
+        if not secret:
+            logger.warning(
+                "LOREMASTER_SESSION_SECRET is not set; using a random per-process "
+                "key, so sessions will not survive restarts or span workers"
+            )
+        path = os.getenv("LOREMASTER_SESSION_DB")
+        db_path = os.getenv("LOREMASTER_DB_PATH")
+        if not path and db_path:
+            path = os.path.join(os.path.dirname(db_path) or ".", "sessions.sqlite3")
+        return cls(
+            secret.encode() if secret else secrets.token_bytes(32),
+            access_ttl=int(os.getenv("LOREMASTER_SESSION_TTL", str(ACCESS_TTL))),
+            refresh_ttl=int(os.getenv("LOREMASTER_REFRESH_TTL", str(REFRESH_TTL))),
+            families=SQLiteRefreshFamilies(path) if path else None,
+        )
+
+    def close(self) -> None:
+        self.families.close()
+
+    def issue(self, user: SessionUser) -> SessionTokens:
+        """Mint a fresh access/refresh pair for `user`, starting a new family."""
+        family = secrets.token_urlsafe(12)
+        tokens, jti, expires = self._mint(user, family)
+        self.families.start(family, jti, expires)
+        return tokens
+
+    def _mint(self, user: SessionUser, family: str) -> Tuple[SessionTokens, str, int]:
+        now = int(time.time())
+        jti = secrets.token_urlsafe(12)
+        expires = now + self.refresh_ttl
+        claims = {
+            "sub": user.id,
+            "name": user.username,
+            "avatar": user.avatar,
+            "iat": now,
+        }
+        access = self._sign({**claims, "typ": "access", "exp": now + self.access_ttl})
+        refresh = self._sign(
+            {
+                **claims,
+                "typ": "refresh",
+                "exp": expires,
+                "jti": jti,
+                "fam": family,
+            }
+        )
+        return SessionTokens(access, refresh, self.access_ttl), jti, expires
+
+    def verify(self, token: str, kind: str = "access") -> SessionUser:
+        """Return the user a token was issued to, or raise SessionError."""
+        now = time.time()
+        cached = self._verified.get(token) if kind == "access" else None
+        if cached is not None and cached[0] >= now:
+            return cached[1]
+
+        claims = self._verified_claims(token, kind, now)
+        expires = claims["exp"]
+        user = _user(claims)
+        if kind == "access":
+            self._verified[token] = (expires, user)
+            if len(self._verified) > VERIFIED_CACHE_SIZE:
+                self._verified.popitem(last=False)
+        return user
+
+    def refresh(self, refresh_token: str) -> Tuple[SessionUser, SessionTokens]:
+        """
+        Trade a valid refresh token for a new token pair in the same family.
+        The presented token stops working; presenting it again revokes the
+        family, including the pair issued here.
+        """
+        claims = self._verified_claims(refresh_token, "refresh", time.time())
+        family, jti = claims.get("fam"), claims.get("jti")
+        if not family or not jti:
+            raise SessionError("Session revoked")
+        user = _user(claims)
+        tokens, new_jti, expires = self._mint(user, family)
+        if not self.families.rotate(family, jti, new_jti, expires):
+            logger.warning("Refresh token reused; revoked session of user %s", user.id)
+            raise SessionError("Session revoked")
+        return user, tokens
+
+    def _verified_claims(self, token: str, kind: str, now: float) -> Dict[str, Any]:
+        claims = self._claims(token)
+        if claims.get("typ") != kind:
+            raise SessionError("Wrong token type")
+        if claims.get("exp", 0) < now:
+            raise SessionError("Session expired")
+        return claims
+
+    def _sign(self, claims: Dict[str, Any]) -> str:
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        signing_input = _HEADER + b"." + payload
+        signature = hmac.new(self._secret, signing_input, hashlib.sha256).digest()
+        return (signing_input + b"." + _b64encode(signature)).decode()
+
+    def _claims(self, token: str) -> Dict[str, Any]:
+        try:
+            raw = token.encode("ascii")
+            header, payload, signature = raw.split(b".")
+        except (UnicodeEncodeError, ValueError):
+            raise SessionError("Malformed token")
+        # Only our own header is accepted, which rules out alg=none tricks.
+        if header != _HEADER:
+            raise SessionError("Unsupported token header")
+        expected = hmac.new(
+            self._secret, header + b"." + payload, hashlib.sha256
+        ).digest()
+        try:
+            valid = hmac.compare_digest(expected, _b64decode(signature))
+            claims = json.loads(_b64decode(payload)) if valid else None
+        except (ValueError, TypeError):
+            raise SessionError("Malformed token")
+        if not isinstance(claims, dict) or "sub" not in claims:
+            raise SessionError("Invalid token signature")
+        return claims
@@ -0,0 +1,282 @@
+"""
+Persistence backends for the lorebook store.
+
+LorebookStore keeps the working set in memory and calls into a backend after
+each mutation so only the rows that changed are written. The in-memory backend
+keeps the original throwaway behaviour; the SQLite backend survives restarts.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .records import BookRecord, CompactEntry
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    created INTEGER NOT NULL,
+    last_edited INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS entries (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    book_id TEXT NOT NULL REFERENCES books(id) ON DELETE CASCADE,
+    uid INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    UNIQUE (book_id, uid)
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class StorageBackend:
+    """
+    Interface LorebookStore writes through to.
+
+    Every hook receives just the object that changed, so implementations can
+    persist a single row instead of re-serializing the whole library.
+    """
+
+    def load(self) -> List[BookRecord]:
+        """Return every persisted lorebook with its entries."""
+        return []
+
+    def load_setting(self, key: str) -> Optional[str]:
+        """Read a store-level value such as the active lorebook ID."""
+        return None
+
+    def load_book(self, book_id: str) -> Optional[BookRecord]:
+        """Re-read one lorebook with its entries (None if it no longer exists)."""
+        return None
+
+    def book_versions(self) -> Dict[str, int]:
+        """Persisted version of every lorebook, in creation order."""
+        return {}
+
+    def has_external_changes(self) -> bool:
+        """
+        True when another process has committed to the same storage since the
+        last call, so the caller should re-check its in-memory copy.
+        """
+        return False
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group several writes so they land atomically."""
+        yield
+
+    def save_book(self, book: BookRecord) -> None:
+        """Persist lorebook metadata (name + timestamps), not its entries."""
+
+    def delete_book(self, book_id: str) -> None:
+        """Remove a lorebook and all of its entries."""
+
+    def save_entries(self, book_id: str, entries: Iterable[CompactEntry]) -> None:
+        """Insert or replace entries, keeping the original position on replace."""
+
+    def delete_entry(self, book_id: str, entry_uid: int) -> None:
+        """Remove a single entry."""
+
+    def save_setting(self, key: str, value: Optional[str]) -> None:
+        """Persist a store-level value (active lorebook, library version...)."""
+
+    def close(self) -> None:
+        """Release any handles held by the backend."""
+
+
+class MemoryStorage(StorageBackend):
+    """No-op backend: state lives only as long as the process."""
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    Embedded SQLite backend running in WAL mode.
+
+    Entries are stored one row each (JSON encoded), so editing an entry is a
+    single upsert. `seq` tracks insertion order and is preserved by upserts,
+    which lets a cold start rebuild books in their original order with one
+    sequential scan.
+
+    Several processes (e.g. uvicorn workers) may open the same file. Grouped
+    writes take the database write lock up front (BEGIN IMMEDIATE), and
+    `PRAGMA data_version` tells each process when someone else has committed.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._data_version: Optional[int] = None
+        # Autocommit mode: single writes commit immediately, grouped writes go
+        # through transaction() which issues explicit BEGIN/COMMIT. The timeout
+        # is how long to wait for another process holding the write lock.
+        self._conn = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        """Bring databases created by older versions up to the current schema."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(books)")}
+        if "version" not in columns:
+            self._conn.execute(
+                "ALTER TABLE books ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+            )
+
+    def load(self) -> List[BookRecord]:
+        with self._lock:
+            self._data_version = self._read_data_version()
+            books = self._load_books("", ())
+            rows = self._conn.execute(
+                "SELECT book_id, data FROM entries ORDER BY seq"
+            )
+            for book_id, data in rows:
+                book = books.get(book_id)
+                if book is not None:
+                    # Rows were validated before they were written, so skip
+                    # pydantic on the way back in.
+                    book.entries.append(CompactEntry.from_dict(json.loads(data)))
+
+            return list(books.values())
+
+    def load_book(self, book_id: str) -> Optional[BookRecord]:
+        with self._lock:
+            book = self._load_books("WHERE id = ?", (book_id,)).get(book_id)
+            if book is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT data FROM entries WHERE book_id = ? ORDER BY seq", (book_id,)
+            )
+            for (data,) in rows:
+                book.entries.append(CompactEntry.from_dict(json.loads(data)))
+            return book
+
+    def book_versions(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id, version FROM books ORDER BY rowid")
+            return dict(rows.fetchall())
+
+    def has_external_changes(self) -> bool:
+        with self._lock:
+            # data_version only moves for commits made by other connections.
+            current = self._read_data_version()
+            changed = current != self._data_version
+            self._data_version = current
+            return changed
+
+    def _read_data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _load_books(self, where: str, params: tuple) -> Dict[str, BookRecord]:
+        rows = self._conn.execute(
+            "SELECT id, name, created, last_edited, version FROM books "
+            f"{where} ORDER BY rowid",
+            params,
+        )
+        return {
+            book_id: BookRecord(
+                id=book_id,
+                name=name,
+                created=created,
+                lastEdited=last_edited,
+                version=version,
+            )
+            for book_id, name, created, last_edited, version in rows
+        }
+
+    def load_setting(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM settings WHERE key = ?", (key,)
+            ).fetchone()
+            return row[0] if row else None
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        with self._lock:
+            outermost = self._depth == 0
+            if outermost:
+                # Take the write lock now so reads made inside the transaction
+                # cannot be invalidated by another process before we write.
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if outermost:
+                    self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._depth -= 1
+                if outermost:
+                    self._conn.execute("COMMIT")
+
+    def save_book(self, book: BookRecord) -> None:
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO books (id, name, created, last_edited, version)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    name = excluded.name,
+                    last_edited = excluded.last_edited,
+                    version = excluded.version
+                """,
+                (book.id, book.name, book.created, book.lastEdited, book.version),
+            )
+
+    def delete_book(self, book_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM books WHERE id = ?", (book_id,))
+
+    def save_entries(self, book_id: str, entries: Iterable[CompactEntry]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO entries (book_id, uid, data) VALUES (?, ?, ?)
+                ON CONFLICT(book_id, uid) DO UPDATE SET data = excluded.data
+                """,
+                ((book_id, entry.uid, entry.dump_json()) for entry in entries),
+            )
+
+    def delete_entry(self, book_id: str, entry_uid: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM entries WHERE book_id = ? AND uid = ?",
+                (book_id, entry_uid),
+            )
+
+    def save_setting(self, key: str, value: Optional[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO settings (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """,
+                (key, value),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def open_storage(path: Optional[str]) -> StorageBackend:
+    """Pick a backend from config: SQLite when a path is given, memory otherwise."""
+    if path:
+        return SQLiteStorage(path)
+    return MemoryStorage()
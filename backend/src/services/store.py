@@ -1,162 +1,943 @@
 """
 In-memory storage layer for lorebooks.
 
-This stays intentionally lightweight so it can be replaced by a database-backed
-implementation later without rewriting the route layer.
+The working set always lives in memory; a pluggable StorageBackend receives
+each change so it can be persisted without rewriting the route layer.
+
+Store methods may run on worker threads (see services/workers.py). Mutations
+are serialised by the store lock, and each book has a readers-writer lock, so
+a reader never sees a book half-way through an edit. The book map is
+replaced rather than mutated, so the event loop can look books up and build
+the library listing without taking a lock.
 """
 
 from __future__ import annotations
 
-from typing import Dict, List, Optional, Union
+import random
+import threading
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
 
 from fastapi import HTTPException
-from pydantic import BaseModel
 
 from ..models import (
     ActiveLorebookPayload,
+    BatchEntryResponse,
+    DuplicateCluster,
+    DuplicateEntry,
+    DuplicateReport,
     EntryMutationResponse,
-    EntryPayload,
+    EntryOperation,
+    EntryOperationResult,
+    EntryPage,
+    ImportProgress,
     LoreEntry,
     Lorebook,
+    LorebookChanges,
     LorebookMeta,
+    ScanRequest,
+    ScanResponse,
+    SearchHit,
+    SearchResponse,
+    TokenBudget,
 )
+from .activation import KeywordMatcher
+from .changes import ChangeHook
+from .duplicates import ClusterFinder, DuplicateIndex, Member
+from .encoding import dumps
+from .exporter import iter_export
+from .normalize import EntryLike, normalize_entries, normalize_entry
+from .records import LIBRARY_SORT_FIELDS, BookRecord, CompactEntry, LibraryIndex
+from .search import SearchIndex
+from .storage import MemoryStorage, StorageBackend
+from .tokens import HeuristicTokenizer, Tokenizer
 from ..utils import (
+    decode_cursor,
+    encode_cursor,
     generate_book_id,
     generate_entry_uid,
-    normalize_string_list,
     now_ms,
 )
 
-EntryLike = Union[LoreEntry, EntryPayload, Dict[str, object]]
+# Fields entry listings can be sorted by (all integers on LoreEntry).
+ENTRY_SORT_FIELDS = ("uid", "order", "position")
 
 
 class LorebookStore:
     """Minimal API that mirrors what the frontend needs."""
 
-    def __init__(self) -> None:
-        self._books: Dict[str, Lorebook] = {}
+    def __init__(
+        self,
+        storage: Optional[StorageBackend] = None,
+        tokenizer: Optional[Tokenizer] = None,
+        on_change: Optional[ChangeHook] = None,
+    ) -> None:
+        self._storage = storage or MemoryStorage()
+        self._tokenizer = tokenizer or HeuristicTokenizer()
+        # Told about every edited, created and deleted book (see
+        # services/changes.py); runs on the editing thread under the locks.
+        self._on_change = on_change
+        # Replaced wholesale on every change, never mutated in place.
+        self._books: Dict[str, BookRecord] = {}
+        # Book IDs sorted by lastEdited and by name, for library listings.
+        self._index = LibraryIndex()
+        self._imports: Dict[str, ImportProgress] = {}
         self.active_id: Optional[str] = None
-        self._seed_data()
+        # Encoded GET /lorebooks body and the library_version it was built
+        # at; dropped whenever any book changes.
+        self._library_encoded: Optional[Tuple[int, bytes]] = None
+        # Responses cached so far, and approx_bytes with the (library_version,
+        # _cache_fills) it was summed at.
+        self._cache_fills = 0
+        self._approx_bytes: Optional[Tuple[Tuple[int, int], int]] = None
+        # Serialises mutations and sync(); taken before any book lock.
+        self._lock = threading.RLock()
+        # Bumped by every mutation; each book records the value it last saw.
+        self.library_version = 0
+        # try_sync() saw other processes' commits that sync() has yet to load.
+        self._external_changes = False
+
+        # Load under the write lock so that when several worker processes
+        # start on an empty database only the first one seeds it.
+        with self._storage.transaction():
+            books = self._storage.load()
+            if books:
+                for book in books:
+                    self._adopt_book(book)
+                self._books = {book.id: book for book in books}
+                self._index.rebuild(books)
+                self._load_settings()
+            else:
+                self._seed_data()
 
     # -- public API --------------------------------------------------------- #
+    def sync(self) -> None:
+        """
+        Pick up changes other processes committed to shared storage.
+
+        Books whose persisted version moved are reloaded, deleted ones are
+        dropped, and new ones are added, so every worker serving the same
+        database answers reads from the same state. Called once per request
+        and again under the write lock before every mutation.
+        """
+        with self._lock:
+            changed = self._storage.has_external_changes()
+            if not (changed or self._external_changes):
+                return
+
+            versions = self._storage.book_versions()
+            books: Dict[str, BookRecord] = {}
+            reloaded: List[Tuple[BookRecord, Optional[BookRecord]]] = []
+            for book_id, version in versions.items():
+                previous = book = self._books.get(book_id)
+                if book is None or book.version != version:
+                    book = self._storage.load_book(book_id)
+                    if book is None:
+                        continue
+                    self._adopt_book(book)
+                    reloaded.append((book, previous))
+                books[book_id] = book
+            removed = [self._books[book_id] for book_id in self._books.keys() - books.keys()]
+            for book in removed:
+                self._imports.pop(book.id, None)
+
+            self._books = books
+            self._library_encoded = None
+            for book, _ in reloaded:
+                self._index.put(book)
+            for book in removed:
+                self._index.discard(book.id)
+            self._load_settings()
+
+            # Other processes' edits arrive without entry-level detail.
+            for book, previous in reloaded:
+                if previous is None:
+                    self._notify("created", book)
+                else:
+                    self._notify("reset", book, previous.version)
+            for book in removed:
+                self._notify("deleted", book)
+            self._external_changes = False
+
+    def try_sync(self) -> bool:
+        """
+        Only the cheap part of sync(), for the event loop: True when there is
+        nothing to pick up. False when other processes committed changes or a
+        mutation is in progress on another thread; then call sync() on a
+        worker thread, since reloading books reads and validates them.
+        """
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if not self._external_changes:
+                self._external_changes = self._storage.has_external_changes()
+            return not self._external_changes
+        finally:
+            self._lock.release()
+
+    @property
+    def approx_bytes(self) -> int:
+        """
+        Estimated memory held by this store's books and cached responses.
+
+        Summing it walks every book, so the result is kept until a mutation
+        or a newly cached response can have changed it; the tenant registry
+        asks after every request.
+        """
+        key = (self.library_version, self._cache_fills)
+        if self._approx_bytes is None or self._approx_bytes[0] != key:
+            total = len(self._library_encoded[1]) if self._library_encoded else 0
+            for book in self._books.values():
+                total += book.approx_bytes + len(book.encoded or b"")
+            self._approx_bytes = (key, total)
+        return self._approx_bytes[1]
+
+    @property
+    def book_count(self) -> int:
+        return len(self._books)
+
+    @property
+    def entry_count(self) -> int:
+        return sum(len(book.entries) for book in self._books.values())
+
     def list_library(self) -> List[LorebookMeta]:
-        return [self._to_meta(book) for book in self._books.values()]
+        """Every book's metadata, most recently edited first."""
+        return self._metas(self._index.page()[0])
+
+    def list_library_json(self) -> Tuple[int, bytes]:
+        """
+        `list_library()` pre-encoded, with the library_version it shows;
+        cached until the library changes.
+
+        Built under the store lock: a mutation bumps the version before it
+        updates the library index, so a copy built alongside one could show
+        the old library under the new version.
+        """
+        with self._lock:
+            cached = self._library_encoded
+            if cached is None or cached[0] != self.library_version:
+                body = dumps([meta.model_dump() for meta in self.list_library()])
+                self._library_encoded = cached = (self.library_version, body)
+                self._cache_fills += 1
+            return cached
+
+    def try_list_library_json(self) -> Optional[Tuple[int, bytes]]:
+        """
+        list_library_json() unless a mutation is in progress on another
+        thread (the event loop must not block). Then the last cached copy is
+        returned instead, still paired with its own version, or None when
+        there is none.
+        """
+        if not self._lock.acquire(blocking=False):
+            return self._library_encoded
+        try:
+            return self.list_library_json()
+        finally:
+            self._lock.release()
+
+    def list_library_page_json(
+        self,
+        sort: str = "lastEdited",
+        descending: bool = True,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        prefix: Optional[str] = None,
+        blocking: bool = True,
+    ) -> Optional[Tuple[int, bytes, Optional[str]]]:
+        """
+        One encoded page of book metadata, the library_version it shows and
+        the cursor of the next page.
+
+        Served from the library index, so the cost follows the page size (and
+        with a prefix under the lastEdited sort, the number of matches), not
+        the size of the library. Read under the store lock for the same
+        reason as list_library_json(); with `blocking=False` it returns None
+        instead of waiting for a mutation on another thread.
+        """
+        if sort not in LIBRARY_SORT_FIELDS:
+            raise HTTPException(status_code=400, detail=f"Cannot sort by {sort}")
+        after = None
+        if cursor is not None:
+            try:
+                value, book_id = decode_cursor(cursor)
+                after = (int(value) if sort == "lastEdited" else str(value), str(book_id))
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        if not self._lock.acquire(blocking=blocking):
+            return None
+        try:
+            version = self.library_version
+            ids, last = self._index.page(sort, descending, limit, after, prefix)
+            metas = self._metas(ids)
+        finally:
+            self._lock.release()
+        body = dumps([meta.model_dump() for meta in metas])
+        return version, body, encode_cursor(list(last)) if last else None
 
     def get_lorebook(self, lorebook_id: str) -> Lorebook:
+        with self._reading(lorebook_id) as book:
+            return book.to_model()
+
+    def get_lorebook_json(self, lorebook_id: str) -> Tuple[int, bytes]:
+        """
+        `get_lorebook()` pre-encoded, cached until the book changes, with the
+        version it shows. Both are read under the book's read lock, so the
+        pair always matches.
+        """
+        with self._reading(lorebook_id) as book:
+            if book.encoded is None:
+                book.encoded = book.to_json()
+                self._cache_fills += 1
+            return book.version, book.encoded
+
+    def cached_lorebook_json(self, lorebook_id: str) -> Optional[Tuple[int, bytes]]:
+        """
+        The cached (version, body) of a book without waiting (the event loop
+        must not block), or None when nothing is cached or an edit holds or
+        awaits the book.
+        """
+        book = self._get_book(lorebook_id)
+        with book.lock.try_read() as acquired:
+            if not acquired or book.encoded is None:
+                return None
+            return book.version, book.encoded
+
+    def book_size(self, lorebook_id: str) -> Optional[int]:
+        """Entry count of a book, or None when this store does not have it."""
         book = self._books.get(lorebook_id)
-        if not book:
-            raise HTTPException(status_code=404, detail="Lorebook not found")
-        return book
+        return len(book.entries) if book else None
+
+    def get_lorebook_version(self, lorebook_id: str) -> int:
+        return self._get_book(lorebook_id).version
 
     def create_lorebook(self, name: str, entries: List[EntryLike]) -> Lorebook:
+        return self._create_book(name, entries).to_model()
+
+    def create_lorebook_json(self, name: str, entries: List[EntryLike]) -> bytes:
+        """Like create_lorebook(), returning the encoded book (and caching it)."""
+        book = self._create_book(name, entries)
+        with book.lock.read():
+            if book.encoded is None:
+                book.encoded = book.to_json()
+                self._cache_fills += 1
+            return book.encoded
+
+    def _create_book(self, name: str, entries: List[EntryLike]) -> BookRecord:
+        # The book stays private to this thread until it is published in the
+        # book map, so it is filled without locks.
         book_id = generate_book_id()
-        normalized_entries = [self._normalize_entry(entry) for entry in entries]
         now = now_ms()
-
-        book = Lorebook(
-            id=book_id,
-            name=name or "New Lorebook",
-            entryCount=len(normalized_entries),
-            lastEdited=now,
-            created=now,
-            entries=normalized_entries,
+        book = BookRecord(
+            id=book_id, name=name or "New Lorebook", lastEdited=now, created=now
         )
-        self._books[book_id] = book
-
-        if not self.active_id:
-            self.active_id = book_id
+        normalized, _ = normalize_entries(entries, skip_invalid=False)
+        for entry in normalized:
+            self._insert_entry(book, CompactEntry.from_model(self._claim_uid(book, entry)))
+        # The initial entries are the baseline, not changes to sync.
+        book.pending_changes.clear()
+
+        with self._write():
+            book.version = book.changelog_floor = self._next_version()
+            self._storage.save_book(book)
+            self._storage.save_entries(book_id, book.entries)
+            self._books = {**self._books, book_id: book}
+            self._index.put(book)
+            self._library_encoded = None
+            self._notify("created", book)
+
+            if not self.active_id:
+                self._set_active_id(book_id)
 
         return book
 
     def delete_lorebook(self, lorebook_id: str) -> None:
-        removed = self._books.pop(lorebook_id, None)
-        if not removed:
-            raise HTTPException(status_code=404, detail="Lorebook not found")
-
-        if self.active_id == lorebook_id:
-            self.active_id = next(iter(self._books.keys()), None)
+        with self._writing(lorebook_id) as book:
+            self._storage.delete_book(lorebook_id)
+            self._next_version()
+            books = dict(self._books)
+            del books[lorebook_id]
+            self._books = books
+            self._index.discard(lorebook_id)
+            self._library_encoded = None
+            self._imports.pop(lorebook_id, None)
+            self._notify("deleted", book)
+
+            if self.active_id == lorebook_id:
+                self._set_active_id(next(iter(self._books.keys()), None))
 
     def update_lorebook_name(self, lorebook_id: str, name: str) -> LorebookMeta:
-        book = self.get_lorebook(lorebook_id)
-        book.name = name
-        self._touch(book)
-        return self._to_meta(book)
+        with self._writing(lorebook_id) as book:
+            book.name = name
+            self._touch(book)
+            return book.to_meta()
 
     def add_entry(self, lorebook_id: str, entry: EntryLike) -> EntryMutationResponse:
-        book = self.get_lorebook(lorebook_id)
         normalized = self._normalize_entry(entry)
-        book.entries.append(normalized)
-        self._touch(book)
-        return EntryMutationResponse(entry=normalized, lorebook=self._to_meta(book))
+        with self._writing(lorebook_id) as book:
+            compact = CompactEntry.from_model(self._claim_uid(book, normalized))
+            self._storage.save_entries(book.id, [compact])
+            self._insert_entry(book, compact)
+            self._touch(book)
+            meta = book.to_meta()
+        return EntryMutationResponse(entry=normalized, lorebook=meta)
 
     def update_entry(
         self, lorebook_id: str, entry_uid: int, payload: EntryLike
     ) -> EntryMutationResponse:
-        book = self.get_lorebook(lorebook_id)
-        for idx, existing in enumerate(book.entries):
-            if existing.uid == entry_uid:
-                book.entries[idx] = self._normalize_entry(payload, entry_uid)
-                self._touch(book)
-                return EntryMutationResponse(
-                    entry=book.entries[idx], lorebook=self._to_meta(book)
-                )
-
-        raise HTTPException(status_code=404, detail="Entry not found")
+        with self._writing(lorebook_id) as book:
+            if entry_uid not in book.entries:
+                raise HTTPException(status_code=404, detail="Entry not found")
+
+            normalized = self._normalize_entry(payload, entry_uid)
+            compact = CompactEntry.from_model(normalized)
+            self._storage.save_entries(book.id, [compact])
+            self._replace_entry(book, compact)
+            self._touch(book)
+            meta = book.to_meta()
+        return EntryMutationResponse(entry=normalized, lorebook=meta)
 
     def delete_entry(self, lorebook_id: str, entry_uid: int) -> EntryMutationResponse:
-        book = self.get_lorebook(lorebook_id)
-        before = len(book.entries)
-        book.entries = [entry for entry in book.entries if entry.uid != entry_uid]
+        with self._writing(lorebook_id) as book:
+            if entry_uid not in book.entries:
+                raise HTTPException(status_code=404, detail="Entry not found")
+
+            self._storage.delete_entry(book.id, entry_uid)
+            self._remove_entry(book, entry_uid)
+            self._touch(book)
+            meta = book.to_meta()
+        return EntryMutationResponse(entry=None, lorebook=meta)
+
+    def apply_batch(
+        self, lorebook_id: str, operations: List[EntryOperation]
+    ) -> BatchEntryResponse:
+        """
+        Apply mixed add/update/delete operations atomically.
 
-        if len(book.entries) == before:
-            raise HTTPException(status_code=404, detail="Entry not found")
+        Every operation is validated against the book as it would look after
+        the preceding ones before anything is written, so a bad operation
+        rejects the whole batch. The book is touched once at the end.
+        """
+        with self._writing(lorebook_id) as book:
+            planned = self._plan_batch(book, operations)
+
+            results: List[EntryOperationResult] = []
+            for op, uid, entry in planned:
+                if op == "delete":
+                    self._storage.delete_entry(book.id, uid)
+                    self._remove_entry(book, uid)
+                else:
+                    compact = CompactEntry.from_model(entry)
+                    self._storage.save_entries(book.id, [compact])
+                    if uid in book.entries:
+                        self._replace_entry(book, compact)
+                    else:
+                        self._insert_entry(book, compact)
+                results.append(EntryOperationResult(op=op, uid=uid, entry=entry))
+            if planned:
+                self._touch(book)
+            meta = book.to_meta()
+
+        return BatchEntryResponse(results=results, lorebook=meta)
+
+    def list_entries(
+        self,
+        lorebook_id: str,
+        sort: str = "uid",
+        descending: bool = False,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[Set[str]] = None,
+    ) -> EntryPage:
+        """
+        Keyset-paginated entry listing with optional field projection.
 
-        self._touch(book)
-        return EntryMutationResponse(entry=None, lorebook=self._to_meta(book))
+        Only the entries on the requested page are serialized; the cursor
+        encodes the last (sort value, uid) pair so pages stay stable while the
+        book is edited.
+        """
+        with self._reading(lorebook_id) as book:
+            if sort not in ENTRY_SORT_FIELDS:
+                raise HTTPException(status_code=400, detail=f"Cannot sort by {sort}")
+            if fields is not None:
+                unknown = fields - LoreEntry.model_fields.keys()
+                if unknown:
+                    raise HTTPException(
+                        status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+                    )
+                fields = fields | {"uid"}
+
+            view = book.sorted_views.get(sort)
+            if view is None:
+                view = sorted((getattr(entry, sort), entry.uid) for entry in book.entries)
+                book.sorted_views[sort] = view
+
+            if cursor is None:
+                start = len(view) - 1 if descending else 0
+            else:
+                try:
+                    value, uid = decode_cursor(cursor)
+                    position = (int(value), int(uid))
+                except (TypeError, ValueError):
+                    raise HTTPException(status_code=400, detail="Invalid cursor")
+                if descending:
+                    start = bisect_left(view, position) - 1
+                else:
+                    start = bisect_right(view, position)
+
+            if descending:
+                keys = view[max(start - limit + 1, 0) : start + 1][::-1]
+            else:
+                keys = view[start : start + limit]
+
+            items: List[Dict[str, Any]] = [
+                book.entries.get(uid).to_dict(fields) for _, uid in keys
+            ]
+            more = (start - limit >= 0) if descending else (start + limit < len(view))
+            next_cursor = encode_cursor(list(keys[-1])) if keys and more else None
+            return EntryPage(items=items, total=len(view), nextCursor=next_cursor)
+
+    def changes_since(self, lorebook_id: str, since: int) -> LorebookChanges:
+        """Entries added, updated or deleted after version `since`."""
+        with self._reading(lorebook_id) as book:
+            if since < book.changelog_floor or since > book.version:
+                return LorebookChanges(lorebook=book.to_meta(), since=since, reset=True)
+
+            changed: Dict[int, None] = {}
+            for version, uid in reversed(book.changelog):
+                if version <= since:
+                    break
+                changed[uid] = None
+
+            upserted: List[LoreEntry] = []
+            deleted: List[int] = []
+            for uid in changed:
+                entry = book.entries.get(uid)
+                if entry is None:
+                    deleted.append(uid)
+                else:
+                    upserted.append(entry.to_model())
+
+            return LorebookChanges(
+                lorebook=book.to_meta(), since=since, upserted=upserted, deleted=deleted
+            )
+
+    def export_lorebook(self, lorebook_id: str, fmt: str) -> Iterator[str]:
+        """
+        Stream a lorebook in `fmt`. The metadata and entry list are
+        snapshotted together up front so edits made mid-download do not tear
+        the output.
+        """
+        with self._reading(lorebook_id) as book:
+            return iter_export(book.to_meta(), book.entries.to_list(), fmt)
+
+    def start_import(self, lorebook_id: str, fmt: str) -> ImportProgress:
+        """Register a streaming import so its progress can be polled."""
+        self._get_book(lorebook_id)
+        progress = ImportProgress(lorebookId=lorebook_id, format=fmt, started=now_ms())
+        self._imports[lorebook_id] = progress
+        return progress
+
+    def import_entries(
+        self,
+        lorebook_id: str,
+        entries: List[EntryLike],
+        progress: ImportProgress,
+    ) -> None:
+        """Append one batch of a streaming import; invalid entries are skipped."""
+        normalized, skipped = normalize_entries(entries)
+        progress.entriesSkipped += skipped
+        self.import_normalized(lorebook_id, normalized, progress)
+
+    def import_normalized(
+        self,
+        lorebook_id: str,
+        entries: List[LoreEntry],
+        progress: ImportProgress,
+    ) -> None:
+        """Append a batch that already went through normalize_entries()."""
+        inserted: List[CompactEntry] = []
+        with self._writing(lorebook_id) as book:
+            for entry in entries:
+                compact = CompactEntry.from_model(self._claim_uid(book, entry))
+                self._insert_entry(book, compact)
+                inserted.append(compact)
+
+            self._storage.save_entries(book.id, inserted)
+            self._touch(book)
+        progress.entriesImported += len(inserted)
+
+    def finish_import(
+        self, progress: ImportProgress, error: Optional[str] = None
+    ) -> None:
+        progress.status = "failed" if error else "done"
+        progress.error = error
+        progress.finished = now_ms()
+        book = self._books.get(progress.lorebookId)
+        if book:
+            progress.lorebook = book.to_meta()
+
+    def get_import(self, lorebook_id: str) -> ImportProgress:
+        progress = self._imports.get(lorebook_id)
+        if not progress:
+            raise HTTPException(status_code=404, detail="No import for this lorebook")
+        return progress
+
+    def scan(self, lorebook_id: str, request: ScanRequest) -> ScanResponse:
+        """Return the entries the given chat messages would activate."""
+        with self._reading(lorebook_id) as book:
+            if book.matcher is None:
+                book.matcher = KeywordMatcher(book.entries)
+
+            activated = {
+                entry.uid
+                for entry in book.matcher.scan(
+                    request.messages,
+                    request.scanDepth,
+                    request.maxRecursion,
+                    random.Random(request.seed),
+                )
+            }
+            return ScanResponse(
+                entries=[
+                    entry.to_model() for entry in book.entries if entry.uid in activated
+                ]
+            )
+
+    def search(
+        self, lorebook_id: str, query: str, offset: int = 0, limit: int = 50
+    ) -> SearchResponse:
+        """Ranked full-text search over comment, content and keywords."""
+        with self._reading(lorebook_id) as book:
+            if book.search is None:
+                book.search = SearchIndex(book.entries)
+
+            total, page = book.search.search(query, offset, limit)
+            return SearchResponse(
+                total=total,
+                offset=offset,
+                limit=limit,
+                results=[
+                    SearchHit(score=round(score, 4), entry=book.entries.get(uid).to_model())
+                    for uid, score in page
+                ],
+            )
+
+    def find_duplicates(
+        self, lorebook_id: str, threshold: float, limit: int = 100
+    ) -> DuplicateReport:
+        """Clusters of near-duplicate entries within one book."""
+        finder = ClusterFinder()
+        with self._reading(lorebook_id) as book:
+            finder.add(book.id, self._duplicate_index(book))
+            clusters = finder.clusters(threshold)
+            members = self._duplicate_members(book, clusters[:limit])
+        return self._duplicate_report(finder, clusters, members, threshold, limit)
+
+    def find_library_duplicates(
+        self, threshold: float, limit: int = 100
+    ) -> DuplicateReport:
+        """Clusters of near-duplicate entries across every book in the library."""
+        finder = ClusterFinder()
+        for lorebook_id in self._books:
+            try:
+                with self._reading(lorebook_id) as book:
+                    finder.add(book.id, self._duplicate_index(book))
+            except HTTPException:  # deleted meanwhile
+                continue
+        clusters = finder.clusters(threshold)
+
+        members: Dict[Member, DuplicateEntry] = {}
+        for lorebook_id in {member[0] for _, group in clusters[:limit] for member in group}:
+            try:
+                with self._reading(lorebook_id) as book:
+                    members.update(self._duplicate_members(book, clusters[:limit]))
+            except HTTPException:
+                continue
+        return self._duplicate_report(finder, clusters, members, threshold, limit)
+
+    def token_budget(
+        self, lorebook_id: str, budget: Optional[int] = None
+    ) -> TokenBudget:
+        """Sum cached token counts of enabled entries, honoring ignoreBudget."""
+        with self._reading(lorebook_id) as book:
+            budgeted = ignored = 0
+            for entry in book.entries:
+                if entry.disabled or not entry.enabled:
+                    continue
+                tokens = book.token_counts.get(entry.uid, 0)
+                if entry.ignoreBudget:
+                    ignored += tokens
+                else:
+                    budgeted += tokens
+
+            remaining = None if budget is None else budget - budgeted
+            return TokenBudget(
+                tokenizer=self._tokenizer.name,
+                budget=budget,
+                totalTokens=budgeted + ignored,
+                budgetedTokens=budgeted,
+                ignoredTokens=ignored,
+                remaining=remaining,
+                withinBudget=remaining is None or remaining >= 0,
+            )
 
     def set_active(self, lorebook_id: str) -> ActiveLorebookPayload:
-        if lorebook_id not in self._books:
-            raise HTTPException(status_code=404, detail="Lorebook not found")
-        self.active_id = lorebook_id
+        with self._write():
+            if lorebook_id not in self._books:
+                raise HTTPException(status_code=404, detail="Lorebook not found")
+            self._set_active_id(lorebook_id)
         return ActiveLorebookPayload(activeId=lorebook_id)
 
     def clear_active(self) -> ActiveLorebookPayload:
-        self.active_id = None
+        with self._write():
+            self._set_active_id(None)
         return ActiveLorebookPayload(activeId=None)
 
+    def close(self) -> None:
+        """Flush and release the storage backend (called on app shutdown)."""
+        self._storage.close()
+
     # -- helpers ------------------------------------------------------------ #
+    def _duplicate_index(self, book: BookRecord) -> DuplicateIndex:
+        if book.duplicates is None:
+            book.duplicates = DuplicateIndex(book.entries)
+        return book.duplicates
+
+    def _duplicate_members(
+        self, book: BookRecord, clusters: List[Tuple[float, List[Member]]]
+    ) -> Dict[Member, DuplicateEntry]:
+        """Describe the cluster members that belong to `book` (read-locked)."""
+        members: Dict[Member, DuplicateEntry] = {}
+        for _, group in clusters:
+            for member in group:
+                entry = book.entries.get(member[1]) if member[0] == book.id else None
+                if entry is not None:
+                    members[member] = DuplicateEntry(
+                        lorebookId=book.id,
+                        uid=entry.uid,
+                        comment=entry.comment,
+                        key=list(entry.key),
+                    )
+        return members
+
+    def _duplicate_report(
+        self,
+        finder: ClusterFinder,
+        clusters: List[Tuple[float, List[Member]]],
+        members: Dict[Member, DuplicateEntry],
+        threshold: float,
+        limit: int,
+    ) -> DuplicateReport:
+        page: List[DuplicateCluster] = []
+        for score, group in clusters[:limit]:
+            # Entries deleted since the search drop out of their cluster.
+            entries = [members[member] for member in group if member in members]
+            if len(entries) > 1:
+                page.append(DuplicateCluster(similarity=round(score, 4), entries=entries))
+        return DuplicateReport(
+            threshold=threshold,
+            entriesScanned=finder.scanned,
+            total=len(clusters),
+            clusters=page,
+        )
+
     def _normalize_entry(
         self, entry: EntryLike, force_uid: Optional[int] = None
     ) -> LoreEntry:
-        """
-        Accept either a BaseModel or raw dict and coerce fields into the shape
-        the frontend expects (arrays instead of dicts, populated UID, etc.).
-        """
-        if isinstance(entry, BaseModel):
-            data = entry.model_dump(exclude_none=True)
-        elif isinstance(entry, dict):
-            data = dict(entry)
-        else:
-            raise ValueError("Unsupported entry payload")
+        return normalize_entry(entry, force_uid)
 
-        data["key"] = normalize_string_list(data.get("key", []))
-        data["keysecondary"] = normalize_string_list(data.get("keysecondary", []))
-        data["uid"] = force_uid or data.get("uid") or generate_entry_uid()
+    def _normalize_batch_entry(
+        self, idx: int, entry: EntryLike, force_uid: Optional[int] = None
+    ) -> LoreEntry:
+        try:
+            return self._normalize_entry(entry, force_uid)
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=422, detail=f"Operation {idx}: {exc}"
+            ) from exc
+
+    def _plan_batch(
+        self, book: BookRecord, operations: List[EntryOperation]
+    ) -> List[tuple]:
+        """Validate and normalize batch operations into (op, uid, entry) steps."""
+        added: set = set()
+        deleted: set = set()
+        planned: List[tuple] = []
+
+        def exists(uid: Optional[int]) -> bool:
+            return uid in added or (uid in book.entries and uid not in deleted)
+
+        for idx, operation in enumerate(operations):
+            if operation.op == "delete":
+                if operation.uid is None:
+                    raise HTTPException(
+                        status_code=422, detail=f"Operation {idx}: missing uid"
+                    )
+                if not exists(operation.uid):
+                    raise HTTPException(
+                        status_code=404, detail=f"Operation {idx}: entry not found"
+                    )
+                added.discard(operation.uid)
+                deleted.add(operation.uid)
+                planned.append(("delete", operation.uid, None))
+                continue
+
+            if operation.entry is None:
+                raise HTTPException(
+                    status_code=422, detail=f"Operation {idx}: missing entry payload"
+                )
 
-        return LoreEntry(**data)
+            if operation.op == "update":
+                uid = operation.uid if operation.uid is not None else operation.entry.uid
+                if uid is None:
+                    raise HTTPException(
+                        status_code=422, detail=f"Operation {idx}: missing uid"
+                    )
+                if not exists(uid):
+                    raise HTTPException(
+                        status_code=404, detail=f"Operation {idx}: entry not found"
+                    )
+                entry = self._normalize_batch_entry(idx, operation.entry, uid)
+                planned.append(("update", uid, entry))
+                continue
+
+            entry = self._normalize_batch_entry(idx, operation.entry)
+            while entry.uid in book.entries or entry.uid in added:
+                entry.uid = generate_entry_uid()
+            added.add(entry.uid)
+            planned.append(("add", entry.uid, entry))
+
+        return planned
+
+    def _metas(self, book_ids: List[str]) -> List[LorebookMeta]:
+        # The index can briefly list a book a worker thread is adding or
+        # deleting; skip whatever the book map does not have (yet).
+        books = self._books
+        return [books[book_id].to_meta() for book_id in book_ids if book_id in books]
+
+    def _get_book(self, lorebook_id: str) -> BookRecord:
+        book = self._books.get(lorebook_id)
+        if not book:
+            raise HTTPException(status_code=404, detail="Lorebook not found")
+        return book
 
-    def _touch(self, book: Lorebook) -> None:
-        book.entryCount = len(book.entries)
+    def _claim_uid(self, book: BookRecord, entry: LoreEntry) -> LoreEntry:
+        """Re-mint the UID of an incoming entry if the book already uses it."""
+        while entry.uid in book.entries:
+            entry.uid = generate_entry_uid()
+        return entry
+
+    # Entry mutations go through these so derived indexes stay in sync.
+    def _insert_entry(self, book: BookRecord, entry: CompactEntry) -> None:
+        book.entries.append(entry)
+        book.pending_changes.append(entry.uid)
+        book.approx_bytes += entry.approx_size()
+        self._count_tokens(book, entry)
+        if book.search is not None:
+            book.search.add(entry)
+        if book.duplicates is not None:
+            book.duplicates.add(entry)
+
+    def _replace_entry(self, book: BookRecord, entry: CompactEntry) -> None:
+        previous = book.entries.replace(entry)
+        book.pending_changes.append(entry.uid)
+        book.approx_bytes += entry.approx_size() - previous.approx_size()
+        if previous.content != entry.content:
+            self._count_tokens(book, entry)
+        if book.search is not None:
+            book.search.replace(entry)
+        if book.duplicates is not None and (
+            previous.content != entry.content or previous.key != entry.key
+        ):
+            book.duplicates.replace(entry)
+
+    def _remove_entry(self, book: BookRecord, entry_uid: int) -> None:
+        removed = book.entries.remove(entry_uid)
+        book.pending_changes.append(entry_uid)
+        book.approx_bytes -= removed.approx_size()
+        book.token_total -= book.token_counts.pop(entry_uid, 0)
+        if book.search is not None:
+            book.search.remove(entry_uid)
+        if book.duplicates is not None:
+            book.duplicates.remove(entry_uid)
+
+    def _count_tokens(self, book: BookRecord, entry: CompactEntry) -> None:
+        tokens = self._tokenizer.count(entry.content) if entry.content else 0
+        book.token_total += tokens - book.token_counts.get(entry.uid, 0)
+        book.token_counts[entry.uid] = tokens
+
+    @contextmanager
+    def _write(self) -> Iterator[None]:
+        """
+        Run a mutation as one storage transaction, starting from the latest
+        shared state. Mutations look their book up inside this block, since
+        sync() may have swapped in a freshly loaded copy.
+        """
+        with self._lock, self._storage.transaction():
+            self.sync()
+            yield
+
+    @contextmanager
+    def _writing(self, lorebook_id: str) -> Iterator[BookRecord]:
+        """_write() plus exclusive access to one book."""
+        with self._write():
+            book = self._get_book(lorebook_id)
+            with book.lock.write():
+                yield book
+
+    @contextmanager
+    def _reading(self, lorebook_id: str) -> Iterator[BookRecord]:
+        """Shared access to one book; edits wait until readers are done."""
+        book = self._get_book(lorebook_id)
+        with book.lock.read():
+            yield book
+
+    def _adopt_book(self, book: BookRecord) -> None:
+        """Prepare a book fresh from storage (changelog floor, token counts)."""
+        book.changelog_floor = book.version
+        self.library_version = max(self.library_version, book.version)
+        for entry in book.entries:
+            book.approx_bytes += entry.approx_size()
+            self._count_tokens(book, entry)
+
+    def _load_settings(self) -> None:
+        stored = int(self._storage.load_setting("library_version") or 0)
+        self.library_version = max(self.library_version, stored)
+        active_id = self._storage.load_setting("active_id")
+        self.active_id = active_id if active_id in self._books else None
+
+    def _touch(self, book: BookRecord) -> None:
+        # Derived state goes before the version moves on, so nothing built
+        # from the old contents is ever seen next to the new version.
+        book.matcher = None
+        book.sorted_views.clear()
+        book.encoded = None
+        since = book.version
         book.lastEdited = now_ms()
-
-    def _to_meta(self, book: Lorebook) -> LorebookMeta:
-        return LorebookMeta(
-            id=book.id,
-            name=book.name,
-            entryCount=len(book.entries),
-            lastEdited=book.lastEdited,
-            created=book.created,
-        )
+        book.version = self._next_version()
+        self._notify("change", book, since, book.pending_changes)
+        book.log_changes(book.version)
+        self._index.put(book)
+        self._library_encoded = None
+        self._storage.save_book(book)
+
+    def _notify(
+        self, kind: str, book: BookRecord, since: int = 0, changed: Sequence[int] = ()
+    ) -> None:
+        if self._on_change is not None:
+            self._on_change(kind, book, since, changed)
+
+    def _next_version(self) -> int:
+        self.library_version += 1
+        self._storage.save_setting("library_version", str(self.library_version))
+        return self.library_version
+
+    def _set_active_id(self, lorebook_id: Optional[str]) -> None:
+        if lorebook_id != self.active_id:
+            self.active_id = lorebook_id
+            self._storage.save_setting("active_id", lorebook_id)
 
     def _seed_data(self) -> None:
         """Starter lorebook so the UI has something to render on first run."""
@@ -168,4 +949,4 @@ class LorebookStore:
             constant=False,
         )
         book = self.create_lorebook("Starter Lorebook", [starter_entry])
-        self.active_id = book.id
+        self._set_active_id(book.id)
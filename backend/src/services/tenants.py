@@ -0,0 +1,209 @@
+"""
+Per-user partitioning of the lorebook library.
+
+Every signed-in Discord user gets their own LorebookStore (own books, own
+active lorebook, own SQLite file); anonymous requests share the "public"
+tenant. Stores are opened on first use and kept in an LRU. When the estimated
+memory of all open stores exceeds the budget, the least recently used idle
+tenants are closed. Their data is already on disk, because the SQLite
+backend writes through on every mutation, and it is reloaded on next access.
+Loading reads a whole SQLite file, so it runs on the worker pool, and
+concurrent requests for the same tenant share one load.
+
+Without a data directory every tenant lives in memory only, so nothing is
+ever evicted (it would be lost).
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import re
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .changes import ChangeBroker
+from .storage import MemoryStorage, SQLiteStorage, StorageBackend
+from .store import LorebookStore
+from .tokens import Tokenizer
+from .workers import WorkerPool
+
+PUBLIC_TENANT = "public"
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024
+# Fixed cost of an open tenant beyond its books (SQLite connection and page
+# cache, store bookkeeping), measured with benchmarks/bench_tenants.py.
+TENANT_OVERHEAD_BYTES = 320 * 1024
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_-]")
+
+
+def tenant_for(user_id: Optional[str]) -> str:
+    """Tenant key for a Discord user ID (None = anonymous)."""
+    if user_id is None:
+        return PUBLIC_TENANT
+    return f"user-{_UNSAFE.sub('_', user_id)}"
+
+
+class TenantRegistry:
+    """LRU of open per-tenant stores under a memory budget."""
+
+    def __init__(
+        self,
+        data_dir: Optional[str] = None,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+        tokenizer: Optional[Tokenizer] = None,
+        public_path: Optional[str] = None,
+        changes: Optional[ChangeBroker] = None,
+    ) -> None:
+        self.data_dir = data_dir
+        self.memory_budget = memory_budget
+        self._tokenizer = tokenizer
+        self._changes = changes
+        self._public_path = public_path
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+
+        self._stores: "OrderedDict[str, LorebookStore]" = OrderedDict()
+        # Last measured approx_bytes per open tenant, and their running sum.
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        # Requests currently using each tenant; busy tenants are not evicted.
+        self._in_use: Dict[str, int] = {}
+        self.loads = 0
+        self.evictions = 0
+
+        # The public tenant backs app.state.store and is never evicted.
+        self.public = self._open(PUBLIC_TENANT)
+
+    @classmethod
+    def from_env(
+        cls,
+        tokenizer: Optional[Tokenizer] = None,
+        changes: Optional[ChangeBroker] = None,
+    ) -> "TenantRegistry":
+        """
+        LOREMASTER_DATA_DIR holds one SQLite file per tenant (defaulting to a
+        `tenants` folder next to LOREMASTER_DB_PATH, which keeps serving the
+        public tenant). LOREMASTER_MEMORY_BUDGET_MB caps open tenants.
+        """
+        public_path = os.getenv("LOREMASTER_DB_PATH")
+        data_dir = os.getenv("LOREMASTER_DATA_DIR")
+        if not data_dir and public_path:
+            data_dir = os.path.join(os.path.dirname(public_path) or ".", "tenants")
+        budget_mb = os.getenv("LOREMASTER_MEMORY_BUDGET_MB")
+        budget = int(budget_mb) * 1024 * 1024 if budget_mb else DEFAULT_MEMORY_BUDGET
+        return cls(
+            data_dir=data_dir,
+            memory_budget=budget,
+            tokenizer=tokenizer,
+            public_path=public_path,
+            changes=changes,
+        )
+
+    @property
+    def evictable(self) -> bool:
+        return bool(self.data_dir)
+
+    @asynccontextmanager
+    async def checkout(
+        self, tenant: str, workers: WorkerPool
+    ) -> AsyncIterator[LorebookStore]:
+        """Borrow a tenant's store for one request, loading it if needed."""
+        # Counted as in use before any await, so a store loaded for this
+        # request cannot be evicted before the request gets it.
+        self._in_use[tenant] = self._in_use.get(tenant, 0) + 1
+        try:
+            store = self._stores.get(tenant)
+            if store is None:
+                store = await workers.share(
+                    ("tenant", tenant), functools.partial(self._load, tenant, workers)
+                )
+            else:
+                self._stores.move_to_end(tenant)
+            yield store
+        finally:
+            self._in_use[tenant] -= 1
+            if not self._in_use[tenant]:
+                del self._in_use[tenant]
+            if tenant in self._stores:
+                self._measure(tenant)
+                self._enforce_budget()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Aggregate memory estimates. Nothing per tenant: tenants are named
+        after user IDs and this is served without authentication.
+        """
+        return {
+            "tenants": len(self._stores),
+            "books": sum(store.book_count for store in self._stores.values()),
+            "entries": sum(store.entry_count for store in self._stores.values()),
+            "approxBytes": self._total_bytes,
+            "memoryBudget": self.memory_budget,
+            "evictable": self.evictable,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+    def book_size(self, book_id: str) -> Optional[int]:
+        """Entry count of a book in any open tenant (book IDs are unique)."""
+        for store in self._stores.values():
+            size = store.book_size(book_id)
+            if size is not None:
+                return size
+        return None
+
+    def close(self) -> None:
+        for store in self._stores.values():
+            store.close()
+        self._stores.clear()
+        self._sizes.clear()
+        self._total_bytes = 0
+
+    # -- helpers ------------------------------------------------------------ #
+    def _storage_for(self, tenant: str) -> StorageBackend:
+        if tenant == PUBLIC_TENANT and self._public_path:
+            return SQLiteStorage(self._public_path)
+        if self.data_dir:
+            return SQLiteStorage(os.path.join(self.data_dir, f"{tenant}.sqlite3"))
+        return MemoryStorage()
+
+    def _build(self, tenant: str) -> LorebookStore:
+        return LorebookStore(
+            self._storage_for(tenant),
+            tokenizer=self._tokenizer,
+            on_change=self._changes.hook(tenant) if self._changes else None,
+        )
+
+    async def _load(self, tenant: str, workers: WorkerPool) -> LorebookStore:
+        store = await workers.run(self._build, tenant)
+        return self._register(tenant, store)
+
+    def _open(self, tenant: str) -> LorebookStore:
+        return self._register(tenant, self._build(tenant))
+
+    def _register(self, tenant: str, store: LorebookStore) -> LorebookStore:
+        self._stores[tenant] = store
+        self.loads += 1
+        self._measure(tenant)
+        return store
+
+    def _measure(self, tenant: str) -> None:
+        size = TENANT_OVERHEAD_BYTES + self._stores[tenant].approx_bytes
+        self._total_bytes += size - self._sizes.get(tenant, 0)
+        self._sizes[tenant] = size
+
+    def _enforce_budget(self) -> None:
+        if not self.evictable or self._total_bytes <= self.memory_budget:
+            return
+        for tenant in list(self._stores):
+            if self._total_bytes <= self.memory_budget:
+                break
+            if tenant == PUBLIC_TENANT or tenant in self._in_use:
+                continue
+            # Writes already went through to SQLite; closing commits and
+            # checkpoints, so nothing is lost.
+            self._stores.pop(tenant).close()
+            self._total_bytes -= self._sizes.pop(tenant)
+            self.evictions += 1
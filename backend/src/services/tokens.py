@@ -0,0 +1,95 @@
+"""
+Token counting for lore entries.
+
+Counts are used for budget accounting, so they should be close to what the
+target model's tokenizer produces. A real BPE tokenizer is used when one is
+installed (tiktoken); otherwise a script-aware heuristic stands in, which is
+still much closer than `len(content) / 4` for non-English text.
+
+Select a tokenizer with LOREMASTER_TOKENIZER, e.g. `heuristic` (default) or
+`tiktoken:cl100k_base`.
+"""
+
+from __future__ import annotations
+
+import re
+
+_PIECES = re.compile(r"[A-Za-z]+|[0-9]+|[^\W\d_A-Za-z]+|\S")
+
+
+def _is_cjk(char: str) -> bool:
+    code = ord(char)
+    return (
+        0x3040 <= code <= 0x30FF  # Hiragana / Katakana
+        or 0x3400 <= code <= 0x4DBF  # CJK Extension A
+        or 0x4E00 <= code <= 0x9FFF  # CJK Unified Ideographs
+        or 0xAC00 <= code <= 0xD7AF  # Hangul syllables
+        or 0xF900 <= code <= 0xFAFF  # CJK Compatibility Ideographs
+    )
+
+
+class Tokenizer:
+    """Interface for anything that can count tokens in a string."""
+
+    name = "base"
+
+    def count(self, text: str) -> int:
+        raise NotImplementedError
+
+
+class HeuristicTokenizer(Tokenizer):
+    """
+    Dependency-free approximation of a byte-level BPE tokenizer.
+
+    Latin words cost about one token per five letters, digits are grouped in
+    threes, CJK characters cost a token each, other scripts roughly one token
+    per two characters, and each punctuation mark or symbol is its own token.
+    """
+
+    name = "heuristic"
+
+    def count(self, text: str) -> int:
+        total = 0
+        for piece in _PIECES.findall(text):
+            first = piece[0]
+            if first.isascii():
+                if first.isalpha():
+                    total += (len(piece) + 4) // 5
+                elif first.isdigit():
+                    total += (len(piece) + 2) // 3
+                else:
+                    total += 1
+            elif len(piece) == 1 and not first.isalpha():
+                total += 1
+            else:
+                cjk = sum(1 for char in piece if _is_cjk(char))
+                total += cjk + (len(piece) - cjk + 1) // 2
+        return total
+
+
+class TiktokenTokenizer(Tokenizer):
+    """Exact counts via OpenAI's tiktoken (optional dependency)."""
+
+    def __init__(self, encoding: str = "cl100k_base") -> None:
+        import tiktoken
+
+        self._encoding = tiktoken.get_encoding(encoding)
+        self.name = f"tiktoken:{encoding}"
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def load_tokenizer(spec: str | None) -> Tokenizer:
+    """Build a tokenizer from a `name[:option]` spec, e.g. `tiktoken:o200k_base`."""
+    if not spec or spec == HeuristicTokenizer.name:
+        return HeuristicTokenizer()
+
+    kind, _, option = spec.partition(":")
+    if kind == "tiktoken":
+        try:
+            return TiktokenTokenizer(option or "cl100k_base")
+        except ImportError as exc:
+            raise ValueError("tiktoken is not installed") from exc
+
+    raise ValueError(f"Unknown tokenizer: {spec}")
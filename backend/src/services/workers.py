@@ -0,0 +1,106 @@
+"""
+Bounded worker pools that keep slow store calls off the event loop.
+
+Routes are `async def` and share one event loop per process, so a store call
+that takes a second (validating a 50k-entry book, encoding it, a big SQLite
+write) would stall every other client. Such calls go through a WorkerPool
+instead:
+
+- `run()` uses a fixed-size thread pool. It suits SQLite I/O and any code
+  that touches store state. The GIL is released regularly, so the event loop
+  keeps answering small requests while a worker grinds.
+- `run_cpu()` is for pure functions with picklable arguments and results
+  (entry validation). It uses a process pool when LOREMASTER_PROCESS_WORKERS
+  is set, so it gets real parallelism, and falls back to the thread pool
+  otherwise.
+
+`share()` coalesces identical calls: while one is in flight, later callers
+with the same key wait for its result instead of starting another (many
+clients opening a popular book right after it changed all need the same
+encoded body).
+
+LOREMASTER_WORKER_THREADS sizes the thread pool. Setting it to 0 runs
+everything inline on the event loop, which is the behaviour before pools
+existed and is kept for comparison.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_THREADS = 4
+
+
+class WorkerPool:
+    def __init__(self, threads: int = DEFAULT_THREADS, processes: int = 0) -> None:
+        self.threads = threads
+        self.processes = processes
+        self._threads: Optional[Executor] = (
+            ThreadPoolExecutor(threads, thread_name_prefix="loremaster-worker")
+            if threads
+            else None
+        )
+        # Spawned rather than forked: forking a process that already runs
+        # threads can copy held locks into the child.
+        self._processes: Optional[Executor] = (
+            ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn"))
+            if processes
+            else None
+        )
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    @classmethod
+    def from_env(cls) -> "WorkerPool":
+        return cls(
+            threads=int(os.getenv("LOREMASTER_WORKER_THREADS", str(DEFAULT_THREADS))),
+            processes=int(os.getenv("LOREMASTER_PROCESS_WORKERS", "0")),
+        )
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Call `fn(*args)` on a worker thread and wait for the result."""
+        if self._threads is None:
+            return fn(*args)
+        # Carry context variables over, as asyncio.to_thread does.
+        call = functools.partial(contextvars.copy_context().run, fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(self._threads, call)
+
+    async def share(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await `call()`, unless a call with an equal `key` is already in
+        flight; then wait for its result (or exception) instead. The key must
+        identify everything the result depends on.
+        """
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(call())
+            self._in_flight[key] = future
+            future.add_done_callback(functools.partial(self._landed, key))
+        # Shielded, so one caller going away does not cancel the others' call.
+        return await asyncio.shield(future)
+
+    def _landed(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        if not future.cancelled():
+            future.exception()  # retrieved, in case every caller went away
+
+    async def run_cpu(self, fn: Callable[..., T], *args: Any) -> T:
+        """Call a pure, picklable `fn(*args)` in a worker process if enabled."""
+        if self._processes is None:
+            return await self.run(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._processes, functools.partial(fn, *args)
+        )
+
+    def close(self) -> None:
+        for executor in (self._threads, self._processes):
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
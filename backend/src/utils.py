@@ -7,6 +7,9 @@ and the in-memory store.
 
 from __future__ import annotations
 
+import base64
+import json
+import threading
 import time
 import uuid
 from typing import List
@@ -22,9 +25,22 @@ def generate_book_id() -> str:
     return f"book_{now_ms()}_{uuid.uuid4().hex[:6]}"
 
 
+_uid_lock = threading.Lock()
+_last_uid = 0
+
+
 def generate_entry_uid() -> int:
-    """Numeric UID for entries (matches the frontend UI's expectations)."""
-    return now_ms()
+    """
+    Numeric UID for entries (matches the frontend UI's expectations).
+
+    UIDs are still millisecond timestamps, but strictly increasing: when several
+    are minted within the same millisecond (bulk imports), each one takes the
+    next integer instead of repeating the timestamp.
+    """
+    global _last_uid
+    with _uid_lock:
+        _last_uid = max(now_ms(), _last_uid + 1)
+        return _last_uid
 
 
 def normalize_string_list(value: object) -> List[str]:
@@ -41,3 +57,18 @@ def normalize_string_list(value: object) -> List[str]:
     if isinstance(value, dict):
         return [str(item) for item in value.values()]
     return [str(value)]
+
+
+def encode_cursor(value: object) -> str:
+    """Opaque, URL-safe pagination cursor for a JSON-serializable position."""
+    raw = json.dumps(value, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> object:
+    """Inverse of encode_cursor; raises ValueError on malformed input."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
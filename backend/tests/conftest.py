@@ -0,0 +1,31 @@
+"""Shared fixtures for the backend test suite."""
+
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import create_app
+from src.services.store import LorebookStore
+
+
+@pytest.fixture(autouse=True)
+def _clean_env(monkeypatch):
+    """Run every test against defaults, whatever the developer's .env says."""
+    for name in list(os.environ):
+        if name.startswith(("LOREMASTER_", "DISCORD_")):
+            monkeypatch.delenv(name)
+    monkeypatch.setenv("LOREMASTER_SESSION_SECRET", "test-secret" * 4)
+
+
+@pytest.fixture
+def store() -> LorebookStore:
+    """An in-memory store holding only the starter book."""
+    return LorebookStore()
+
+
+@pytest.fixture
+def client():
+    """The API with an in-memory public library."""
+    with TestClient(create_app()) as client:
+        yield client
@@ -0,0 +1,78 @@
+import random
+
+from src.models import LoreEntry
+from src.services.activation import AND_ALL, NOT_ANY, AhoCorasick, KeywordMatcher
+
+
+def _scan(entries, messages, depth=4, recursion=0):
+    matcher = KeywordMatcher([LoreEntry(uid=i + 1, **entry) for i, entry in enumerate(entries)])
+    found = matcher.scan(messages, depth, recursion, random.Random(0))
+    return sorted(entry.uid for entry in found)
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    automaton = AhoCorasick(["he", "she", "hers"])
+    assert sorted(automaton.iter_matches("ushers")) == [(0, 4), (1, 4), (2, 6)]
+
+
+def test_plain_keys_match_case_insensitively_on_whole_words():
+    entries = [{"key": ["Dragon"]}, {"key": ["drag"]}, {"key": ["drag"], "matchWholeWords": False}]
+    assert _scan(entries, ["A DRAGON appears"]) == [1, 3]
+
+
+def test_case_sensitive_keys():
+    entries = [{"key": ["Rome"], "caseSensitive": True}]
+    assert _scan(entries, ["rome"]) == []
+    assert _scan(entries, ["Rome"]) == [1]
+
+
+def test_regex_keys():
+    assert _scan([{"key": ["/colou?r/i"]}], ["COLOR me"]) == [1]
+
+
+def test_selective_logic():
+    entries = [
+        {"key": ["sword"], "keysecondary": ["fire", "ice"], "selectiveLogic": AND_ALL},
+        {"key": ["sword"], "keysecondary": ["ice"], "selectiveLogic": NOT_ANY},
+    ]
+    assert _scan(entries, ["a sword of fire"]) == [2]
+    assert _scan(entries, ["a sword of fire and ice"]) == [1]
+
+
+def test_scan_depth_limits_how_far_back_keys_count():
+    entries = [{"key": ["old"]}, {"key": ["old"], "scanDepth": 3}]
+    messages = ["old news", "b", "c"]
+    assert _scan(entries, messages, depth=2) == [2]
+
+
+def test_constant_disabled_and_recursion():
+    entries = [
+        {"constant": True, "content": "mentions the castle"},
+        {"key": ["castle"]},
+        {"key": ["castle"], "excludeRecursion": True},
+        {"key": ["dragon"], "disabled": True},
+    ]
+    assert _scan(entries, ["dragon"]) == [1]
+    assert _scan(entries, ["dragon"], recursion=1) == [1, 2]
+
+
+def test_recursion_matches_keys_like_the_first_pass():
+    entries = [
+        {"constant": True, "content": "The Red Dragon-kin fled\nto old Rome."},
+        {"key": ["dragon"]},
+        {"key": ["drag"]},
+        {"key": ["drag"], "matchWholeWords": False},
+        {"key": ["red dragon"]},
+        {"key": ["fled to"]},
+        {"key": ["Rome"], "caseSensitive": True},
+        {"key": ["rome"], "caseSensitive": True},
+    ]
+    assert _scan(entries, [], recursion=1) == [1, 2, 4, 5, 7]
+
+
+def test_scan_endpoint(client):
+    book = client.post(
+        "/lorebooks", json={"name": "Scan", "entries": [{"key": ["elf"], "comment": "Elves"}]}
+    ).json()
+    response = client.post(f"/lorebooks/{book['id']}/scan", json={"messages": ["an elf"]})
+    assert [entry["comment"] for entry in response.json()["entries"]] == ["Elves"]
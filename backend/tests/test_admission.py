@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from src.services.admission import Admission, Lane
+
+
+def test_routes_are_sorted_into_lanes():
+    admission = Admission(Lane("heavy", 1, 1), Lane("cheap", 1, 1))
+    assert admission.lane_for("POST", "/lorebooks/abc/import") is admission.heavy
+    assert admission.lane_for("GET", "/lorebooks:duplicates") is admission.heavy
+    assert admission.lane_for("GET", "/lorebooks/abc") is admission.cheap
+    assert admission.lane_for("GET", "/lorebooks") is admission.cheap
+    assert admission.lane_for("GET", "/changes") is None
+
+
+def test_lane_queues_in_order_and_rejects_when_full():
+    lane = Lane("heavy", limit=1, queue=2)
+    order = []
+
+    async def request(name):
+        if not await lane.acquire():
+            order.append(f"{name} rejected")
+            return
+        order.append(name)
+        await asyncio.sleep(0)
+        lane.release(0.1)
+
+    async def main():
+        await asyncio.gather(*(request(name) for name in "abcd"))
+
+    asyncio.run(main())
+    assert order == ["a", "d rejected", "b", "c"]
+    assert lane.rejected == 1 and lane.active == 0 and lane.queued == 0
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    lane = Lane("heavy", limit=1, queue=1)
+
+    async def main():
+        assert await lane.acquire()
+        waiter = asyncio.ensure_future(lane.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert lane.queued == 0
+        lane.release()
+        assert lane.active == 0
+
+    asyncio.run(main())
+
+
+def test_hold_answers_503_with_retry_after():
+    lane = Lane("heavy", limit=1, queue=0)
+    lane.average_duration = 4.0
+
+    async def main():
+        async with lane.hold():
+            with pytest.raises(HTTPException) as busy:
+                async with lane.hold():
+                    pass
+        return busy.value
+
+    error = asyncio.run(main())
+    assert error.status_code == 503
+    assert int(error.headers["Retry-After"]) >= 4
+    assert lane.active == 0
+
+
+def test_admission_limit_is_enforced_over_http(client):
+    heavy = client.app.state.admission.heavy
+    heavy.limit, heavy.queue, heavy.active = 1, 0, 1
+    try:
+        busy = client.post("/lorebooks", json={"name": "Turned away"})
+        light = client.get("/health")
+    finally:
+        heavy.active = 0
+    assert busy.status_code == 503 and busy.headers["Retry-After"]
+    assert light.status_code == 200
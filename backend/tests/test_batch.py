@@ -0,0 +1,63 @@
+def _batch(client, book_id, *operations):
+    return client.post(f"/lorebooks/{book_id}/entries:batch", json={"operations": list(operations)})
+
+
+def _book(client):
+    book = client.post("/lorebooks", json={"name": "Batch", "entries": [{"comment": "a"}]}).json()
+    return book["id"], book["entries"][0]["uid"]
+
+
+def _comments(client, book_id):
+    return [entry["comment"] for entry in client.get(f"/lorebooks/{book_id}").json()["entries"]]
+
+
+def test_mixed_operations_apply_in_order_with_one_version_bump(client):
+    book_id, uid = _book(client)
+    version = client.get(f"/lorebooks/{book_id}").json()["version"]
+    response = _batch(
+        client,
+        book_id,
+        {"op": "add", "entry": {"comment": "b"}},
+        {"op": "update", "uid": uid, "entry": {"comment": "A"}},
+        {"op": "add", "entry": {"comment": "c"}},
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["op"] for result in results] == ["add", "update", "add"]
+    assert response.json()["lorebook"]["version"] == version + 1
+    assert _comments(client, book_id) == ["A", "b", "c"]
+
+    added = results[0]["uid"]
+    _batch(client, book_id, {"op": "delete", "uid": added})
+    assert _comments(client, book_id) == ["A", "c"]
+
+
+def test_a_bad_operation_rejects_the_whole_batch(client):
+    book_id, uid = _book(client)
+    response = _batch(
+        client,
+        book_id,
+        {"op": "update", "uid": uid, "entry": {"comment": "changed"}},
+        {"op": "delete", "uid": 12345},
+    )
+    assert response.status_code == 404
+    assert "Operation 1" in response.json()["detail"]
+    assert _comments(client, book_id) == ["a"]
+
+
+def test_operations_see_earlier_ones(client):
+    book_id, uid = _book(client)
+    deleted_twice = _batch(client, book_id, {"op": "delete", "uid": uid}, {"op": "delete", "uid": uid})
+    assert deleted_twice.status_code == 404
+
+
+def test_malformed_operations_are_422(client):
+    book_id, _ = _book(client)
+    for operation in (
+        {"op": "update", "entry": {"comment": "no uid"}},
+        {"op": "delete"},
+        {"op": "add"},
+    ):
+        response = _batch(client, book_id, operation)
+        assert response.status_code == 422, operation
+    assert _comments(client, book_id) == ["a"]
@@ -0,0 +1,62 @@
+import json
+
+from benchmarks import suite
+
+
+def _result(p50=1.0, p95=2.0, rps=1000.0, mem=100.0):
+    return {"p50_ms": p50, "p95_ms": p95, "throughput_rps": rps, "peak_mem_kib": mem}
+
+
+def _report(**scenarios):
+    return {"results": {"asgi": scenarios}}
+
+
+def test_slowdowns_beyond_the_threshold_are_regressions():
+    baseline = _report(read=_result(p50=10.0, p95=12.0, rps=100.0))
+    current = _report(read=_result(p50=14.0, p95=12.5, rps=70.0))
+    regressions = suite.compare(current, baseline, threshold=0.25)
+    assert regressions == [
+        "asgi read: p50_ms 10.0 -> 14.0",
+        "asgi read: throughput_rps 100.0 -> 70.0",
+    ]
+
+
+def test_noise_on_fast_routes_and_small_heaps_is_tolerated():
+    baseline = _report(health=_result(p50=0.3, p95=0.4, rps=3000.0, mem=40.0))
+    current = _report(
+        health=_result(p50=0.45, p95=0.55, rps=2500.0, mem=90.0),
+        added=_result(),  # not in the baseline yet
+    )
+    assert suite.compare(current, baseline, threshold=0.25) == []
+
+
+def test_the_noise_floor_is_absolute():
+    baseline = _report(read=_result(p50=5.0, p95=6.0, rps=200.0))
+    current = _report(read=_result(p50=6.5, p95=6.0, rps=200.0))
+    assert suite.compare(current, baseline, threshold=0.25) == [
+        "asgi read: p50_ms 5.0 -> 6.5"
+    ]
+    assert suite.compare(current, baseline, threshold=0.25, floor_ms=0.5) == []
+
+
+def test_reported_metrics_are_medians_of_the_runs():
+    runs = [_result(p50=1.0, mem=90.0), _result(p50=9.0, mem=100.0), _result(p50=2.0, mem=95.0)]
+    assert suite._median(runs) == {**_result(p50=2.0, mem=95.0), "runs": 3}
+
+
+def test_saving_a_baseline_only_adds_new_scenarios():
+    baseline = _report(read=_result(p50=1.0))
+    report = _report(read=_result(p50=3.0), added=_result(p50=4.0))
+    merged = suite.merge_baseline(baseline, report)
+    assert merged["results"]["asgi"] == {"read": _result(p50=1.0), "added": _result(p50=4.0)}
+    assert baseline["results"]["asgi"] == {"read": _result(p50=1.0)}
+
+
+def test_scenario_names_are_unique_and_in_the_stored_baseline():
+    names = [scenario.name for scenario in suite._scenarios()]
+    assert len(names) == len(set(names))
+    with open(suite.DEFAULT_BASELINE) as handle:
+        baseline = json.load(handle)["results"]
+    for scenario in suite._scenarios():
+        for transport in scenario.transports:
+            assert scenario.name in baseline[transport], (transport, scenario.name)
@@ -0,0 +1,137 @@
+import asyncio
+import json
+
+from src.app import create_app
+from src.services.changes import RESYNC_FRAME, ChangeBroker
+from src.services.store import LorebookStore
+
+
+def _events(frames: bytes):
+    """(event, data) pairs from a chunk of SSE frames."""
+    events = []
+    for frame in frames.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines() if ": " in line)
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def _subscribed_store(broker: ChangeBroker) -> LorebookStore:
+    return LorebookStore(on_change=broker.hook("public"))
+
+
+def test_edits_within_the_window_become_one_event():
+    broker = ChangeBroker(coalesce_window=0.02)
+    store = _subscribed_store(broker)
+    book_id = store.list_library()[0].id
+
+    async def main():
+        with broker.subscribe("public") as subscription:
+            since = store.get_lorebook_version(book_id)
+            first = store.add_entry(book_id, {"key": ["a"], "content": "A"}).entry.uid
+            second = store.add_entry(book_id, {"key": ["b"], "content": "B"}).entry.uid
+            store.delete_entry(book_id, first)
+            return since, first, second, await subscription.next(timeout=1)
+
+    since, first, second, frames = asyncio.run(main())
+    [(kind, data)] = _events(frames)
+    assert kind == "change"
+    assert data["since"] == since
+    assert [entry["uid"] for entry in data["upserted"]] == [second]
+    assert data["deleted"] == [first] and not data["reset"]
+    assert broker.events == 1
+
+
+def test_large_diffs_are_sent_as_resets():
+    broker = ChangeBroker(coalesce_window=0.01, max_entries=1)
+    store = _subscribed_store(broker)
+    book_id = store.list_library()[0].id
+
+    async def main():
+        with broker.subscribe("public") as subscription:
+            store.add_entry(book_id, {"key": ["x"]})
+            store.add_entry(book_id, {"key": ["y"]})
+            return await subscription.next(timeout=1)
+
+    [(kind, data)] = _events(asyncio.run(main()))
+    assert kind == "change" and data["reset"] and data["upserted"] == []
+
+
+def test_deleting_a_book_drops_its_pending_edits():
+    broker = ChangeBroker(coalesce_window=10)
+    store = _subscribed_store(broker)
+    book_id = store.list_library()[0].id
+
+    async def main():
+        with broker.subscribe("public") as subscription:
+            store.add_entry(book_id, {"key": ["a"]})
+            store.delete_lorebook(book_id)
+            return await subscription.next(timeout=1)
+
+    assert _events(asyncio.run(main())) == [("deleted", {"lorebookId": book_id})]
+
+
+def test_a_subscriber_that_falls_behind_is_told_to_resync():
+    broker = ChangeBroker(coalesce_window=0, queue_limit=2)
+    store = _subscribed_store(broker)
+
+    async def main():
+        with broker.subscribe("public") as subscription:
+            for n in range(3):
+                store.create_lorebook(f"Book {n}", [])
+            await asyncio.sleep(0)
+            return await subscription.next(timeout=1)
+
+    assert asyncio.run(main()) == RESYNC_FRAME
+    assert broker.resyncs == 1
+
+
+def test_edits_without_subscribers_publish_nothing():
+    broker = ChangeBroker(coalesce_window=0)
+    store = _subscribed_store(broker)
+    store.add_entry(store.list_library()[0].id, {"key": ["a"]})
+    assert broker.events == 0
+
+
+def test_stream_endpoint_sends_edits_until_disconnect():
+    app = create_app()
+    app.state.changes.coalesce_window = 0
+    store = app.state.store
+    book_id = store.list_library()[0].id
+    sent = []
+
+    async def main():
+        disconnected = asyncio.Event()
+        first_frame = asyncio.Event()
+
+        async def receive():
+            if not sent:
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if message["type"] == "http.response.body":
+                first_frame.set()
+                if b"event: change" in message["body"]:
+                    disconnected.set()
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": "/changes",
+            "raw_path": b"/changes", "root_path": "", "query_string": b"",
+            "headers": [], "client": ("test", 1), "server": ("test", 80),
+        }
+        stream = asyncio.ensure_future(app(scope, receive, send))
+        await asyncio.wait_for(first_frame.wait(), 5)
+        store.update_lorebook_name(book_id, "Renamed")
+        await asyncio.wait_for(stream, 5)
+
+    asyncio.run(main())
+    assert sent[0]["status"] == 200
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    assert body.startswith(b"retry: ")
+    [(kind, data)] = _events(body)
+    assert kind == "change" and data["lorebook"]["name"] == "Renamed"
+    app.state.tenants.close()
@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.services import discord
+from src.services.discord import DiscordClient
+
+
+@pytest.fixture(autouse=True)
+def _no_backoff(monkeypatch):
+    monkeypatch.setattr(discord, "BACKOFF_BASE", 0.0)
+
+
+def _client(*replies):
+    """A client whose transport plays back `replies` (responses or exceptions)."""
+    calls = []
+    pending = list(replies)
+
+    def handler(request):
+        calls.append(request.url.path)
+        reply = pending.pop(0)
+        if isinstance(reply, type) and issubclass(reply, Exception):
+            raise reply("failed", request=request)
+        status, body = reply
+        return httpx.Response(status, json=body)
+
+    client = DiscordClient(
+        client_id="id", client_secret="secret", transport=httpx.MockTransport(handler)
+    )
+    return client, calls
+
+
+def test_user_lookup_retries_server_errors():
+    client, calls = _client((503, {}), httpx.ReadError, (200, {"id": "1"}))
+    assert asyncio.run(client.get_user_info("token")) == {"id": "1"}
+    assert len(calls) == 3
+
+
+def test_token_exchange_is_not_repeated_after_it_may_have_been_sent():
+    for failure in ((502, {}), httpx.ReadTimeout, httpx.RemoteProtocolError):
+        client, calls = _client(failure, (200, {"access_token": "x"}))
+        with pytest.raises(httpx.HTTPError):
+            asyncio.run(client.exchange_code("single-use"))
+        assert calls == ["/api/v10/oauth2/token"]
+
+
+def test_token_exchange_retries_connection_failures():
+    client, calls = _client(httpx.ConnectError, (200, {"access_token": "x"}))
+    assert asyncio.run(client.exchange_code("code"))["access_token"] == "x"
+    assert len(calls) == 2
+
+
+def test_retries_give_up_after_max_retries():
+    client, calls = _client(*[(503, {})] * 5)
+    client.max_retries = 2
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(client.get_user_info("token"))
+    assert len(calls) == 3
@@ -0,0 +1,73 @@
+from src.models import LoreEntry
+from src.services.duplicates import signature, similarity
+
+TEXT = (
+    "Aldric the grey warden guards the northern pass of the Ember Mountains. "
+    "He carries a lantern that never goes out and speaks only in riddles to "
+    "travellers who seek the ruined temple beyond the frozen lake at dawn."
+)
+REWORDED = TEXT.replace("at dawn", "at dusk")
+OTHER = (
+    "The river market of Sallowmere opens at midnight. Merchants sell "
+    "bottled fog, clockwork birds and maps of cities that no longer exist, "
+    "and every coin spent there is said to return to its owner within a week."
+)
+
+
+def _entry(uid, content, key=("warden",)):
+    return LoreEntry(uid=uid, key=list(key), content=content)
+
+
+def test_signatures_estimate_overlap():
+    same = similarity(signature(_entry(1, TEXT)), signature(_entry(2, TEXT)))
+    close = similarity(signature(_entry(1, TEXT)), signature(_entry(2, REWORDED)))
+    far = similarity(signature(_entry(1, TEXT)), signature(_entry(2, OTHER, ["market"])))
+    assert same == 1.0
+    assert close >= 0.6
+    assert far < 0.3
+    assert signature(LoreEntry(uid=1)) is None
+
+
+def _book(client, *contents):
+    entries = [{"key": ["k"], "content": content} for content in contents]
+    return client.post("/lorebooks", json={"name": "Dupes", "entries": entries}).json()
+
+
+def test_book_report_clusters_reworded_entries(client):
+    book = _book(client, TEXT, REWORDED, OTHER)
+    report = client.get(f"/lorebooks/{book['id']}/duplicates", params={"threshold": 0.6})
+    assert report.status_code == 200
+    body = report.json()
+    assert body["entriesScanned"] == 3 and body["total"] == 1
+    [cluster] = body["clusters"]
+    uids = sorted(entry["uid"] for entry in cluster["entries"])
+    assert uids == sorted(entry["uid"] for entry in book["entries"][:2])
+    assert 0.6 <= cluster["similarity"] <= 1.0
+
+
+def test_index_follows_entry_edits(client):
+    book = _book(client, TEXT, OTHER)
+    url = f"/lorebooks/{book['id']}/duplicates"
+    assert client.get(url).json()["total"] == 0
+
+    # Built on the first report, then kept current entry by entry.
+    other = book["entries"][1]
+    client.put(
+        f"/lorebooks/{book['id']}/entries/{other['uid']}",
+        json={**other, "content": REWORDED},
+    )
+    assert client.get(url, params={"threshold": 0.6}).json()["total"] == 1
+    client.delete(f"/lorebooks/{book['id']}/entries/{other['uid']}")
+    assert client.get(url, params={"threshold": 0.6}).json()["total"] == 0
+
+
+def test_library_report_links_entries_across_books(client):
+    first = _book(client, TEXT)
+    second = _book(client, REWORDED, OTHER)
+    body = client.get("/lorebooks:duplicates", params={"threshold": 0.6}).json()
+    [cluster] = body["clusters"]
+    assert {entry["lorebookId"] for entry in cluster["entries"]} == {
+        first["id"],
+        second["id"],
+    }
+    assert client.get("/lorebooks:duplicates", params={"threshold": 0.3}).status_code == 422
@@ -0,0 +1,28 @@
+from src.utils import generate_entry_uid
+
+
+def test_generated_uids_are_strictly_increasing():
+    uids = [generate_entry_uid() for _ in range(5000)]
+    assert uids == sorted(set(uids))
+
+
+def test_bulk_created_entries_get_distinct_uids(store):
+    book = store.create_lorebook("Bulk", [{"comment": str(i)} for i in range(2000)])
+    assert len({entry.uid for entry in book.entries}) == 2000
+
+
+def test_clashing_incoming_uids_are_reminted(store):
+    book = store.create_lorebook("Clash", [{"uid": 7, "comment": "a"}, {"uid": 7, "comment": "b"}])
+    first, second = book.entries
+    assert first.uid == 7 and second.uid != 7
+
+    added = store.add_entry(book.id, {"uid": 7, "comment": "c"}).entry
+    assert added.uid not in (first.uid, second.uid)
+
+
+def test_edits_keep_entry_position(store):
+    book = store.create_lorebook("Order", [{"comment": c} for c in "abc"])
+    middle = book.entries[1].uid
+    store.update_entry(book.id, middle, {"comment": "B"})
+    store.delete_entry(book.id, book.entries[0].uid)
+    assert [entry.comment for entry in store.get_lorebook(book.id).entries] == ["B", "c"]
@@ -0,0 +1,53 @@
+import json
+
+from src.services.exporter import _st_entry
+from src.services.records import CompactEntry
+
+
+def _export(client, book_id, fmt):
+    response = client.get(f"/lorebooks/{book_id}/export", params={"format": fmt})
+    assert response.status_code == 200
+    return response.text
+
+
+def test_sillytavern_round_trip_keeps_disable(client):
+    book = client.post("/lorebooks", json={"name": "Round trip"}).json()
+    world_info = {"entries": {"0": {"comment": "off", "disable": True}, "1": {"comment": "on"}}}
+    client.post(f"/lorebooks/{book['id']}/import", json=world_info)
+
+    exported = _export(client, book["id"], "sillytavern")
+    assert exported.count('"disable"') == 2
+    entries = list(json.loads(exported)["entries"].values())
+    assert [(entry["disable"], entry["disabled"]) for entry in entries] == [(True, True), (False, False)]
+
+    again = client.post("/lorebooks", json={"name": "Again"}).json()
+    client.post(f"/lorebooks/{again['id']}/import", content=exported)
+    reimported = client.get(f"/lorebooks/{again['id']}").json()["entries"]
+    assert [entry["disabled"] for entry in reimported] == [True, False]
+
+
+def test_stale_disable_extra_is_overridden():
+    entry = CompactEntry.from_dict({"uid": 1, "disabled": False, "disable": True})
+    text = _st_entry(entry)
+    assert text.count('"disable"') == 1 and json.loads(text)["disable"] is False
+
+
+def test_formats_carry_every_entry(client):
+    entries = [{"comment": f"entry {i}", "content": "ü"} for i in range(300)]
+    book = client.post("/lorebooks", json={"name": "Big", "entries": entries}).json()
+
+    native = json.loads(_export(client, book["id"], "native"))
+    assert native["name"] == "Big" and len(native["entries"]) == 300
+    lines = _export(client, book["id"], "ndjson").splitlines()
+    assert [json.loads(line)["comment"] for line in lines] == [e["comment"] for e in entries]
+    assert len(json.loads(_export(client, book["id"], "sillytavern"))["entries"]) == 300
+
+
+def test_export_is_a_snapshot_of_metadata_and_entries(store):
+    book = store.create_lorebook("Before", [{"comment": "a"}])
+    chunks = store.export_lorebook(book.id, "native")
+    store.update_lorebook_name(book.id, "After")
+    store.add_entry(book.id, {"comment": "b"})
+    exported = json.loads("".join(chunks))
+    assert exported["name"] == "Before" and exported["version"] == book.version
+    assert [entry["comment"] for entry in exported["entries"]] == ["a"]
@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from src.models import EntryPayload
+from src.services import importer
+from src.services.importer import (
+    ImportFormatError,
+    JsonEntryParser,
+    NdjsonEntryParser,
+    stream_import,
+)
+from src.services.workers import WorkerPool
+
+
+def _parse(parser, text, step):
+    entries = []
+    for start in range(0, len(text), step):
+        entries.extend(parser.feed(text[start : start + step]))
+    return entries + parser.close()
+
+
+@pytest.mark.parametrize("step", [1, 7, 10_000])
+def test_json_parser_handles_every_layout_in_any_chunking(step):
+    sillytavern = json.dumps({"entries": {"0": {"comment": "a"}, "1": {"comment": "b"}}, "name": "ST"})
+    native = json.dumps({"name": "Native", "entries": [{"comment": "a"}, {"comment": "b"}]})
+    bare = json.dumps([{"comment": "a"}, 3, {"comment": "b"}])
+    for text in (sillytavern, native, bare):
+        parser = JsonEntryParser()
+        assert [entry["comment"] for entry in _parse(parser, text, step)] == ["a", "b"]
+    parser = JsonEntryParser()
+    _parse(parser, sillytavern, step)
+    assert parser.meta == {"name": "ST"}
+
+
+def test_json_parser_rejects_truncated_documents():
+    parser = JsonEntryParser()
+    parser.feed('{"entries": [{"comment": "a"}')
+    with pytest.raises(ImportFormatError):
+        parser.close()
+
+
+def test_ndjson_parser_skips_blank_lines_and_rejects_bad_ones():
+    parser = NdjsonEntryParser()
+    assert [entry["comment"] for entry in _parse(parser, '{"comment":"a"}\n\n{"comment":"b"}', 3)] == [
+        "a",
+        "b",
+    ]
+    with pytest.raises(ImportFormatError):
+        NdjsonEntryParser().feed("{oops\n")
+
+
+async def _chunks(*parts, between=None):
+    for index, part in enumerate(parts):
+        if index and between is not None:
+            between()
+        yield part.encode()
+
+
+def _import(store, book_id, *parts, between=None, fmt="json", workers=None):
+    return asyncio.run(
+        stream_import(
+            store, book_id, _chunks(*parts, between=between), fmt, workers or WorkerPool(threads=0)
+        )
+    )
+
+
+def test_sillytavern_disable_becomes_disabled(store):
+    book = store.create_lorebook("ST", [])
+    body = {"entries": {"0": {"comment": "off", "disable": True}, "1": {"comment": "on", "disable": False}}}
+    progress = _import(store, book.id, json.dumps(body))
+
+    assert progress.status == "done" and progress.entriesImported == 2
+    entries = store.get_lorebook(book.id).entries
+    assert [entry.disabled for entry in entries] == [True, False]
+    assert all("disable" not in entry.model_dump() for entry in entries)
+
+
+def test_disable_in_coerced_and_payload_entries(store):
+    book = store.create_lorebook("Mixed", [{"comment": "x", "key": {"0": "k"}, "disable": True}])
+    assert book.entries[0].disabled is True
+    updated = store.update_entry(book.id, book.entries[0].uid, EntryPayload(disable=False)).entry
+    assert updated.disabled is False and "disable" not in updated.model_dump()
+    # An explicit `disabled` wins over SillyTavern's spelling.
+    added = store.add_entry(book.id, {"disabled": False, "disable": True}).entry
+    assert added.disabled is False
+
+
+def test_bad_format_marks_import_failed(store):
+    book = store.create_lorebook("Bad", [])
+    with pytest.raises(ImportFormatError):
+        _import(store, book.id, '{"entries": [{"comment": "a"}')
+    progress = store.get_import(book.id)
+    assert progress.status == "failed" and progress.finished
+
+
+def test_deleted_book_marks_import_failed(store, monkeypatch):
+    monkeypatch.setattr(importer, "IMPORT_BATCH_SIZE", 1)
+    book = store.create_lorebook("Doomed", [])
+    seen = []
+
+    def delete_book():
+        seen.append(store.get_import(book.id))
+        store.delete_lorebook(book.id)
+
+    with pytest.raises(HTTPException):
+        _import(store, book.id, '[{"comment": "a"},', '{"comment": "b"}]', between=delete_book)
+    (progress,) = seen
+    assert (progress.status, progress.error) == ("failed", "Lorebook not found")
+    assert progress.entriesImported == 1
+
+
+def test_worker_failure_marks_import_failed(store):
+    class BrokenPool(WorkerPool):
+        async def run_cpu(self, fn, *args):
+            raise RuntimeError("pool is gone")
+
+    book = store.create_lorebook("Broken", [])
+    with pytest.raises(RuntimeError):
+        _import(store, book.id, '[{"comment": "a"}]', workers=BrokenPool(threads=0))
+    progress = store.get_import(book.id)
+    assert (progress.status, progress.error) == ("failed", "pool is gone")
+
+
+def test_import_endpoint(client):
+    book = client.post("/lorebooks", json={"name": "Target"}).json()
+    response = client.post(
+        f"/lorebooks/{book['id']}/import",
+        content='{"comment": "a"}\n{"comment": "b"}\n',
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200 and response.json()["entriesImported"] == 2
+    assert client.get(f"/lorebooks/{book['id']}/import").json()["status"] == "done"
+
+    bad = client.post(f"/lorebooks/{book['id']}/import", content="{nope")
+    assert bad.status_code == 400
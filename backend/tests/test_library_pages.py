@@ -0,0 +1,65 @@
+import pytest
+
+NAMES = ["alpha", "Beta", "gamma", "Alphabet", "delta", "ALPS", "epsilon"]
+
+
+@pytest.fixture
+def library(client):
+    for name in NAMES:
+        client.post("/lorebooks", json={"name": name})
+    return client
+
+
+def _walk(client, **params):
+    books, cursor = [], None
+    while True:
+        query = {**params, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/lorebooks", params=query)
+        assert response.status_code == 200
+        books.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return books
+
+
+@pytest.mark.parametrize(
+    "sort,direction", [("lastEdited", "desc"), ("lastEdited", "asc"), ("name", "asc"),
+                       ("name", "desc")]
+)
+def test_pages_match_the_unpaged_listing(library, sort, direction):
+    params = {"sort": sort, "direction": direction}
+    everything = library.get("/lorebooks", params=params).json()
+    assert len(everything) == len(NAMES) + 1  # plus the starter book
+    assert _walk(library, limit=3, **params) == everything
+
+    if sort == "name":
+        keys = [(book["name"].casefold(), book["id"]) for book in everything]
+    else:
+        keys = [(book["lastEdited"], book["id"]) for book in everything]
+    assert keys == sorted(keys, reverse=direction == "desc")
+
+
+def test_default_listing_is_the_cached_full_library(library):
+    assert library.get("/lorebooks").json() == _walk(library, limit=2)
+
+
+def test_prefix_ignores_case(library):
+    books = _walk(library, prefix="alp", sort="name", limit=2)
+    assert [book["name"] for book in books] == ["alpha", "Alphabet", "ALPS"]
+    edited = _walk(library, prefix="ALP", limit=1)
+    assert sorted(book["name"] for book in edited) == ["ALPS", "Alphabet", "alpha"]
+
+
+def test_edits_between_pages_never_repeat_a_book(library):
+    first = library.get("/lorebooks", params={"limit": 3})
+    seen = [book["id"] for book in first.json()]
+    # Editing a book already served moves it to the front, behind the cursor.
+    library.patch(f"/lorebooks/{seen[-1]}", json={"name": "edited"})
+    rest = _walk(library, limit=3, cursor=first.headers["X-Next-Cursor"])
+    ids = seen + [book["id"] for book in rest]
+    assert len(ids) == len(set(ids)) == len(NAMES) + 1
+
+
+def test_bad_cursor_is_rejected(library):
+    assert library.get("/lorebooks", params={"cursor": "nonsense"}).status_code == 400
+    assert library.get("/lorebooks", params={"limit": 0}).status_code == 422
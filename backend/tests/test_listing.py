@@ -0,0 +1,56 @@
+def _book(client, count):
+    entries = [{"comment": str(i), "order": i % 4} for i in range(count)]
+    return client.post("/lorebooks", json={"name": "List", "entries": entries}).json()
+
+
+def _walk(client, book_id, **params):
+    items, cursor = [], None
+    while True:
+        query = {**params, **({"cursor": cursor} if cursor else {})}
+        page = client.get(f"/lorebooks/{book_id}/entries", params=query).json()
+        items.extend(page["items"])
+        cursor = page["nextCursor"]
+        if cursor is None:
+            return items, page["total"]
+
+
+def test_pages_cover_every_entry_once_in_order(client):
+    book = _book(client, 25)
+    items, total = _walk(client, book["id"], limit=7)
+    assert total == 25
+    assert [item["uid"] for item in items] == sorted(entry["uid"] for entry in book["entries"])
+
+    items, _ = _walk(client, book["id"], limit=4, sort="order", direction="desc")
+    keys = [(item["order"], item["uid"]) for item in items]
+    assert keys == sorted(keys, reverse=True) and len(keys) == 25
+
+
+def test_cursor_stays_valid_while_the_book_changes(client):
+    book = _book(client, 10)
+    uids = [entry["uid"] for entry in book["entries"]]
+    first = client.get(f"/lorebooks/{book['id']}/entries", params={"limit": 5}).json()
+
+    # Drop an entry already served and one still ahead of the cursor.
+    client.delete(f"/lorebooks/{book['id']}/entries/{uids[0]}")
+    client.delete(f"/lorebooks/{book['id']}/entries/{uids[7]}")
+    rest = client.get(
+        f"/lorebooks/{book['id']}/entries", params={"limit": 5, "cursor": first["nextCursor"]}
+    ).json()
+    assert [item["uid"] for item in rest["items"]] == uids[5:7] + uids[8:]
+    assert rest["nextCursor"] is None
+
+
+def test_field_projection(client):
+    book = _book(client, 2)
+    page = client.get(
+        f"/lorebooks/{book['id']}/entries", params={"fields": "comment, order"}
+    ).json()
+    assert set(page["items"][0]) == {"uid", "comment", "order"}
+
+
+def test_bad_requests(client):
+    book = _book(client, 2)
+    url = f"/lorebooks/{book['id']}/entries"
+    assert client.get(url, params={"cursor": "!!"}).status_code == 400
+    assert client.get(url, params={"fields": "nope"}).status_code == 400
+    assert client.get(url, params={"sort": "comment"}).status_code == 422
@@ -0,0 +1,49 @@
+import sys
+import threading
+
+from src.services import metrics
+from src.services.metrics import Counter, Histogram
+
+
+def _hammer(record, threads=8, calls=5000):
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        workers = [
+            threading.Thread(target=lambda: [record() for _ in range(calls)])
+            for _ in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        sys.setswitchinterval(interval)
+    return threads * calls
+
+
+def test_counter_loses_no_increments_across_threads():
+    counter = Counter("test_total", "Test.", ("route",))
+    expected = _hammer(lambda: counter.inc("/x"))
+    assert counter.value("/x") == expected
+
+
+def test_histogram_loses_no_observations_across_threads():
+    histogram = Histogram("test_seconds", "Test.")
+    expected = _hammer(lambda: histogram.observe(0.001))
+    assert histogram.count() == expected
+    assert f"test_seconds_count {expected}" in histogram.render()
+
+
+def test_admission_rejections_carry_the_route_template(client):
+    book_id = client.get("/lorebooks").json()[0]["id"]
+    route = "/lorebooks/{lorebook_id}/export"
+    before = metrics.HTTP_REQUESTS.value("GET", route, "503")
+    heavy = client.app.state.admission.heavy
+    heavy.limit, heavy.queue, heavy.active = 1, 0, 1
+    try:
+        response = client.get(f"/lorebooks/{book_id}/export")
+    finally:
+        heavy.active = 0
+    assert response.status_code == 503
+    assert metrics.HTTP_REQUESTS.value("GET", route, "503") == before + 1
@@ -0,0 +1,43 @@
+import pytest
+
+from src.models import EntryPayload, LoreEntry
+from src.services.normalize import normalize_entries, normalize_entry
+
+# Strictly valid as they stand, then ones needing coercion or fixing up.
+ENTRIES = [
+    {"uid": 7, "key": ["dragon"], "content": "Big.", "order": 3},
+    {"key": ["temple"], "keysecondary": ["old"], "selective": True},
+    {"key": {"0": "wyrm"}, "content": "Keywords as an object."},
+    {"key": ["scroll"], "order": "12"},
+    {"key": ["mask"], "disable": True},
+    {"key": ["ward"], "customField": 1},
+    EntryPayload(key=["payload"], content="From a model."),
+    LoreEntry(uid=9, key=["model"], content="Already an entry."),
+]
+
+
+def _comparable(entries):
+    return [entry.model_dump(exclude={"uid"}) for entry in entries]
+
+
+def test_batch_matches_entry_by_entry_normalization():
+    batched, skipped = normalize_entries(list(ENTRIES))
+    assert skipped == 0
+    assert _comparable(batched) == _comparable([normalize_entry(e) for e in ENTRIES])
+    assert all(type(entry) is LoreEntry and entry.uid for entry in batched)
+    assert batched[0].uid == 7 and batched[-1].uid == 9
+    assert batched[3].order == 12
+    assert batched[4].disabled is True and "disable" not in batched[4].model_extra
+
+
+def test_invalid_entries_are_skipped_or_raised():
+    entries = [{"key": ["fine"]}, {"order": "not a number"}]
+    normalized, skipped = normalize_entries(entries)
+    assert skipped == 1 and [entry.key for entry in normalized] == [["fine"]]
+    with pytest.raises(ValueError):
+        normalize_entries(entries, skip_invalid=False)
+
+
+def test_missing_uids_are_unique():
+    normalized, _ = normalize_entries([{"key": [str(n)]} for n in range(50)])
+    assert len({entry.uid for entry in normalized}) == 50
@@ -0,0 +1,49 @@
+import json
+import pstats
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import create_app
+
+
+@pytest.fixture
+def profiled(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOREMASTER_PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("LOREMASTER_PROFILE_SECRET", "let-me-in")
+    with TestClient(create_app()) as client:
+        yield client, tmp_path
+
+
+def test_header_with_the_secret_writes_a_profile(profiled):
+    client, directory = profiled
+    book_id = client.get("/lorebooks").json()[0]["id"]
+    response = client.get(
+        f"/lorebooks/{book_id}", headers={"X-Loremaster-Profile": "let-me-in"}
+    )
+    assert response.status_code == 200
+    profile_id = response.headers["X-Loremaster-Profile-Id"]
+
+    tags = json.loads((directory / f"{profile_id}.json").read_text())
+    assert tags["route"] == "/lorebooks/{lorebook_id}"
+    assert tags["status"] == 200
+    assert tags["trigger"] == "header"
+    assert tags["bookId"] == book_id
+    assert tags["entries"] >= 1
+    pstats.Stats(str(directory / f"{profile_id}.pstats"))
+    speedscope = json.loads((directory / f"{profile_id}.speedscope.json").read_text())
+    assert speedscope["profiles"]
+
+
+def test_requests_without_the_secret_are_not_profiled(profiled):
+    client, directory = profiled
+    plain = client.get("/health")
+    wrong = client.get("/health", headers={"X-Loremaster-Profile": "guess"})
+    assert "X-Loremaster-Profile-Id" not in plain.headers
+    assert "X-Loremaster-Profile-Id" not in wrong.headers
+    assert not list(directory.iterdir())
+
+
+def test_profiling_is_off_without_a_directory(client):
+    response = client.get("/health", headers={"X-Loremaster-Profile": "let-me-in"})
+    assert "X-Loremaster-Profile-Id" not in response.headers
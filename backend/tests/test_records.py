@@ -0,0 +1,36 @@
+from src.models import LoreEntry
+from src.services.records import CompactEntry
+
+
+def test_compact_entry_round_trips_a_lore_entry():
+    entry = LoreEntry(
+        uid=5,
+        comment="c",
+        content="text",
+        key=["a", "b"],
+        order=7,
+        constant=True,
+        characterFilter={"names": ["x"]},
+        extension_prompt="kept",
+    )
+    compact = CompactEntry.from_model(entry)
+    assert compact.to_model().model_dump() == entry.model_dump()
+    assert compact.to_dict() == entry.model_dump()
+    assert list(compact.to_dict()) == list(entry.model_dump())
+
+
+def test_only_non_default_fields_are_stored():
+    compact = CompactEntry.from_model(LoreEntry(uid=1, order=7))
+    assert compact._fields == {"order": 7}
+    assert CompactEntry.from_model(LoreEntry(uid=2))._fields is None
+
+
+def test_defaults_are_not_shared_between_entries():
+    first, second = (CompactEntry.from_model(LoreEntry(uid=uid)) for uid in (1, 2))
+    first.characterFilter["names"] = ["x"]
+    assert second.characterFilter == {}
+
+
+def test_projection_keeps_field_order():
+    compact = CompactEntry.from_model(LoreEntry(uid=1, comment="c", order=3))
+    assert compact.to_dict({"order", "uid", "comment"}) == {"uid": 1, "comment": "c", "order": 3}
@@ -0,0 +1,139 @@
+import json
+import threading
+from contextlib import contextmanager
+
+from src.services.records import BookRecord, LibraryIndex
+
+
+def _names(body):
+    return [meta["name"] for meta in json.loads(body)]
+
+
+def test_cached_book_body_follows_edits(store):
+    book = store.create_lorebook("Cached", [{"comment": "a"}])
+    version, body = store.get_lorebook_json(book.id)
+    assert version == store.get_lorebook_version(book.id)
+    assert store.cached_lorebook_json(book.id) == (version, body)
+    store.update_entry(book.id, book.entries[0].uid, {"comment": "b"})
+    assert store.cached_lorebook_json(book.id) is None
+    version, body = store.get_lorebook_json(book.id)
+    assert version == store.get_lorebook_version(book.id)
+    assert json.loads(body)["entries"][0]["comment"] == "b"
+
+
+def test_book_body_is_never_older_than_its_version(store, monkeypatch):
+    book = store.create_lorebook("Cached", [{"comment": "a"}])
+    store.get_lorebook_json(book.id)
+    entered, resume = threading.Event(), threading.Event()
+    log_changes = BookRecord.log_changes
+
+    def paused_log_changes(record, version):
+        entered.set()
+        resume.wait(5)
+        log_changes(record, version)
+
+    # Hold an edit just after its version bump.
+    monkeypatch.setattr(BookRecord, "log_changes", paused_log_changes)
+    writer = threading.Thread(
+        target=store.update_entry, args=(book.id, book.entries[0].uid, {"comment": "b"})
+    )
+    writer.start()
+    try:
+        assert entered.wait(5)
+        assert store.cached_lorebook_json(book.id) is None
+    finally:
+        resume.set()
+        writer.join()
+
+    version, body = store.get_lorebook_json(book.id)
+    assert json.loads(body)["version"] == version
+
+
+def test_book_route_tags_the_body_with_its_version(client):
+    book = client.post("/lorebooks", json={"name": "Tagged"}).json()
+    first = client.get(f"/lorebooks/{book['id']}")
+    assert first.headers["etag"] == f'"v{first.json()["version"]}"'
+    client.patch(f"/lorebooks/{book['id']}", json={"name": "Renamed"})
+    second = client.get(
+        f"/lorebooks/{book['id']}", headers={"If-None-Match": first.headers["etag"]}
+    )
+    assert second.status_code == 200 and second.json()["name"] == "Renamed"
+    assert second.headers["etag"] == f'"v{second.json()["version"]}"'
+
+
+@contextmanager
+def _creation_paused_mid_edit(store, monkeypatch, name):
+    """Hold a book creation between its version bump and its index update."""
+    entered, resume = threading.Event(), threading.Event()
+    put = LibraryIndex.put
+
+    def paused_put(index, book):
+        if book.name == name:
+            entered.set()
+            resume.wait(5)
+        put(index, book)
+
+    monkeypatch.setattr(LibraryIndex, "put", paused_put)
+    writer = threading.Thread(target=store.create_lorebook, args=(name, []))
+    writer.start()
+    try:
+        assert entered.wait(5)
+        yield
+    finally:
+        resume.set()
+        writer.join()
+
+
+def test_library_body_is_never_newer_than_its_version(store, monkeypatch):
+    version, body = store.list_library_json()
+    assert version == store.library_version
+
+    with _creation_paused_mid_edit(store, monkeypatch, "Newer"):
+        assert store.library_version > version
+        assert store.try_list_library_json() == (version, body)
+
+    latest, body = store.try_list_library_json()
+    assert latest == store.library_version and "Newer" in _names(body)
+
+
+def test_no_cached_copy_during_an_edit_means_waiting(store, monkeypatch):
+    with _creation_paused_mid_edit(store, monkeypatch, "Newer"):
+        assert store.try_list_library_json() is None
+    assert "Newer" in _names(store.list_library_json()[1])
+
+
+def test_library_route_tags_the_body_with_its_version(client):
+    response = client.get("/lorebooks")
+    store = client.app.state.store
+    assert response.headers["etag"] == f'"v{store.library_version}"'
+    client.post("/lorebooks", json={"name": "Another"})
+    response = client.get("/lorebooks")
+    assert "Another" in _names(response.content)
+    assert response.headers["etag"] == f'"v{store.library_version}"'
+
+
+def test_library_page_is_read_with_its_version(store, monkeypatch):
+    version, body, _ = store.list_library_page_json(limit=10)
+    assert version == store.library_version
+
+    with _creation_paused_mid_edit(store, monkeypatch, "Newer"):
+        assert store.list_library_page_json(limit=10, blocking=False) is None
+
+    latest, body, _ = store.list_library_page_json(limit=10, blocking=False)
+    assert latest == store.library_version and "Newer" in _names(body)
+
+
+def test_paged_library_route_tags_the_page_with_its_version(client):
+    client.post("/lorebooks", json={"name": "Paged"})
+    response = client.get("/lorebooks", params={"limit": 5})
+    assert "Paged" in _names(response.content)
+    assert response.headers["etag"] == f'"v{client.app.state.store.library_version}"'
+
+
+def test_tagged_responses_vary_by_credentials(client):
+    book = client.post("/lorebooks", json={"name": "Shared"}).json()
+    for path in ("/lorebooks", "/lorebooks?limit=5", f"/lorebooks/{book['id']}"):
+        response = client.get(path)
+        assert response.headers["vary"] == "Authorization"
+        cached = client.get(path, headers={"If-None-Match": response.headers["etag"]})
+        assert cached.status_code == 304 and cached.headers["vary"] == "Authorization"
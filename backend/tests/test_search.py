@@ -0,0 +1,45 @@
+from src.models import LoreEntry
+from src.services.search import SearchIndex
+
+
+def _ids(store, book_id, query, **page):
+    return [hit.entry.comment for hit in store.search(book_id, query, **page).results]
+
+
+def test_keyword_hits_outrank_body_hits(store):
+    book = store.create_lorebook(
+        "Search",
+        [
+            {"comment": "Body", "content": "the dragon sleeps"},
+            {"comment": "Keyed", "key": ["dragon"], "content": "a beast"},
+            {"comment": "Other", "content": "nothing here"},
+        ],
+    )
+    assert _ids(store, book.id, "dragon") == ["Keyed", "Body"]
+
+
+def test_every_token_must_match_with_prefixes(store):
+    book = store.create_lorebook(
+        "Search",
+        [{"comment": "A", "content": "red dragon"}, {"comment": "B", "content": "blue dragon"}],
+    )
+    assert _ids(store, book.id, "drag re") == ["A"]
+    assert _ids(store, book.id, "dragon green") == []
+
+
+def test_index_follows_edits(store):
+    book = store.create_lorebook("Search", [{"comment": "A", "content": "apples"}])
+    uid = book.entries[0].uid
+    assert _ids(store, book.id, "apples") == ["A"]
+
+    store.update_entry(book.id, uid, {"comment": "A", "content": "pears"})
+    store.add_entry(book.id, {"comment": "B", "content": "apples"})
+    assert _ids(store, book.id, "apples") == ["B"]
+    store.delete_entry(book.id, uid)
+    assert _ids(store, book.id, "pears") == []
+
+
+def test_pagination_reports_total():
+    index = SearchIndex(LoreEntry(uid=i + 1, content="common") for i in range(30))
+    total, page = index.search("common", offset=25, limit=10)
+    assert total == 30 and len(page) == 5
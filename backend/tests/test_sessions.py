@@ -0,0 +1,82 @@
+import pytest
+
+from src.services.sessions import (
+    SessionError,
+    SessionManager,
+    SessionUser,
+    SQLiteRefreshFamilies,
+)
+
+USER = SessionUser("1", "ada")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def sessions(request, tmp_path):
+    families = None
+    if request.param == "sqlite":
+        families = SQLiteRefreshFamilies(str(tmp_path / "sessions.sqlite3"))
+    manager = SessionManager(b"secret", families=families)
+    yield manager
+    manager.close()
+
+
+def test_access_token_round_trip(sessions):
+    tokens = sessions.issue(USER)
+    assert sessions.verify(tokens.access_token) == USER
+    with pytest.raises(SessionError):
+        sessions.verify(tokens.refresh_token)
+
+
+def test_refresh_rotates_the_refresh_token(sessions):
+    first = sessions.issue(USER)
+    user, second = sessions.refresh(first.refresh_token)
+    assert user == USER
+    _, third = sessions.refresh(second.refresh_token)
+    assert sessions.verify(third.access_token) == USER
+
+
+def test_reused_refresh_token_revokes_the_family(sessions):
+    first = sessions.issue(USER)
+    _, second = sessions.refresh(first.refresh_token)
+    with pytest.raises(SessionError):
+        sessions.refresh(first.refresh_token)
+    # The legitimate holder's newer token is revoked along with it.
+    with pytest.raises(SessionError):
+        sessions.refresh(second.refresh_token)
+
+
+def test_reuse_leaves_other_logins_alone(sessions):
+    stolen = sessions.issue(USER)
+    other = sessions.issue(USER)
+    sessions.refresh(stolen.refresh_token)
+    with pytest.raises(SessionError):
+        sessions.refresh(stolen.refresh_token)
+    sessions.refresh(other.refresh_token)
+
+
+def test_rotation_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    a = SessionManager(b"secret", families=SQLiteRefreshFamilies(path))
+    b = SessionManager(b"secret", families=SQLiteRefreshFamilies(path))
+    try:
+        first = a.issue(USER)
+        b.refresh(first.refresh_token)
+        with pytest.raises(SessionError):
+            a.refresh(first.refresh_token)
+    finally:
+        a.close()
+        b.close()
+
+
+def test_refresh_endpoint_rejects_reuse(client):
+    tokens = client.app.state.sessions.issue(USER)
+    body = {"refresh_token": tokens.refresh_token}
+    assert client.post("/auth/refresh", json=body).status_code == 200
+    assert client.post("/auth/refresh", json=body).status_code == 401
+
+
+@pytest.mark.parametrize("secret", ["change_me", "a_long_random_string", "short"])
+def test_weak_or_placeholder_secret_is_refused(monkeypatch, secret):
+    monkeypatch.setenv("LOREMASTER_SESSION_SECRET", secret)
+    with pytest.raises(ValueError):
+        SessionManager.from_env()
@@ -0,0 +1,75 @@
+"""Two stores on one SQLite file stand in for two uvicorn worker processes."""
+
+import pytest
+
+from src.services.storage import SQLiteStorage
+from src.services.store import LorebookStore
+
+
+@pytest.fixture
+def pair(tmp_path):
+    path = str(tmp_path / "shared.db")
+    first = LorebookStore(storage=SQLiteStorage(path))
+    second = LorebookStore(storage=SQLiteStorage(path))
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_only_one_worker_seeds_the_database(pair):
+    first, second = pair
+    assert first.book_count == second.book_count == 1
+
+
+def test_writes_show_up_in_the_other_worker_after_sync(pair):
+    first, second = pair
+    book = first.create_lorebook("Shared", [{"comment": "a"}])
+    second.sync()
+    assert second.get_lorebook(book.id).entries[0].comment == "a"
+
+    second.update_entry(book.id, book.entries[0].uid, {"comment": "b"})
+    first.sync()
+    assert first.get_lorebook(book.id).entries[0].comment == "b"
+    assert first.get_lorebook_version(book.id) == second.get_lorebook_version(book.id)
+
+    first.delete_lorebook(book.id)
+    second.sync()
+    assert book.id not in [meta.id for meta in second.list_library()]
+
+
+def test_writes_start_from_the_latest_shared_state(pair):
+    first, second = pair
+    book = first.create_lorebook("Shared", [])
+    # Neither store syncs explicitly: every mutation syncs under the write lock.
+    first.add_entry(book.id, {"comment": "from first"})
+    second.add_entry(book.id, {"comment": "from second"})
+    first.sync()
+    comments = [entry.comment for entry in first.get_lorebook(book.id).entries]
+    assert comments == ["from first", "from second"]
+
+
+def test_versions_keep_increasing_across_workers(pair):
+    first, second = pair
+    book = first.create_lorebook("Shared", [])
+    before = first.get_lorebook_version(book.id)
+    second.update_lorebook_name(book.id, "Renamed")
+    first.sync()
+    assert first.get_lorebook_version(book.id) > before
+    assert first.library_version == second.library_version
+
+
+def test_try_sync_leaves_reloading_to_sync(pair, monkeypatch):
+    first, second = pair
+    assert second.try_sync()
+    book = first.create_lorebook("Shared", [{"comment": "a"}])
+
+    def no_loading(book_id):
+        raise AssertionError("try_sync loaded a book")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(second._storage, "load_book", no_loading)
+        assert not second.try_sync()
+        assert not second.try_sync()  # still pending, not forgotten
+    second.sync()
+    assert second.get_lorebook(book.id).entries[0].comment == "a"
+    assert second.try_sync()
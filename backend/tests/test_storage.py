@@ -0,0 +1,48 @@
+from src.services.storage import SQLiteStorage
+from src.services.store import LorebookStore
+
+
+def _open(path):
+    return LorebookStore(storage=SQLiteStorage(str(path)))
+
+
+def test_sqlite_store_survives_restart(tmp_path):
+    path = tmp_path / "library.db"
+    store = _open(path)
+    book = store.create_lorebook("Persisted", [{"comment": "a", "key": ["x"]}])
+    uid = book.entries[0].uid
+    store.update_entry(book.id, uid, {"comment": "b", "key": ["y"]})
+    store.add_entry(book.id, {"comment": "c"})
+    store.set_active(book.id)
+    store.close()
+
+    reopened = _open(path)
+    loaded = reopened.get_lorebook(book.id)
+    assert [entry.comment for entry in loaded.entries] == ["b", "c"]
+    assert loaded.entries[0].key == ["y"]
+    assert loaded.version == reopened.get_lorebook_version(book.id)
+    assert reopened.active_id == book.id
+    reopened.close()
+
+
+def test_deletes_are_persisted(tmp_path):
+    path = tmp_path / "library.db"
+    store = _open(path)
+    book = store.create_lorebook("Doomed", [{"comment": "a"}, {"comment": "b"}])
+    store.delete_entry(book.id, book.entries[0].uid)
+    kept = store.create_lorebook("Kept", [])
+    store.delete_lorebook(book.id)
+    store.close()
+
+    reopened = _open(path)
+    ids = [meta.id for meta in reopened.list_library()]
+    assert book.id not in ids and kept.id in ids
+    reopened.close()
+
+
+def test_empty_database_is_seeded_once(tmp_path):
+    path = tmp_path / "library.db"
+    _open(path).close()
+    store = _open(path)
+    assert [meta.name for meta in store.list_library()] == ["Starter Lorebook"]
+    store.close()
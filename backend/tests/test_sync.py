@@ -0,0 +1,66 @@
+from src.services import records
+
+
+def _book(client, count=2):
+    return client.post(
+        "/lorebooks", json={"name": "Sync", "entries": [{"comment": str(i)} for i in range(count)]}
+    ).json()
+
+
+def test_etags_answer_304_until_the_book_changes(client):
+    book = _book(client)
+    url = f"/lorebooks/{book['id']}"
+    first = client.get(url)
+    etag = first.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": f"W/{etag}, \"v0\""}).status_code == 304
+
+    client.patch(url, json={"name": "Renamed"})
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json()["name"] == "Renamed"
+    assert changed.headers["etag"] != etag
+
+
+def test_library_etag_moves_with_any_book(client):
+    library = client.get("/lorebooks")
+    etag = library.headers["etag"]
+    assert client.get("/lorebooks", headers={"If-None-Match": etag}).status_code == 304
+    _book(client)
+    assert client.get("/lorebooks", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_changes_since_lists_upserts_and_deletes(client):
+    book = _book(client)
+    first, second = (entry["uid"] for entry in book["entries"])
+    since = book["version"]
+
+    client.put(f"/lorebooks/{book['id']}/entries/{first}", json={"comment": "edited"})
+    client.delete(f"/lorebooks/{book['id']}/entries/{second}")
+    added = client.post(f"/lorebooks/{book['id']}/entries", json={"comment": "new"}).json()
+
+    changes = client.get(f"/lorebooks/{book['id']}/changes", params={"since": since}).json()
+    assert not changes["reset"]
+    assert {entry["uid"]: entry["comment"] for entry in changes["upserted"]} == {
+        first: "edited",
+        added["entry"]["uid"]: "new",
+    }
+    assert changes["deleted"] == [second]
+    assert changes["lorebook"]["version"] == added["lorebook"]["version"]
+
+    latest = client.get(
+        f"/lorebooks/{book['id']}/changes", params={"since": changes["lorebook"]["version"]}
+    ).json()
+    assert (latest["upserted"], latest["deleted"], latest["reset"]) == ([], [], False)
+
+
+def test_changes_reset_when_the_log_is_too_short(client, monkeypatch):
+    monkeypatch.setattr(records, "CHANGELOG_LIMIT", 3)
+    book = _book(client, count=1)
+    uid = book["entries"][0]["uid"]
+    for index in range(5):
+        client.put(f"/lorebooks/{book['id']}/entries/{uid}", json={"comment": str(index)})
+
+    stale = client.get(f"/lorebooks/{book['id']}/changes", params={"since": book["version"]})
+    assert stale.json()["reset"] is True
+    future = client.get(f"/lorebooks/{book['id']}/changes", params={"since": 10**9})
+    assert future.json()["reset"] is True
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.services.sessions import SessionUser
+from src.services.tenants import TenantRegistry, tenant_for
+from src.services.workers import WorkerPool
+
+
+@pytest.fixture
+def workers():
+    pool = WorkerPool(threads=2)
+    yield pool
+    pool.close()
+
+
+def _counting_builds(monkeypatch):
+    """Record the thread of every tenant load."""
+    threads = []
+    build = TenantRegistry._build
+
+    def counted(self, tenant):
+        threads.append(threading.current_thread())
+        return build(self, tenant)
+
+    monkeypatch.setattr(TenantRegistry, "_build", counted)
+    return threads
+
+
+def test_tenant_loads_off_the_event_loop_once(tmp_path, monkeypatch, workers):
+    registry = TenantRegistry(data_dir=str(tmp_path))
+    threads = _counting_builds(monkeypatch)
+    tenant = tenant_for("42")
+
+    async def borrow():
+        async with registry.checkout(tenant, workers) as store:
+            await asyncio.sleep(0)
+            return store
+
+    async def main():
+        return await asyncio.gather(*(borrow() for _ in range(8)))
+
+    stores = asyncio.run(main())
+    assert len({id(store) for store in stores}) == 1
+    assert len(threads) == 1 and threads[0] is not threading.main_thread()
+    assert registry.loads == 2  # public tenant plus this one
+    registry.close()
+
+
+def test_failed_load_is_retried_by_the_next_request(tmp_path, monkeypatch, workers):
+    registry = TenantRegistry(data_dir=str(tmp_path))
+    build = TenantRegistry._build
+    failures = [OSError("disk")]
+
+    def flaky(self, tenant):
+        if failures:
+            raise failures.pop()
+        return build(self, tenant)
+
+    monkeypatch.setattr(TenantRegistry, "_build", flaky)
+
+    async def borrow():
+        async with registry.checkout("user-1", workers) as store:
+            return store
+
+    with pytest.raises(OSError):
+        asyncio.run(borrow())
+    assert asyncio.run(borrow()) is not None
+    registry.close()
+
+
+def test_tenant_loading_for_a_request_is_not_evicted(tmp_path, workers):
+    registry = TenantRegistry(data_dir=str(tmp_path), memory_budget=0)
+
+    async def main():
+        async with registry.checkout("user-1", workers) as first:
+            # Another request finishing enforces the (exceeded) budget.
+            async with registry.checkout("user-2", workers):
+                pass
+            assert registry.metrics()["tenants"] == 2
+            first.list_library()
+
+    asyncio.run(main())
+    assert registry.metrics()["tenants"] == 1  # only the public tenant is kept
+    assert registry.evictions == 2
+    registry.close()
+
+
+def test_memory_report_does_not_name_tenants(client):
+    token = client.app.state.sessions.issue(SessionUser("42", "ada")).access_token
+    client.get("/lorebooks", headers={"Authorization": f"Bearer {token}"})
+    response = client.get("/health/memory")
+    assert response.json()["tenants"] == 2
+    assert "user-42" not in response.text
@@ -0,0 +1,35 @@
+import pytest
+
+from src.services.tokens import HeuristicTokenizer, load_tokenizer
+
+
+def test_heuristic_counts_by_script():
+    tokenizer = HeuristicTokenizer()
+    assert tokenizer.count("") == 0
+    assert tokenizer.count("hello") == 1
+    assert tokenizer.count("1234567") == 3
+    assert tokenizer.count("日本語") == 3
+    assert tokenizer.count("hi!") == 2
+
+
+def test_unknown_tokenizer_is_rejected():
+    assert load_tokenizer(None).name == "heuristic"
+    with pytest.raises(ValueError):
+        load_tokenizer("nonsense")
+
+
+def test_budget_tracks_edits_and_skips_disabled_entries(store):
+    book = store.create_lorebook(
+        "Budget",
+        [
+            {"content": "hello"},
+            {"content": "hello", "ignoreBudget": True},
+            {"content": "hello", "disabled": True},
+        ],
+    )
+    budget = store.token_budget(book.id, budget=1)
+    assert (budget.budgetedTokens, budget.ignoredTokens, budget.withinBudget) == (1, 1, True)
+
+    store.update_entry(book.id, book.entries[0].uid, {"content": "hello world"})
+    budget = store.token_budget(book.id, budget=1)
+    assert (budget.budgetedTokens, budget.remaining, budget.withinBudget) == (2, -1, False)
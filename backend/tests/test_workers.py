@@ -0,0 +1,91 @@
+import asyncio
+import subprocess
+import sys
+
+from src.services.normalize import normalize_entries
+from src.services.workers import WorkerPool
+
+
+def test_normalize_module_imports_without_building_the_app():
+    code = (
+        "import sys, src.services.normalize; "
+        "print(sorted(m for m in ('src.app', 'src.main') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_run_cpu_normalizes_in_a_worker_process():
+    pool = WorkerPool(threads=1, processes=1)
+    entries = [
+        {"key": {"0": "dragon", "1": "wyrm"}, "content": "Big.", "disable": True},
+        {"key": ["temple"], "content": "Old.", "order": 5},
+        {"order": "not a number"},
+    ]
+    try:
+        normalized, skipped = asyncio.run(pool.run_cpu(normalize_entries, entries))
+    finally:
+        pool.close()
+    assert skipped == 1
+    assert [entry.key for entry in normalized] == [["dragon", "wyrm"], ["temple"]]
+    assert normalized[0].disabled is True
+    assert all(entry.uid for entry in normalized)
+
+
+def test_share_runs_one_call_per_key():
+    pool = WorkerPool(threads=0)
+    calls = []
+
+    async def load(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def main():
+        return await asyncio.gather(
+            *(pool.share(key, lambda key=key: load(key)) for key in "aab" * 3)
+        )
+
+    assert asyncio.run(main()) == ["A", "A", "B"] * 3
+    assert sorted(calls) == ["a", "b"]
+
+
+def test_share_hands_the_error_to_every_caller_and_then_forgets_it():
+    pool = WorkerPool(threads=0)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        await asyncio.sleep(0)
+        if len(attempts) == 1:
+            raise OSError("disk")
+        return "ok"
+
+    async def main():
+        first = await asyncio.gather(
+            pool.share("k", flaky), pool.share("k", flaky), return_exceptions=True
+        )
+        return first, await pool.share("k", flaky)
+
+    first, retried = asyncio.run(main())
+    assert [type(result) for result in first] == [OSError, OSError]
+    assert retried == "ok" and len(attempts) == 2
+
+
+def test_share_survives_one_caller_being_cancelled():
+    pool = WorkerPool(threads=0)
+
+    async def slow():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def main():
+        gone = asyncio.ensure_future(pool.share("k", slow))
+        stays = asyncio.ensure_future(pool.share("k", slow))
+        await asyncio.sleep(0)
+        gone.cancel()
+        return await stays
+
+    assert asyncio.run(main()) == "done"
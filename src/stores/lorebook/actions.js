@@ -2,12 +2,14 @@ import { LocalClient } from './services/LocalClient'
 import { buildLorebookMeta, normalizeEntries } from './utils'
 
 export function useLorebookActions(state, client, mode) {
-  const { library, currentLorebookId, entries, lorebookName, isImporting } = state
+  const { library, currentLorebookId, entries, lorebookName, lorebookVersion, isImporting } =
+    state
 
   // --- Helpers ---
   const clearActiveState = () => {
     currentLorebookId.value = null
     lorebookName.value = null
+    lorebookVersion.value = null
     entries.value = []
   }
 
@@ -22,6 +24,10 @@ export function useLorebookActions(state, client, mode) {
     }
     if (currentLorebookId.value === meta.id) {
       lorebookName.value = meta.name
+      // Responses and pushed events can arrive out of order; never go back.
+      if (meta.version != null && meta.version > (lorebookVersion.value ?? -1)) {
+        lorebookVersion.value = meta.version
+      }
     }
   }
 
@@ -29,9 +35,23 @@ export function useLorebookActions(state, client, mode) {
     applyMetaUpdate(book)
     entries.value = normalizeEntries(book.entries)
     lorebookName.value = book.name
+    lorebookVersion.value = book.version ?? null
     currentLorebookId.value = book.id
   }
 
+  // Upsert / remove entries by UID, keeping the existing order.
+  const applyEntryChanges = (upserted = [], deleted = []) => {
+    const gone = new Set(deleted)
+    const incoming = new Map(upserted.map((entry) => [entry.uid, entry]))
+    const next = []
+    for (const entry of entries.value) {
+      if (gone.has(entry.uid)) continue
+      next.push(incoming.get(entry.uid) ?? entry)
+      incoming.delete(entry.uid)
+    }
+    entries.value = [...next, ...incoming.values()]
+  }
+
   // --- Hydration ---
   const hydrateRemote = async () => {
     try {
@@ -82,6 +102,69 @@ export function useLorebookActions(state, client, mode) {
     }
   }
 
+  // --- Live updates (remote mode) ---
+  // Refetch the library and the open book after events were missed.
+  const resyncRemote = async () => {
+    const data = await client.value.fetchLibrary()
+    library.value = Array.isArray(data) ? data : []
+    const id = currentLorebookId.value
+    if (id && library.value.some((b) => b.id === id)) {
+      hydrateFromBook(await client.value.loadBook(id))
+    } else {
+      await hydrateRemote()
+    }
+  }
+
+  // Catch the open book up from its known version, via the change log when
+  // the server still has it and a full reload otherwise.
+  const catchUp = async (id) => {
+    const delta = await client.value.fetchChanges(id, lorebookVersion.value ?? 0)
+    if (currentLorebookId.value !== id) return
+    if (delta.reset) {
+      hydrateFromBook(await client.value.loadBook(id))
+    } else {
+      applyEntryChanges(delta.upserted, delta.deleted)
+      applyMetaUpdate(delta.lorebook)
+    }
+  }
+
+  // Apply an event from the server's change stream (RemoteClient.subscribe).
+  const applyRemoteEvent = async (type, data) => {
+    try {
+      if (type === 'resync') {
+        await resyncRemote()
+      } else if (type === 'created') {
+        applyMetaUpdate(data.lorebook)
+      } else if (type === 'deleted') {
+        library.value = library.value.filter((b) => b.id !== data.lorebookId)
+        if (currentLorebookId.value === data.lorebookId) {
+          const fallbackId = library.value[0]?.id || null
+          if (fallbackId) {
+            await loadBook(fallbackId)
+          } else {
+            clearActiveState()
+          }
+        }
+      } else if (type === 'change') {
+        const meta = data.lorebook
+        if (currentLorebookId.value !== meta.id) {
+          applyMetaUpdate(meta)
+        } else if (meta.version > (lorebookVersion.value ?? -1)) {
+          // Skip our own edits echoed back; anything not following on from
+          // the version we hold means we missed an event.
+          if (data.reset || data.since !== lorebookVersion.value) {
+            await catchUp(meta.id)
+          } else {
+            applyEntryChanges(data.upserted, data.deleted)
+            applyMetaUpdate(meta)
+          }
+        }
+      }
+    } catch (error) {
+      console.error('Failed to apply live update', error)
+    }
+  }
+
   // --- Public Actions ---
   const loadBook = async (id) => {
     if (!id) return false
@@ -215,6 +298,7 @@ export function useLorebookActions(state, client, mode) {
     loadLorebook,
     addEntry,
     updateEntry,
-    deleteEntry
+    deleteEntry,
+    applyRemoteEvent
   }
 }
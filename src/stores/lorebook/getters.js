@@ -1,7 +1,7 @@
 import { computed } from 'vue'
 
 export function useLorebookGetters(state) {
-  const { entries, searchQuery, currentLorebookId } = state
+  const { entries, searchQuery, currentLorebookId, library } = state
 
   const filteredEntries = computed(() => {
     const currentEntries = entries.value
@@ -32,11 +32,13 @@ export function useLorebookGetters(state) {
         if (e.content) tokens += Math.round(e.content.length / 4)
       })
     }
+    // Prefer the backend's real token count when the book is stored remotely.
+    const meta = library.value.find((b) => b.id === currentLorebookId.value)
     return {
       total: Array.isArray(currentEntries) ? currentEntries.length : 0,
       active,
       constant,
-      tokens
+      tokens: meta?.tokenCount ?? tokens
     }
   })
 
@@ -26,11 +26,16 @@ export const useLorebookStore = defineStore('lorebook', () => {
   const getters = useLorebookGetters(state)
 
   // --- Watcher ---
-  // Rehydrate whenever login state changes.
+  // Rehydrate whenever login state changes; signed-in users also follow live
+  // edits from their other tabs and devices.
+  let unsubscribe = null
   watch(
     () => mode.value,
-    () => {
+    (value) => {
       actions.hydrate()
+      unsubscribe?.()
+      unsubscribe =
+        value === 'remote' ? RemoteClient.subscribe(actions.applyRemoteEvent) : null
     },
     { immediate: true }
   )
@@ -1,18 +1,29 @@
 // REST client for the FastAPI backend.
+import { useSessionStore } from '../../session'
 import { normalizeEntries } from '../utils'
 
 export const API_BASE_URL = import.meta.env.VITE_API_BASE || 'http://127.0.0.1:5330'
 
-const apiRequest = async (path, options = {}) => {
-  const response = await fetch(`${API_BASE_URL}${path}`, {
+const send = (path, options, token) =>
+  fetch(`${API_BASE_URL}${path}`, {
+    ...options,
     headers: {
       'Content-Type': 'application/json',
       Accept: 'application/json',
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
       ...(options.headers || {})
-    },
-    ...options
+    }
   })
 
+const apiRequest = async (path, options = {}) => {
+  const session = useSessionStore()
+  let response = await send(path, options, session.token)
+
+  // Access tokens are short-lived: refresh once and retry.
+  if (response.status === 401 && session.token && (await session.refreshSession())) {
+    response = await send(path, options, session.token)
+  }
+
   const isJson = response.headers.get('content-type')?.includes('application/json')
   const payload = isJson ? await response.json() : null
 
@@ -47,6 +58,50 @@ export const RemoteClient = {
     return { ...book, entries: normalizeEntries(book.entries) }
   },
 
+  async fetchChanges(id, since) {
+    return apiRequest(`/lorebooks/${id}/changes?since=${since}`)
+  },
+
+  // Follow edits made from other tabs and devices (GET /changes, Server-Sent
+  // Events). `onEvent(type, data)` gets 'change', 'created', 'deleted' and
+  // 'resync'; a 'resync' is also emitted after reconnecting, since events may
+  // have been missed meanwhile. Returns a function that closes the stream.
+  subscribe(onEvent) {
+    const session = useSessionStore()
+    let source = null
+    let retry = null
+    let closed = false
+    let dropped = false
+
+    const open = () => {
+      // EventSource cannot send an Authorization header.
+      const query = session.token ? `?token=${encodeURIComponent(session.token)}` : ''
+      source = new EventSource(`${API_BASE_URL}/changes${query}`)
+      for (const type of ['change', 'created', 'deleted', 'resync']) {
+        source.addEventListener(type, (event) => onEvent(type, JSON.parse(event.data)))
+      }
+      source.onopen = () => {
+        if (dropped) onEvent('resync', {})
+        dropped = false
+      }
+      source.onerror = async () => {
+        dropped = true
+        // EventSource reconnects by itself unless the server refused the
+        // stream (e.g. an expired token): refresh the session and reopen.
+        if (closed || source.readyState !== EventSource.CLOSED) return
+        if (session.token && !(await session.refreshSession())) return
+        if (!closed) retry = setTimeout(open, 3000)
+      }
+    }
+
+    open()
+    return () => {
+      closed = true
+      clearTimeout(retry)
+      source?.close()
+    }
+  },
+
   async createLorebook(name, entries = []) {
     const book = await apiRequest('/lorebooks', {
       method: 'POST',
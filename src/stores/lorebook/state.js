@@ -5,6 +5,7 @@ export function useLorebookState() {
   const currentLorebookId = ref(null)
   const entries = ref([])
   const lorebookName = ref(null)
+  const lorebookVersion = ref(null) // server version of the open book (remote mode)
   const searchQuery = ref('')
   const isImporting = ref(false)
 
@@ -13,6 +14,7 @@ export function useLorebookState() {
     currentLorebookId,
     entries,
     lorebookName,
+    lorebookVersion,
     searchQuery,
     isImporting
   }
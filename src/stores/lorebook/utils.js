@@ -22,6 +22,10 @@ export const buildLorebookMeta = (base = {}, overrides = {}) => ({
   entryCount:
     overrides.entryCount ??
     (Array.isArray(base.entries) ? base.entries.length : base.entryCount ?? 0),
+  // Only the backend tokenizes; local books fall back to the estimate in getters.
+  tokenCount: overrides.tokenCount ?? base.tokenCount ?? null,
+  // Server-side book version; local books have none.
+  version: overrides.version ?? base.version ?? null,
   lastEdited: overrides.lastEdited ?? base.lastEdited ?? Date.now(),
   created: overrides.created ?? base.created ?? Date.now()
 })
@@ -2,11 +2,14 @@ import { defineStore } from 'pinia'
 import { computed, ref } from 'vue'
 
 const TOKEN_KEY = 'loremaster_session_token'
+const REFRESH_KEY = 'loremaster_refresh_token'
 const USER_KEY = 'loremaster_user_info'
+const REFRESH_LOCK = 'loremaster_refresh'
 const API_BASE = import.meta.env.VITE_API_BASE || 'http://127.0.0.1:5330'
 
 export const useSessionStore = defineStore('session', () => {
   const token = ref(localStorage.getItem(TOKEN_KEY))
+  const refreshToken = ref(localStorage.getItem(REFRESH_KEY))
   const user = ref(JSON.parse(localStorage.getItem(USER_KEY) || 'null'))
 
   const isLoggedIn = computed(() => Boolean(token.value))
@@ -32,12 +35,7 @@ export const useSessionStore = defineStore('session', () => {
       })
       if (!res.ok) throw new Error('Login failed')
       
-      const data = await res.json()
-      token.value = data.access_token
-      user.value = data.user
-      
-      localStorage.setItem(TOKEN_KEY, data.access_token)
-      localStorage.setItem(USER_KEY, JSON.stringify(data.user))
+      storeSession(await res.json())
       return true
     } catch (err) {
       console.error('Login error', err)
@@ -45,10 +43,78 @@ export const useSessionStore = defineStore('session', () => {
     }
   }
 
+  const storeSession = (data) => {
+    token.value = data.access_token
+    refreshToken.value = data.refresh_token
+    user.value = data.user
+
+    localStorage.setItem(TOKEN_KEY, data.access_token)
+    localStorage.setItem(REFRESH_KEY, data.refresh_token)
+    localStorage.setItem(USER_KEY, JSON.stringify(data.user))
+  }
+
+  // Pick up tokens another tab stored (after a refresh or a logout).
+  const loadSession = () => {
+    token.value = localStorage.getItem(TOKEN_KEY)
+    refreshToken.value = localStorage.getItem(REFRESH_KEY)
+    user.value = JSON.parse(localStorage.getItem(USER_KEY) || 'null')
+  }
+
+  window.addEventListener('storage', (event) => {
+    if (event.key === null || [TOKEN_KEY, REFRESH_KEY, USER_KEY].includes(event.key)) {
+      loadSession()
+    }
+  })
+
+  // Every tab shares one refresh token, and the server treats an already
+  // rotated one as stolen and signs all tabs out, so tabs refresh one at a
+  // time (where the browser supports Web Locks).
+  const withRefreshLock = (refresh) =>
+    navigator.locks ? navigator.locks.request(REFRESH_LOCK, refresh) : refresh()
+
+  // Concurrent 401s in this tab share one refresh request.
+  let refreshing = null
+
+  // Swap the refresh token for a new session; logs out if it is rejected.
+  const refreshSession = async () => {
+    const held = refreshToken.value
+    refreshing ??= withRefreshLock(async () => {
+      try {
+        // Another tab may have refreshed while this one waited for the lock.
+        const current = localStorage.getItem(REFRESH_KEY)
+        if (current && current !== held) {
+          loadSession()
+          return true
+        }
+        if (!current) {
+          logout()
+          return false
+        }
+        const res = await fetch(`${API_BASE}/auth/refresh`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ refresh_token: current })
+        })
+        if (!res.ok) throw new Error('Refresh failed')
+        storeSession(await res.json())
+        return true
+      } catch (err) {
+        console.error('Session refresh error', err)
+        logout()
+        return false
+      }
+    }).finally(() => {
+      refreshing = null
+    })
+    return refreshing
+  }
+
   const logout = () => {
     token.value = null
+    refreshToken.value = null
     user.value = null
     localStorage.removeItem(TOKEN_KEY)
+    localStorage.removeItem(REFRESH_KEY)
     localStorage.removeItem(USER_KEY)
   }
 
@@ -58,6 +124,7 @@ export const useSessionStore = defineStore('session', () => {
     isLoggedIn,
     initiateLogin,
     completeLogin,
+    refreshSession,
     logout
   }
 })